@@ -1,16 +1,60 @@
+import hashlib
+import io
+import itertools
 import os
-from functools import wraps
-
-from flask import Flask, abort, flash, g, redirect, render_template, request, session, url_for
-from werkzeug.security import check_password_hash, generate_password_hash
-
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache, wraps
+from operator import itemgetter
+
+from flask import (
+    Flask,
+    Response,
+    abort,
+    flash,
+    g,
+    get_flashed_messages,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    session,
+    stream_template,
+    url_for,
+)
+from markupsafe import Markup
+
+from appointments_export import EXPORT_FORMATS, stream_export
+from appointments_import import detect_format, import_appointments
+import metrics
+from assets import asset_url, inline_css, send_asset
+import repository
 from db import get_cursor, init_db
+from fragment_cache import fragment_cache, fragment_key
+from live import SSE_HEADERS, stream_events
+from passwords import PasswordHasherBusy, password_hasher
+from repository import APPOINTMENT_LIST_COLUMNS, APPOINTMENTS_WITH_ARCHIVE_SQL
+from user_cache import user_cache
 
 app = Flask(__name__)
 app.secret_key = "dev-secret"
+# עדכונים חיים (EventSource ל-/events) כבויים כאן כברירת מחדל: כל חיבור פתוח מחזיק worker סינכרוני,
+# ולשונית אחת תקועה על gunicorn עם worker יחיד. asgi_app מדליק אותם, שם חיבור הוא רק coroutine
+app.config["LIVE_UPDATES"] = os.getenv("LIVE_UPDATES", "0") == "1"
+metrics.init_app(app)
 
 ALLOWED_STATUSES = {"planned", "done", "canceled"}
 ALLOWED_THEMES = {"enterprise", "soft", "pro", "mobile"}
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+LIST_FILTERS = {"upcoming", "past"}
+STREAM_CHUNK_SIZE = 500
+STREAM_BUFFER_BYTES = 16 * 1024
+MAX_BULK_IDS = 500
+MAX_SEARCH_TERMS = 8
+PASSWORD_BUSY_MESSAGE = "המערכת עמוסה כרגע, נסו שוב בעוד רגע"
+STATUS_HISTORY_LIMIT = 50
+STATUS_TRANSITIONS_LIMIT = 500
 
 
 def format_timestamp(value):
@@ -28,23 +72,13 @@ def get_current_user():
         g.current_user = None
         return None
 
-    with get_cursor() as cur:
-        cur.execute(
-            """
-            SELECT id, email, is_admin
-            FROM users
-            WHERE id = %s
-            """,
-            (user_id,),
-        )
-        row = cur.fetchone()
-
-    if not row:
+    user = load_user(user_id)
+    if not user:
         session.pop("user_id", None)
         g.current_user = None
         return None
 
-    g.current_user = {"id": row[0], "email": row[1], "is_admin": row[2]}
+    g.current_user = user
     return g.current_user
 
 
@@ -73,81 +107,624 @@ def admin_required(view_func):
     return wrapper
 
 
-def sanitize_next_url(next_url):
+def api_login_required(view_func):
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        if not get_current_user():
+            return jsonify({"error": "authentication required"}), 401
+        return view_func(*args, **kwargs)
+
+    return wrapper
+
+
+def sanitize_next_url(next_url, build_url=url_for):
     if not next_url or not next_url.startswith("/"):
-        return url_for("list_appointments")
+        return build_url("list_appointments")
     return next_url
 
 
-def fetch_appointments_for_owner(owner_user_id):
+def parse_date(value):
+    try:
+        return datetime.strptime((value or "").strip(), "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def parse_time(value):
+    value = (value or "").strip()
+    for fmt in ("%H:%M", "%H:%M:%S"):
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_starts_at(date_text, time_text):
+    day = parse_date(date_text)
+    moment = parse_time(time_text)
+    if day is None or moment is None:
+        return None
+    return datetime.combine(day, moment)
+
+
+def parse_cursor_at(value):
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def parse_page_args(args):
+    before_id = args.get("before", type=int)
+    after_id = args.get("after", type=int)
+    limit = args.get("limit", type=int) or PAGE_SIZE
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if before_id is not None:
+        after_id = None
+    return before_id, after_id, limit, parse_cursor_at(args.get("at"))
+
+
+def parse_list_filters(args):
+    when = (args.get("when") or "").strip().lower()
+    date_from = parse_date(args.get("from"))
+    date_to = parse_date(args.get("to"))
+    if date_from or date_to:
+        when = "range"
+    elif when not in LIST_FILTERS:
+        when = ""
+    status = (args.get("status") or "").strip().lower()
+    if status not in ALLOWED_STATUSES:
+        status = ""
+    q = (args.get("q") or "").strip()[:200]
+    archive = bool(args.get("archive"))
+    return {"when": when, "from": date_from, "to": date_to, "status": status, "q": q, "archive": archive}
+
+
+APPOINTMENT_ROW_WIDTH = 13
+
+
+class Appointment(tuple):
+    # שורת פגישה כפי שהגיעה מהמסד, בלי dict לכל שורה. הטקסט של חותמות הזמן מחושב רק כשהתבנית
+    # ניגשת אליו, והאיבר שאחרי העמודות הוא מפת האימיילים של הבקשה שמשותפת לכל השורות במקום JOIN לכל שורה.
+    __slots__ = ()
+
+    id = property(itemgetter(0))
+    title = property(itemgetter(1))
+    date = property(itemgetter(2))
+    time = property(itemgetter(3))
+    status = property(itemgetter(6))
+    updated_at = property(itemgetter(7))
+    status_updated_at = property(itemgetter(8))
+    created_at = property(itemgetter(9))
+    starts_at = property(itemgetter(10))
+    owner_user_id = property(itemgetter(11))
+    status_updated_by_user_id = property(itemgetter(12))
+
+    @property
+    def location(self):
+        return self[4] or ""
+
+    @property
+    def notes(self):
+        return self[5] or ""
+
+    @property
+    def updated_at_text(self):
+        return format_timestamp(self[7])
+
+    @property
+    def status_updated_at_text(self):
+        return format_timestamp(self[8])
+
+    @property
+    def owner_email(self):
+        return self[13][self[11]] if self[11] else ""
+
+    @property
+    def status_updated_by_email(self):
+        return self[13][self[12]] if self[12] else ""
+
+    @property
+    def archived(self):
+        # רק בתצוגה "כולל ארכיון" השורה מגיעה עם עמודה נוספת, אחרי מפת האימיילים
+        return len(self) > 14 and self[14]
+
+
+class UserEmails(dict):
+    # מזהה משתמש שעוד לא במפה נטען בפעם הראשונה שמבקשים אותו
+    __slots__ = ()
+
+    def __missing__(self, user_id):
+        self.update(user_email_map([user_id]))
+        return self[user_id]
+
+
+def _appointment(r, emails):
+    if len(r) == APPOINTMENT_ROW_WIDTH:
+        return Appointment((*r, emails))
+    return Appointment((*r[:APPOINTMENT_ROW_WIDTH], emails, *r[APPOINTMENT_ROW_WIDTH:]))
+
+
+def appointment_from_row(r, emails=None):
+    return _appointment(r, UserEmails() if emails is None else emails)
+
+
+def appointment_user_ids(rows):
+    ids = {r[11] for r in rows}
+    ids.update(r[12] for r in rows)
+    ids.discard(None)
+    return ids
+
+
+def appointments_from_rows(rows):
+    emails = UserEmails(user_email_map(appointment_user_ids(rows)))
+    return [_appointment(r, emails) for r in rows]
+
+
+def build_list_conditions(owner_user_id, filters):
+    filters = filters or {"when": "", "from": None, "to": None}
+    when = filters["when"]
+
+    conditions = ["a.owner_user_id = %s"]
+    params = [owner_user_id]
+    if when == "upcoming":
+        conditions.append("a.starts_at >= LOCALTIMESTAMP")
+    elif when == "past":
+        conditions.append("a.starts_at < LOCALTIMESTAMP")
+    elif when == "range":
+        conditions.append("a.starts_at IS NOT NULL")
+        if filters["from"]:
+            conditions.append("a.starts_at >= %s")
+            params.append(filters["from"])
+        if filters["to"]:
+            conditions.append("a.starts_at < %s")
+            params.append(filters["to"] + timedelta(days=1))
+    if filters.get("status"):
+        conditions.append("a.status = %s")
+        params.append(filters["status"])
+    return when, conditions, params
+
+
+def appointments_source(filters, alias="a"):
+    # ברירת המחדל קוראת רק את הסט החם. עם "כולל ארכיון" כל שורה מגיעה גם עם העמודה archived
+    if filters and filters.get("archive"):
+        return f"{APPOINTMENTS_WITH_ARCHIVE_SQL} {alias}", f"{APPOINTMENT_LIST_COLUMNS}, {alias}.archived"
+    return f"testapp_appointments {alias}", APPOINTMENT_LIST_COLUMNS
+
+
+def list_order_by(when, descending):
+    direction = "DESC" if descending else "ASC"
+    if when:
+        return f"a.starts_at {direction}, a.id {direction}"
+    return f"a.id {direction}"
+
+
+# חייב להתאים ל-SEARCH_TEXT_EXPRESSION ב-migrations.py כדי שהאינדקס הטריגרמי ישמש את ה-ILIKE
+SEARCH_TEXT_SQL = "(a.title || ' ' || COALESCE(a.location, '') || ' ' || COALESCE(a.notes, ''))"
+
+
+def search_terms(q):
+    return re.findall(r"[^\W_]+", q.lower())[:MAX_SEARCH_TERMS]
+
+
+def search_query(owner_user_id, terms, limit=PAGE_SIZE, filters=None, partial=False):
+    when, conditions, params = build_list_conditions(owner_user_id, filters)
+    source, columns = appointments_source(filters)
+    if partial:
+        conditions += [f"{SEARCH_TEXT_SQL} ILIKE %s" for _ in terms]
+        sql = f"""
+            SELECT {columns}
+            FROM {source}
+            WHERE {" AND ".join(conditions)}
+            ORDER BY a.id DESC
+            LIMIT %s
+        """
+        return sql, [*params, *(f"%{t}%" for t in terms), limit]
+
+    sql = f"""
+        SELECT {columns}
+        FROM {source}
+        CROSS JOIN to_tsquery('simple', %s) query
+        WHERE {" AND ".join(conditions)} AND a.search_vector @@ query
+        ORDER BY ts_rank(a.search_vector, query) DESC, a.id DESC
+        LIMIT %s
+    """
+    return sql, [" & ".join(f"{t}:*" for t in terms), *params, limit]
+
+
+def search_appointments_for_owner(owner_user_id, q, limit=PAGE_SIZE, filters=None):
+    terms = search_terms(q)
+    if not terms:
+        return []
+
+    # קודם חיפוש מילים מדורג (כל מילה כתחילית), ורק אם לא נמצא דבר חיפוש חלקי בתוך מילים
     with get_cursor() as cur:
+        cur.execute(*search_query(owner_user_id, terms, limit, filters))
+        rows = cur.fetchall()
+        if not rows:
+            cur.execute(*search_query(owner_user_id, terms, limit, filters, partial=True))
+            rows = cur.fetchall()
+
+    return appointments_from_rows(rows)
+
+
+def owner_page_query(owner_user_id, before_id=None, after_id=None, limit=PAGE_SIZE, filters=None, cursor_at=None):
+    when, conditions, params = build_list_conditions(owner_user_id, filters)
+    source, columns = appointments_source(filters)
+
+    # ברירת המחדל ממיינת לפי מזהה, מסנני התאריכים לפי starts_at עם המזהה כשובר שוויון.
+    # בקישורי הדפים הסמן לפי תאריך נושא גם את ה-starts_at של השורה (at), כך שהוא ממשיך לעבוד
+    # גם אחרי שהשורה נמחקה או הועברה לארכיון. בלי at (קישור ישן) ה-starts_at נשלף מהשורה עצמה.
+    descending = when in ("", "past")
+    cursor_id = before_id if after_id is None else after_id
+    if after_id is not None:
+        descending = not descending
+
+    if cursor_id is not None:
+        op = "<" if descending else ">"
+        if not when:
+            conditions.append(f"a.id {op} %s")
+        elif cursor_at is not None:
+            conditions.append(f"(a.starts_at, a.id) {op} (%s, %s)")
+            params.append(cursor_at)
+        else:
+            conditions.append(
+                f"(a.starts_at, a.id) {op} (SELECT c.starts_at, c.id FROM {appointments_source(filters, 'c')[0]} WHERE c.id = %s)"
+            )
+        params.append(cursor_id)
+    params.append(limit + 1)
+
+    sql = f"""
+        SELECT {columns}
+        FROM {source}
+        WHERE {" AND ".join(conditions)}
+        ORDER BY {list_order_by(when, descending)}
+        LIMIT %s
+    """
+    return sql, params
+
+
+def owner_page_from_rows(rows, before_id, after_id, limit, emails=None, keyed_by_time=False):
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after_id is not None:
+        rows.reverse()
+
+    if emails is None:
+        appointments = appointments_from_rows(rows)
+    else:
+        appointments = [appointment_from_row(r, emails) for r in rows]
+
+    if after_id is not None:
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = before_id is not None, has_more
+
+    page = {
+        "limit": limit,
+        "prev_from": appointments[0].id if appointments and has_prev else None,
+        "next_from": appointments[-1].id if appointments and has_next else None,
+    }
+    if keyed_by_time:
+        page["prev_at"] = appointments[0].starts_at if page["prev_from"] is not None else None
+        page["next_at"] = appointments[-1].starts_at if page["next_from"] is not None else None
+    return appointments, page
+
+
+def fetch_appointments_for_owner(owner_user_id, before_id=None, after_id=None, limit=PAGE_SIZE, filters=None, cursor_at=None):
+    if filters and filters.get("q"):
+        # תוצאות חיפוש מדורגות ולכן אין להן סמן keyset, מוצג רק העמוד הראשון
+        appointments = search_appointments_for_owner(owner_user_id, filters["q"], limit, filters)
+        return appointments, {"limit": limit, "prev_from": None, "next_from": None}
+
+    rows = repository.fetch_rows(*owner_page_query(owner_user_id, before_id, after_id, limit, filters, cursor_at))
+    return owner_page_from_rows(rows, before_id, after_id, limit, keyed_by_time=bool(filters and filters["when"]))
+
+
+def iter_appointments_for_owner(owner_user_id, filters=None):
+    when, conditions, params = build_list_conditions(owner_user_id, filters)
+    source, columns = appointments_source(filters)
+    # הסמן השמי מחזיק חיבור מה-pool עד סוף הרשימה, ולכן אסור לשלוף בזמן הזרמה בחיבור שני:
+    # כמה הזרמות במקביל היו ממתינות זו לזו על ה-pool. האימייל של הבעלים נטען לפני פתיחת
+    # הסמן, והאימייל של מעדכן הסטטוס מגיע בשורה עצמה
+    emails = dict(user_email_map([owner_user_id]))
+    with get_cursor(name="appointments_stream", itersize=STREAM_CHUNK_SIZE) as cur:
         cur.execute(
-            """
-            SELECT
-                a.id,
-                a.title,
-                a.date_text,
-                a.time_text,
-                a.location,
-                a.notes,
-                a.status,
-                a.updated_at,
-                a.status_updated_at,
-                a.created_at,
-                owner_u.email AS owner_email,
-                status_u.email AS status_updated_by_email
-            FROM testapp_appointments a
-            LEFT JOIN users owner_u ON owner_u.id = a.owner_user_id
+            f"""
+            SELECT {columns}, status_u.email
+            FROM {source}
             LEFT JOIN users status_u ON status_u.id = a.status_updated_by_user_id
-            WHERE a.owner_user_id = %s
-            ORDER BY a.id DESC
+            WHERE {" AND ".join(conditions)}
+            ORDER BY {list_order_by(when, when in ("", "past"))}
             """,
-            (owner_user_id,),
+            params,
         )
-        rows = cur.fetchall()
+        for r in cur:
+            if r[12] is not None:
+                emails[r[12]] = r[-1]
+            yield appointment_from_row(r[:-1], emails)
+
+
+def buffered(chunks, size=STREAM_BUFFER_BYTES):
+    pending = []
+    pending_len = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_len += len(chunk)
+        if pending_len >= size:
+            yield "".join(pending)
+            pending = []
+            pending_len = 0
+    if pending:
+        yield "".join(pending)
+
+
+def render_owner_appointments(owner_user_id, **context):
+    filters = parse_list_filters(request.args)
+    context.update(filters=filters, current_path=request.path)
+
+    if request.args.get("stream") and not filters["q"]:
+        rows = iter_appointments_for_owner(owner_user_id, filters)
+        first = next(rows, None)
+        if first is None:
+            appointments = []
+        else:
+            appointments = itertools.chain([first], rows)
+        # ההודעות נשלפות לפני שהכותרות נשלחות כדי שהסרתן מה-session תישמר
+        get_flashed_messages()
+        return Response(
+            buffered(stream_template("output.html", appointments=appointments, has_appointments=first is not None, streaming=True, **context)),
+            mimetype="text/html",
+        )
+
+    version, _ = owner_data_version(owner_user_id)
+    key = fragment_key(
+        "appointments",
+        database_identity(),
+        owner_user_id,
+        version,
+        get_theme_name(),
+        context["show_owner_column"],
+        context["can_change_status"],
+        context["can_manage_fields"],
+        request.full_path,
+        list_clock_bucket(filters),
+    )
 
-    appointments = []
-    for r in rows:
-        appointments.append(
-            {
-                "id": r[0],
-                "title": r[1],
-                "date": r[2],
-                "time": r[3],
-                "location": r[4] or "",
-                "notes": r[5] or "",
-                "status": r[6],
-                "updated_at": r[7],
-                "updated_at_text": format_timestamp(r[7]),
-                "status_updated_at": r[8],
-                "status_updated_at_text": format_timestamp(r[8]),
-                "created_at": r[9],
-                "owner_email": r[10] or "",
-                "status_updated_by_email": r[11] or "",
-            }
+    def render_table():
+        before_id, after_id, limit, cursor_at = parse_page_args(request.args)
+        appointments, page = fetch_appointments_for_owner(owner_user_id, before_id, after_id, limit, filters, cursor_at)
+        return render_template(
+            "_appointments_table.html",
+            appointments=appointments,
+            has_appointments=bool(appointments),
+            page_links=build_page_links(page),
+            **context,
         )
-    return appointments
 
+    table_html = fragment_cache.get_or_render(key, render_table)
+    return render_template("output.html", table_html=Markup(table_html), data_version=version, **context)
 
-def load_user(user_id):
+
+def fetch_appointment(appt_id):
+    row = repository.fetch_appointment_row(appt_id)
+    return appointment_from_row(row) if row else None
+
+
+def insert_appointment_params(owner_user_id, title, starts_at, location, notes):
+    return (
+        title,
+        starts_at.strftime("%Y-%m-%d"),
+        starts_at.strftime("%H:%M"),
+        starts_at,
+        location,
+        notes,
+        owner_user_id,
+    )
+
+
+def insert_appointment(owner_user_id, title, starts_at, location, notes):
+    row = repository.insert_appointment_row(insert_appointment_params(owner_user_id, title, starts_at, location, notes))
+    return appointment_from_row(row)
+
+
+def update_appointment_fields(appt_id, owner_user_id, title, time_text, location, notes):
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE testapp_appointments a
+            SET title = %s,
+                time_text = %s,
+                starts_at = testapp_try_timestamp(date_text, %s),
+                location = %s,
+                notes = %s,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE a.id = %s AND a.owner_user_id = %s
+            RETURNING {APPOINTMENT_LIST_COLUMNS}
+            """,
+            (title, time_text, time_text, location, notes, appt_id, owner_user_id),
+        )
+        row = cur.fetchone()
+    return appointment_from_row(row) if row else None
+
+
+def delete_owned_appointment(appt_id, owner_user_id):
     with get_cursor() as cur:
         cur.execute(
             """
-            SELECT id, email, is_admin
-            FROM users
-            WHERE id = %s
+            DELETE FROM testapp_appointments
+            WHERE id = %s AND owner_user_id = %s
             """,
-            (user_id,),
+            (appt_id, owner_user_id),
+        )
+        return cur.rowcount
+
+
+def complete_owned_appointment(appt_id, owner_user_id):
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE testapp_appointments a
+            SET status = 'done'
+            WHERE a.id = %s AND a.owner_user_id = %s
+            RETURNING {APPOINTMENT_LIST_COLUMNS}
+            """,
+            (appt_id, owner_user_id),
         )
         row = cur.fetchone()
+    return appointment_from_row(row) if row else None
+
+
+def set_appointment_status(appt_id, status, updated_by_user_id):
+    row = repository.set_status(appt_id, status, updated_by_user_id)
+    return appointment_from_row(row) if row else None
+
+
+def status_event_from_row(r, emails):
+    return {
+        "changed_at": r[0],
+        "changed_at_text": format_timestamp(r[0]),
+        "old_status": r[1],
+        "new_status": r[2],
+        "changed_by_email": emails[r[3]] if r[3] else "",
+    }
+
+
+def status_transition_from_row(r, emails):
+    event = status_event_from_row(r, emails)
+    event.update(appointment_id=r[4], title=r[5] or "", owner_email=emails[r[6]] if r[6] else "")
+    return event
+
+
+def status_event_user_ids(rows):
+    ids = {r[3] for r in rows}
+    ids.update(r[6] for r in rows if len(r) > 6)
+    ids.discard(None)
+    return ids
+
+
+def fetch_status_history(appt_id):
+    rows = repository.fetch_status_history_rows(appt_id, STATUS_HISTORY_LIMIT)
+    emails = user_email_map(status_event_user_ids(rows))
+    return [status_event_from_row(r, emails) for r in rows]
+
+
+def parse_transition_filters(args, today=None):
+    # ברירת המחדל היא החודש הנוכחי, כלומר מחיצה אחת
+    today = today or datetime.now().date()
+    date_from = parse_date(args.get("from")) or today.replace(day=1)
+    date_to = parse_date(args.get("to")) or today
+    if date_to < date_from:
+        date_from, date_to = date_to, date_from
+    status = (args.get("status") or "").strip().lower()
+    if status not in ALLOWED_STATUSES:
+        status = ""
+    return {"from": date_from, "to": date_to, "status": status}
+
 
+def status_transition_params(filters):
+    start = datetime.combine(filters["from"], datetime.min.time())
+    end = datetime.combine(filters["to"] + timedelta(days=1), datetime.min.time())
+    statuses = [filters["status"]] if filters["status"] else sorted(ALLOWED_STATUSES)
+    return start, end, statuses, STATUS_TRANSITIONS_LIMIT
+
+
+def row_fragment_page():
+    # מצב "שורה": הסקריפט ב-output.html שולח את נתיב העמוד, ופעולה שהצליחה מחזירה רק את
+    # השורה שהשתנתה במקום redirect וטעינה מחדש של כל הרשימה. כישלון נשאר redirect עם flash
+    page = request.headers.get("X-Row-Fragment")
+    return sanitize_next_url(page) if page else None
+
+
+def render_row_fragment(appointment, page):
+    user = get_current_user()
+    own = appointment.owner_user_id == user["id"]
+    # אותן הרשאות כמו ב-list_appointments וב-admin_user_appointments
+    return render_template(
+        "_appointment_row.html",
+        a=appointment,
+        show_owner_column=page.startswith("/admin/users/") and not own,
+        can_change_status=user["is_admin"],
+        can_manage_fields=own,
+        current_path=page,
+    )
+
+
+def removed_row_fragment(appt_id):
+    return Response(f'<tr id="appointment-{appt_id}" data-removed></tr>', mimetype="text/html")
+
+
+@lru_cache(maxsize=1)
+def database_identity():
+    # חלק ממפתח הקאש: קובץ ה-sqlite משותף לכל ה-workers, והמפתחות בנויים ממזהים וגרסאות שמתחילים
+    # מאפס בכל מסד. מסד שנוצר מחדש באותה כתובת מקבל OID חדש ולכן לא מקבל HTML של קודמו
+    return repository.fetch_database_oid()
+
+
+def owner_data_version(owner_user_id):
+    # מקודמת בטריגר בכל כתיבה לפגישות של הבעלים (migrations.DATA_VERSION_DDL)
+    row = repository.fetch_owner_data_version(owner_user_id)
     if not row:
-        return None
-    return {"id": row[0], "email": row[1], "is_admin": row[2]}
+        return "0", None
+    return str(row[0]), row[1]
+
+
+def cursor_at_arg(value):
+    return {"at": value.isoformat()} if value is not None else {}
+
+
+def build_page_links(page, current=request, build_url=url_for):
+    args = dict(current.view_args or {})
+    for key, value in current.args.items():
+        if key not in ("before", "after", "at", "limit") and value:
+            args[key] = value
+    if page["limit"] != PAGE_SIZE:
+        args["limit"] = page["limit"]
+
+    links = {"prev_url": None, "next_url": None}
+    if page["prev_from"] is not None:
+        links["prev_url"] = build_url(current.endpoint, after=page["prev_from"], **cursor_at_arg(page.get("prev_at")), **args)
+    if page["next_from"] is not None:
+        links["next_url"] = build_url(current.endpoint, before=page["next_from"], **cursor_at_arg(page.get("next_at")), **args)
+    return links
 
 
-def get_theme_name():
-    name = (session.get("theme") or "enterprise").strip().lower()
+def load_user(user_id):
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    row = repository.fetch_user_row(user_id)
+    if not row:
+        return None
+    user = {"id": row[0], "email": row[1], "is_admin": row[2]}
+    user_cache.set(user_id, user)
+    return user
+
+
+def user_email_map(user_ids):
+    # אימיילים של בעלים ומעדכני סטטוס לבקשה אחת: מה-cache של המשתמשים, והחסרים בשאילתה אחת
+    emails = {}
+    missing = []
+    for user_id in user_ids:
+        user = user_cache.get(user_id)
+        if user is None:
+            missing.append(user_id)
+        else:
+            emails[user_id] = user["email"]
+
+    if missing:
+        for row in repository.fetch_user_rows(missing):
+            user_cache.set(row[0], {"id": row[0], "email": row[1], "is_admin": row[2]})
+            emails[row[0]] = row[1]
+        for user_id in missing:
+            emails.setdefault(user_id, "")
+    return emails
+
+
+def get_theme_name(current_session=session):
+    name = (current_session.get("theme") or "enterprise").strip().lower()
     if name not in ALLOWED_THEMES:
         return "enterprise"
     return name
@@ -169,7 +746,9 @@ def inject_globals():
     return {
         "current_user": get_current_user(),
         "theme_name": name,
-        "theme_css": get_theme_css(name),
+        "theme_css": asset_url(get_theme_css(name)),
+        "theme_css_inline": inline_css(get_theme_css(name)),
+        "live_updates": app.config["LIVE_UPDATES"],
     }
 
 
@@ -202,7 +781,11 @@ def register_post():
         flash("יש למלא אימייל וסיסמה")
         return redirect(url_for("register"))
 
-    password_hash = generate_password_hash(password)
+    try:
+        password_hash = password_hasher.hash(password)
+    except PasswordHasherBusy:
+        flash(PASSWORD_BUSY_MESSAGE)
+        return redirect(url_for("register"))
 
     with get_cursor() as cur:
         cur.execute("SELECT id FROM users WHERE email = %s", (email,))
@@ -233,20 +816,21 @@ def login_post():
     email = (request.form.get("email") or "").strip().lower()
     password = (request.form.get("password") or "").strip()
 
-    with get_cursor() as cur:
-        cur.execute(
-            """
-            SELECT id, password_hash
-            FROM users
-            WHERE email = %s
-            """,
-            (email,),
-        )
-        row = cur.fetchone()
+    row = repository.fetch_login_row(email)
+    if not row:
+        flash("אימייל או סיסמה שגויים")
+        return redirect(url_for("login"))
 
-    if not row or not check_password_hash(row[1], password):
+    try:
+        ok, new_hash = password_hasher.verify(row[1], password)
+    except PasswordHasherBusy:
+        flash(PASSWORD_BUSY_MESSAGE)
+        return redirect(url_for("login"))
+    if not ok:
         flash("אימייל או סיסמה שגויים")
         return redirect(url_for("login"))
+    if new_hash:
+        repository.update_password_hash(row[0], row[1], new_hash)
 
     session["user_id"] = row[0]
     return redirect(url_for("list_appointments"))
@@ -280,15 +864,15 @@ def create_appointment():
         flash("חובה למלא נושא, תאריך ושעה")
         return redirect(url_for("new_appointment"))
 
-    with get_cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO testapp_appointments (title, date_text, time_text, location, notes, status, owner_user_id)
-            VALUES (%s, %s, %s, %s, %s, 'planned', %s)
-            """,
-            (title, date_text, time_text, location, notes, user["id"]),
-        )
+    starts_at = parse_starts_at(date_text, time_text)
+    if starts_at is None:
+        flash("תאריך או שעה לא תקינים")
+        return redirect(url_for("new_appointment"))
 
+    appointment = insert_appointment(user["id"], title, starts_at, location, notes)
+    page = row_fragment_page()
+    if page:
+        return render_row_fragment(appointment, page), 201
     return redirect(url_for("list_appointments"))
 
 
@@ -296,35 +880,67 @@ def create_appointment():
 @login_required
 def list_appointments():
     user = get_current_user()
-    appointments = fetch_appointments_for_owner(user["id"])
-    return render_template(
-        "output.html",
-        appointments=appointments,
+    return render_owner_appointments(
+        user["id"],
         view_user=user,
         show_owner_column=False,
         can_change_status=user["is_admin"],
         can_manage_fields=True,
         title_text="רשימת פגישות",
-        current_path=request.path,
     )
 
 
+@app.get("/events")
+@login_required
+def appointment_events():
+    # כל חיבור מחזיק thread של השרת. כש-LIVE_UPDATES כבוי גם חיבור שנפתח ידנית לא מקבל זרם
+    if not app.config["LIVE_UPDATES"]:
+        abort(404)
+    user = get_current_user()
+    owner_user_id = request.args.get("owner", type=int) or user["id"]
+    if owner_user_id != user["id"] and not user["is_admin"]:
+        abort(403)
+
+    events = stream_events(owner_user_id, lambda: owner_data_version(owner_user_id)[0])
+    return Response(events, mimetype="text/event-stream", headers=SSE_HEADERS)
+
+
+def export_response(fmt, owner_user_id=None):
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+    status = (request.args.get("status") or "").strip().lower() or None
+    if status and status not in ALLOWED_STATUSES:
+        abort(400)
+
+    chunks = stream_export(
+        fmt,
+        owner_user_id=owner_user_id,
+        status=status,
+        date_from=parse_date(request.args.get("from")),
+        date_to=parse_date(request.args.get("to")),
+    )
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    response = Response(chunks, mimetype=mimetype)
+    response.headers["Content-Disposition"] = f"attachment; filename=appointments.{fmt}"
+    return response
+
+
+@app.get("/export/appointments.<fmt>")
+@login_required
+def export_appointments(fmt: str):
+    return export_response(fmt, owner_user_id=get_current_user()["id"])
+
+
 @app.post("/delete/<int:appt_id>")
 @login_required
 def delete_appointment(appt_id: int):
     user = get_current_user()
-    with get_cursor() as cur:
-        cur.execute(
-            """
-            DELETE FROM testapp_appointments
-            WHERE id = %s AND owner_user_id = %s
-            """,
-            (appt_id, user["id"]),
-        )
-        deleted = cur.rowcount
+    deleted = delete_owned_appointment(appt_id, user["id"])
 
     if deleted == 0:
         flash("לא ניתן למחוק את הפגישה")
+    elif row_fragment_page():
+        return removed_row_fragment(appt_id)
     return redirect(url_for("list_appointments"))
 
 
@@ -332,51 +948,141 @@ def delete_appointment(appt_id: int):
 @login_required
 def complete_appointment(appt_id: int):
     user = get_current_user()
-    with get_cursor() as cur:
-        cur.execute(
-            """
-            UPDATE testapp_appointments
-            SET status = 'done'
-            WHERE id = %s AND owner_user_id = %s
-            """,
-            (appt_id, user["id"]),
-        )
-        updated = cur.rowcount
+    appointment = complete_owned_appointment(appt_id, user["id"])
 
-    if updated == 0:
+    page = row_fragment_page()
+    if appointment is None:
         flash("לא ניתן לסמן את הפגישה כהושלמה")
+    elif page:
+        return render_row_fragment(appointment, page)
     return redirect(url_for("list_appointments"))
 
 
+def bulk_request_data():
+    # לקוחות API שולחים {"ids": [...]} ב-JSON, הטפסים שולחים ids חוזר
+    if request.is_json:
+        data = request.get_json(silent=True)
+        return data if isinstance(data, dict) else {}
+    return request.form
+
+
+def parse_bulk_ids(data):
+    if hasattr(data, "getlist"):
+        values = data.getlist("ids", type=int)
+    else:
+        values = []
+        raw = data.get("ids")
+        for value in raw if isinstance(raw, list) else []:
+            try:
+                values.append(int(value))
+            except (TypeError, ValueError):
+                continue
+
+    ids = []
+    seen = set()
+    for value in values:
+        if value not in seen:
+            seen.add(value)
+            ids.append(value)
+    return ids
+
+
+def too_many_bulk_ids():
+    # עדיף לסרב מאשר לבצע בשקט רק חלק מהבחירה
+    if wants_json():
+        return jsonify({"error": f"too many ids (max {MAX_BULK_IDS})"}), 400
+    flash(f"אפשר לבחור עד {MAX_BULK_IDS} פגישות בכל פעם")
+    return redirect(sanitize_next_url(request.form.get("next")))
+
+
+def wants_json():
+    best = request.accept_mimetypes.best_match(["text/html", "application/json"])
+    return request.is_json or best == "application/json"
+
+
+def bulk_response(action, ids, changed_ids, success_message, failure_message):
+    changed = set(changed_ids)
+    results = [{"id": appt_id, "ok": appt_id in changed} for appt_id in ids]
+    if wants_json():
+        return jsonify({"action": action, "changed": len(changed), "results": results})
+
+    if not ids:
+        flash("לא נבחרו פגישות")
+    elif len(changed) == len(ids):
+        flash(success_message.format(count=len(changed)))
+    else:
+        flash(failure_message.format(count=len(changed), failed=len(ids) - len(changed)))
+    return redirect(sanitize_next_url(request.form.get("next")))
+
+
+@app.post("/bulk/complete")
+@login_required
+def bulk_complete_appointments():
+    user = get_current_user()
+    ids = parse_bulk_ids(bulk_request_data())
+    if len(ids) > MAX_BULK_IDS:
+        return too_many_bulk_ids()
+    changed_ids = []
+    if ids:
+        with get_cursor() as cur:
+            cur.execute(
+                """
+                UPDATE testapp_appointments
+                SET status = 'done'
+                WHERE id = ANY(%s) AND owner_user_id = %s
+                RETURNING id
+                """,
+                (ids, user["id"]),
+            )
+            changed_ids = [r[0] for r in cur.fetchall()]
+
+    return bulk_response(
+        "complete",
+        ids,
+        changed_ids,
+        "{count} פגישות סומנו כהושלמו",
+        "{count} פגישות סומנו כהושלמו, {failed} לא ניתן היה לסמן",
+    )
+
+
+@app.post("/bulk/delete")
+@login_required
+def bulk_delete_appointments():
+    user = get_current_user()
+    ids = parse_bulk_ids(bulk_request_data())
+    if len(ids) > MAX_BULK_IDS:
+        return too_many_bulk_ids()
+    changed_ids = []
+    if ids:
+        with get_cursor() as cur:
+            cur.execute(
+                """
+                DELETE FROM testapp_appointments
+                WHERE id = ANY(%s) AND owner_user_id = %s
+                RETURNING id
+                """,
+                (ids, user["id"]),
+            )
+            changed_ids = [r[0] for r in cur.fetchall()]
+
+    return bulk_response(
+        "delete",
+        ids,
+        changed_ids,
+        "{count} פגישות נמחקו",
+        "{count} פגישות נמחקו, {failed} לא ניתן היה למחוק",
+    )
+
+
 @app.get("/edit/<int:appt_id>")
 @login_required
 def edit_appointment(appt_id: int):
     user = get_current_user()
-    with get_cursor() as cur:
-        cur.execute(
-            """
-            SELECT id, title, date_text, time_text, location, notes, status, created_at
-            FROM testapp_appointments
-            WHERE id = %s AND owner_user_id = %s
-            """,
-            (appt_id, user["id"]),
-        )
-        row = cur.fetchone()
-
-    if not row:
+    appointment = fetch_appointment(appt_id)
+    if not appointment or appointment.owner_user_id != user["id"]:
         flash("הפגישה לא נמצאה")
         return redirect(url_for("list_appointments"))
 
-    appointment = {
-        "id": row[0],
-        "title": row[1],
-        "date": row[2],
-        "time": row[3],
-        "location": row[4] or "",
-        "notes": row[5] or "",
-        "status": row[6],
-        "created_at": row[7],
-    }
     return render_template("edit.html", appointment=appointment)
 
 
@@ -393,70 +1099,37 @@ def update_appointment(appt_id: int):
         flash("חובה למלא נושא ושעה")
         return redirect(url_for("edit_appointment", appt_id=appt_id))
 
-    with get_cursor() as cur:
-        cur.execute(
-            """
-            UPDATE testapp_appointments
-            SET title = %s,
-                time_text = %s,
-                location = %s,
-                notes = %s,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s AND owner_user_id = %s
-            """,
-            (title, time_text, location, notes, appt_id, user["id"]),
-        )
-        updated = cur.rowcount
+    moment = parse_time(time_text)
+    if moment is None:
+        flash("שעה לא תקינה")
+        return redirect(url_for("edit_appointment", appt_id=appt_id))
+    time_text = moment.strftime("%H:%M")
 
-    if updated == 0:
+    appointment = update_appointment_fields(appt_id, user["id"], title, time_text, location, notes)
+
+    page = row_fragment_page()
+    if appointment is None:
         flash("לא ניתן לעדכן את הפגישה")
+    elif page:
+        return render_row_fragment(appointment, page)
     return redirect(url_for("list_appointments"))
 
 
 @app.get("/status/<int:appt_id>")
 @admin_required
 def status_page(appt_id: int):
-    with get_cursor() as cur:
-        cur.execute(
-            """
-            SELECT
-                a.id,
-                a.title,
-                a.date_text,
-                a.time_text,
-                a.location,
-                a.notes,
-                a.status,
-                owner_u.email,
-                a.status_updated_at,
-                status_u.email
-            FROM testapp_appointments a
-            LEFT JOIN users owner_u ON owner_u.id = a.owner_user_id
-            LEFT JOIN users status_u ON status_u.id = a.status_updated_by_user_id
-            WHERE a.id = %s
-            """,
-            (appt_id,),
-        )
-        row = cur.fetchone()
-
-    if not row:
+    appointment = fetch_appointment(appt_id)
+    if not appointment:
         flash("הפגישה לא נמצאה")
         return redirect(url_for("list_appointments"))
 
-    appointment = {
-        "id": row[0],
-        "title": row[1],
-        "date": row[2],
-        "time": row[3],
-        "location": row[4] or "",
-        "notes": row[5] or "",
-        "status": row[6],
-        "owner_email": row[7] or "",
-        "status_updated_at_text": format_timestamp(row[8]),
-        "status_updated_by_email": row[9] or "",
-    }
     back_url = sanitize_next_url(request.args.get("next"))
-    return render_template("status.html", appointment=appointment, back_url=back_url)
+    return render_template(
+        "status.html",
+        appointment=appointment,
+        history=fetch_status_history(appt_id),
+        back_url=back_url,
+    )
 
 
 @app.post("/status/<int:appt_id>")
@@ -470,52 +1143,93 @@ def status_update(appt_id: int):
         flash("סטטוס לא תקין")
         return redirect(url_for("status_page", appt_id=appt_id, next=back_url))
 
-    with get_cursor() as cur:
-        cur.execute(
-            """
-            UPDATE testapp_appointments
-            SET status = %s,
-                status_updated_at = CURRENT_TIMESTAMP,
-                status_updated_by_user_id = %s
-            WHERE id = %s
-            """,
-            (status, user["id"], appt_id),
-        )
-        updated = cur.rowcount
+    appointment = set_appointment_status(appt_id, status, user["id"])
 
-    if updated == 0:
+    page = row_fragment_page()
+    if appointment is None:
         flash("לא ניתן לעדכן סטטוס")
+    elif page:
+        return render_row_fragment(appointment, page)
     else:
         flash("הסטטוס עודכן")
     return redirect(back_url)
 
 
+@app.post("/admin/bulk/status")
+@admin_required
+def admin_bulk_status_update():
+    user = get_current_user()
+    data = bulk_request_data()
+    status = str(data.get("status") or "").strip().lower()
+    ids = parse_bulk_ids(data)
+    if len(ids) > MAX_BULK_IDS:
+        return too_many_bulk_ids()
+
+    if status not in ALLOWED_STATUSES:
+        if wants_json():
+            return jsonify({"error": "invalid status"}), 400
+        flash("סטטוס לא תקין")
+        return redirect(sanitize_next_url(request.form.get("next")))
+
+    changed_ids = []
+    if ids:
+        with get_cursor() as cur:
+            cur.execute(
+                """
+                UPDATE testapp_appointments
+                SET status = %s,
+                    status_updated_at = CURRENT_TIMESTAMP,
+                    status_updated_by_user_id = %s
+                WHERE id = ANY(%s)
+                RETURNING id
+                """,
+                (status, user["id"], ids),
+            )
+            changed_ids = [r[0] for r in cur.fetchall()]
+
+    return bulk_response(
+        "status",
+        ids,
+        changed_ids,
+        "הסטטוס עודכן ל-{count} פגישות",
+        "הסטטוס עודכן ל-{count} פגישות, {failed} לא נמצאו",
+    )
+
+
+def admin_user_from_row(r):
+    return {
+        "id": r[0],
+        "email": r[1],
+        "is_admin": r[2],
+        "created_at": r[3],
+        "created_at_text": format_timestamp(r[3]),
+        "planned_count": r[4],
+        "done_count": r[5],
+        "canceled_count": r[6],
+    }
+
+
 @app.get("/admin/users")
 @admin_required
 def admin_users():
-    with get_cursor() as cur:
-        cur.execute(
-            """
-            SELECT id, email, is_admin, created_at
-            FROM users
-            ORDER BY id ASC
-            """
-        )
-        rows = cur.fetchall()
-
-    users = [
-        {
-            "id": r[0],
-            "email": r[1],
-            "is_admin": r[2],
-            "created_at": r[3],
-            "created_at_text": format_timestamp(r[3]),
-        }
-        for r in rows
-    ]
+    users = [admin_user_from_row(r) for r in repository.fetch_admin_user_rows()]
     return render_template("admin_users.html", users=users)
 
 
+@app.get("/admin/status-history")
+@admin_required
+def admin_status_history():
+    filters = parse_transition_filters(request.args)
+    rows = repository.fetch_status_transition_rows(*status_transition_params(filters))
+    emails = user_email_map(status_event_user_ids(rows))
+    return render_template(
+        "admin_status_history.html",
+        events=[status_transition_from_row(r, emails) for r in rows],
+        filters=filters,
+        limit=STATUS_TRANSITIONS_LIMIT,
+    )
+
+
 @app.get("/admin/users/<int:user_id>/appointments")
 @admin_required
 def admin_user_appointments(user_id: int):
@@ -525,19 +1239,247 @@ def admin_user_appointments(user_id: int):
         return redirect(url_for("admin_users"))
 
     current = get_current_user()
-    appointments = fetch_appointments_for_owner(user_id)
-    return render_template(
-        "output.html",
-        appointments=appointments,
+    return render_owner_appointments(
+        user_id,
         view_user=user,
         show_owner_column=current["id"] != user_id,
         can_change_status=True,
         can_manage_fields=current["id"] == user_id,
         title_text=f"רשימת פגישות עבור {user['email']}",
-        current_path=request.path,
     )
 
 
+@app.get("/admin/export/appointments.<fmt>")
+@admin_required
+def admin_export_appointments(fmt: str):
+    return export_response(fmt, owner_user_id=request.args.get("owner", type=int))
+
+
+@app.get("/admin/import")
+@admin_required
+def admin_import():
+    return render_template("admin_import.html", result=None)
+
+
+@app.post("/admin/import")
+@admin_required
+def admin_import_post():
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        flash("יש לבחור קובץ")
+        return redirect(url_for("admin_import"))
+
+    fmt = (request.form.get("format") or "").strip().lower() or detect_format(upload.filename)
+    default_owner_email = (request.form.get("owner_email") or "").strip().lower() or None
+    stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+    try:
+        result = import_appointments(stream, fmt, default_owner_email)
+    except (UnicodeDecodeError, ValueError):
+        flash("לא ניתן לקרוא את הקובץ")
+        return redirect(url_for("admin_import"))
+
+    return render_template("admin_import.html", result=result)
+
+
+def appointment_json(a):
+    return {
+        "id": a.id,
+        "title": a.title,
+        "date": a.date,
+        "time": a.time,
+        "starts_at": a.starts_at.isoformat() if a.starts_at else None,
+        "location": a.location,
+        "notes": a.notes,
+        "status": a.status,
+        "owner_user_id": a.owner_user_id,
+        "owner_email": a.owner_email,
+        "created_at": a.created_at.isoformat() if a.created_at else None,
+        "updated_at": a.updated_at.isoformat() if a.updated_at else None,
+        "status_updated_at": a.status_updated_at.isoformat() if a.status_updated_at else None,
+        "status_updated_by_email": a.status_updated_by_email,
+        "archived": bool(a.archived),
+    }
+
+
+def list_clock_bucket(filters):
+    # "קרובות"/"שעברו" תלויים בשעון ולא רק בנתונים, ולכן המפתח משתנה כל דקה
+    return datetime.now().strftime("%Y-%m-%d %H:%M") if filters["when"] in LIST_FILTERS else None
+
+
+def make_etag(*parts):
+    user = get_current_user()
+    raw = repr((parts, user["id"], user["is_admin"], request.path, sorted(request.args.items(multi=True))))
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def conditional_json(etag, build, last_modified=None):
+    # רק ETag מוכרע כאן: מחיקה לא מזיזה את חותמת הזמן האחרונה, ולכן If-Modified-Since
+    # לבדו היה עלול להחזיר 304 על רשימה שהשתנתה. Last-Modified נשלח לצורך מידע בלבד.
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def api_error(message, status):
+    return jsonify({"error": message}), status
+
+
+def api_request_data():
+    # גוף חסר נחשב לאובייקט ריק. מערך או מחרוזת ב-JSON הם שגיאה של הלקוח, לא 500
+    data = request.get_json(silent=True)
+    if data is None:
+        return {}
+    return data if isinstance(data, dict) else None
+
+
+@app.get("/api/appointments")
+@api_login_required
+def api_list_appointments():
+    user = get_current_user()
+    owner_user_id = request.args.get("owner", type=int) or user["id"]
+    if owner_user_id != user["id"] and not user["is_admin"]:
+        return api_error("forbidden", 403)
+
+    version, last_modified = owner_data_version(owner_user_id)
+    filters = parse_list_filters(request.args)
+
+    def build():
+        before_id, after_id, limit, cursor_at = parse_page_args(request.args)
+        appointments, page = fetch_appointments_for_owner(owner_user_id, before_id, after_id, limit, filters, cursor_at)
+        links = build_page_links(page)
+        return {
+            "appointments": [appointment_json(a) for a in appointments],
+            "prev": links["prev_url"],
+            "next": links["next_url"],
+        }
+
+    return conditional_json(make_etag("list", owner_user_id, version, list_clock_bucket(filters)), build, last_modified)
+
+
+@app.post("/api/appointments")
+@api_login_required
+def api_create_appointment():
+    user = get_current_user()
+    data = api_request_data()
+    if data is None:
+        return api_error("expected a JSON object", 400)
+    title = str(data.get("title") or "").strip()
+    starts_at = parse_starts_at(str(data.get("date") or ""), str(data.get("time") or ""))
+    if not title:
+        return api_error("title is required", 400)
+    if starts_at is None:
+        return api_error("invalid date or time", 400)
+
+    appointment = insert_appointment(
+        user["id"],
+        title,
+        starts_at,
+        str(data.get("location") or "").strip(),
+        str(data.get("notes") or "").strip(),
+    )
+    response = jsonify(appointment_json(appointment))
+    response.status_code = 201
+    response.headers["Location"] = url_for("api_get_appointment", appt_id=appointment.id)
+    return response
+
+
+@app.get("/api/appointments/<int:appt_id>")
+@api_login_required
+def api_get_appointment(appt_id: int):
+    user = get_current_user()
+    appointment = fetch_appointment(appt_id)
+    if not appointment or (appointment.owner_user_id != user["id"] and not user["is_admin"]):
+        return api_error("not found", 404)
+
+    body = appointment_json(appointment)
+    return conditional_json(make_etag("item", body), lambda: body)
+
+
+@app.patch("/api/appointments/<int:appt_id>")
+@api_login_required
+def api_update_appointment(appt_id: int):
+    user = get_current_user()
+    current = fetch_appointment(appt_id)
+    if not current or current.owner_user_id != user["id"]:
+        return api_error("not found", 404)
+
+    data = api_request_data()
+    if data is None:
+        return api_error("expected a JSON object", 400)
+    title = str(data.get("title", current.title) or "").strip()
+    moment = parse_time(str(data.get("time", current.time) or ""))
+    if not title:
+        return api_error("title is required", 400)
+    if moment is None:
+        return api_error("invalid time", 400)
+
+    appointment = update_appointment_fields(
+        appt_id,
+        user["id"],
+        title,
+        moment.strftime("%H:%M"),
+        str(data.get("location", current.location) or "").strip(),
+        str(data.get("notes", current.notes) or "").strip(),
+    )
+    if appointment is None:
+        return api_error("not found", 404)
+    return jsonify(appointment_json(appointment))
+
+
+@app.delete("/api/appointments/<int:appt_id>")
+@api_login_required
+def api_delete_appointment(appt_id: int):
+    if not delete_owned_appointment(appt_id, get_current_user()["id"]):
+        return api_error("not found", 404)
+    return Response(status=204)
+
+
+@app.post("/api/appointments/<int:appt_id>/complete")
+@api_login_required
+def api_complete_appointment(appt_id: int):
+    appointment = complete_owned_appointment(appt_id, get_current_user()["id"])
+    if appointment is None:
+        return api_error("not found", 404)
+    return jsonify(appointment_json(appointment))
+
+
+@app.post("/api/appointments/<int:appt_id>/status")
+@api_login_required
+def api_set_appointment_status(appt_id: int):
+    user = get_current_user()
+    if not user["is_admin"]:
+        return api_error("forbidden", 403)
+
+    data = api_request_data()
+    if data is None:
+        return api_error("expected a JSON object", 400)
+    status = str(data.get("status") or "").strip().lower()
+    if status not in ALLOWED_STATUSES:
+        return api_error("invalid status", 400)
+    appointment = set_appointment_status(appt_id, status, user["id"])
+    if appointment is None:
+        return api_error("not found", 404)
+    return jsonify(appointment_json(appointment))
+
+
+@app.get("/assets/<path:filename>")
+def asset(filename: str):
+    return send_asset(filename, request.headers.get("Accept-Encoding", ""))
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    if not metrics.METRICS_ENABLED:
+        abort(404)
+    return Response(metrics.render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     init_db()
     port = int(os.getenv("PORT", "5056"))
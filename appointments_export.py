@@ -0,0 +1,178 @@
+import argparse
+import queue
+import sys
+import threading
+from datetime import date, timedelta
+
+from db import get_cursor
+
+
+EXPORT_FORMATS = {"csv", "ndjson"}
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_QUEUE_CHUNKS = 8
+
+EXPORT_COLUMNS = """
+    a.id,
+    a.owner_user_id,
+    owner_u.email AS owner_email,
+    a.title,
+    a.date_text,
+    a.time_text,
+    a.starts_at,
+    a.location,
+    a.notes,
+    a.status,
+    a.created_at,
+    a.updated_at,
+    a.status_updated_at,
+    status_u.email AS status_updated_by_email
+"""
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def build_export_sql(cur, fmt, owner_user_id=None, owner_email=None, status=None, date_from=None, date_to=None):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format: {fmt}")
+
+    conditions = []
+    params = []
+    if owner_user_id is not None:
+        conditions.append("a.owner_user_id = %s")
+        params.append(owner_user_id)
+    if owner_email:
+        conditions.append("owner_u.email = %s")
+        params.append(owner_email.strip().lower())
+    if status:
+        conditions.append("a.status = %s")
+        params.append(status)
+    if date_from:
+        conditions.append("a.starts_at >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append("a.starts_at < %s")
+        params.append(date_to + timedelta(days=1))
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    select = f"""
+        SELECT {EXPORT_COLUMNS}
+        FROM testapp_appointments a
+        LEFT JOIN users owner_u ON owner_u.id = a.owner_user_id
+        LEFT JOIN users status_u ON status_u.id = a.status_updated_by_user_id
+        {where}
+        ORDER BY a.id
+    """
+    # COPY לא מקבל פרמטרים קשורים, לכן הערכים משובצים דרך mogrify
+    select = cur.mogrify(select, params).decode()
+
+    if fmt == "csv":
+        return f"COPY ({select}) TO STDOUT WITH (FORMAT csv, HEADER true)"
+    # row_to_json כבר מבריח תווי בקרה, וה-QUOTE/DELIMITER הלא שגרתיים מונעים מ-COPY
+    # להוסיף escaping משלו, כך שכל שורה יוצאת כ-JSON תקין
+    return (
+        f"COPY (SELECT row_to_json(t) FROM ({select}) t) TO STDOUT "
+        "WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+    )
+
+
+def copy_export(out, fmt, **filters):
+    with get_cursor() as cur:
+        cur.copy_expert(build_export_sql(cur, fmt, **filters), out)
+
+
+class _ChunkWriter:
+    def __init__(self, chunks, cancelled, chunk_bytes):
+        self._chunks = chunks
+        self._cancelled = cancelled
+        self._chunk_bytes = chunk_bytes
+        self._pending = bytearray()
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self._pending += data
+        if len(self._pending) >= self._chunk_bytes:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        chunk = bytes(self._pending)
+        self._pending.clear()
+        self._put(chunk)
+
+    def _put(self, item):
+        while True:
+            if self._cancelled.is_set():
+                raise ExportCancelled()
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
+def stream_export(fmt, chunk_bytes=EXPORT_CHUNK_BYTES, **filters):
+    chunks = queue.Queue(maxsize=EXPORT_QUEUE_CHUNKS)
+    cancelled = threading.Event()
+    writer = _ChunkWriter(chunks, cancelled, chunk_bytes)
+    done = object()
+
+    def run():
+        try:
+            copy_export(writer, fmt, **filters)
+            writer.flush()
+            writer._put(done)
+        except ExportCancelled:
+            pass
+        except BaseException as exc:
+            try:
+                writer._put(exc)
+            except ExportCancelled:
+                pass
+
+    worker = threading.Thread(target=run, name="appointments-export", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+        worker.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export appointments with COPY TO STDOUT")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--owner-id", type=int)
+    parser.add_argument("--owner-email")
+    parser.add_argument("--status", choices=["planned", "done", "canceled"])
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat)
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat)
+    parser.add_argument("--output", help="file path, defaults to stdout")
+    args = parser.parse_args()
+
+    filters = {
+        "owner_user_id": args.owner_id,
+        "owner_email": args.owner_email,
+        "status": args.status,
+        "date_from": args.date_from,
+        "date_to": args.date_to,
+    }
+    if args.output:
+        with open(args.output, "wb") as out:
+            copy_export(out, args.format, **filters)
+    else:
+        copy_export(sys.stdout.buffer, args.format, **filters)
+        sys.stdout.buffer.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+
+import psycopg2
+
+from db import get_cursor
+
+
+IMPORT_FORMATS = {"csv", "ndjson"}
+IMPORT_STATUSES = {"planned", "done", "canceled"}
+COPY_CHUNK_BYTES = 64 * 1024
+MAX_REPORTED_ERRORS = 1000
+
+STAGING_COLUMNS = (
+    "line_no",
+    "owner_user_id",
+    "owner_email",
+    "title",
+    "date_text",
+    "time_text",
+    "starts_at",
+    "location",
+    "notes",
+    "status",
+)
+
+
+def _clean(value):
+    if not value:
+        return ""
+    if value.__class__ is not str:
+        value = str(value)
+    return value.strip()
+
+
+def _parse_starts_at(date_text, time_text):
+    # fromisoformat מהיר בהרבה מ-strptime, ובדיקות האורך מגבילות אותו לפורמטים של הטופס
+    if len(date_text) != 10 or date_text[4] != "-" or date_text[7] != "-":
+        return None
+    if len(time_text) not in (5, 8) or time_text[2] != ":":
+        return None
+    try:
+        return datetime.fromisoformat(f"{date_text}T{time_text}")
+    except ValueError:
+        return None
+
+
+def iter_records(stream, fmt):
+    if fmt == "csv":
+        # line_num סופר שורות פיזיות, כך ששדה עם ירידת שורה בתוך מרכאות לא מזיז את המספרים של הרשומות שאחריו
+        reader = csv.DictReader(stream)
+        while True:
+            try:
+                record = next(reader)
+            except StopIteration:
+                return
+            except csv.Error:
+                # למשל שדה שחורג מ-field_size_limit. הקורא ממשיך מהשורה הבאה
+                yield reader.line_num, None, "שורת CSV לא תקינה"
+                continue
+            yield reader.line_num, record, None
+
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_no, None, "JSON לא תקין"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "כל שורה חייבת להיות אובייקט JSON"
+            continue
+        yield line_no, record, None
+
+
+def validate_record(record, default_owner_email=None):
+    title = _clean(record.get("title"))
+    date_text = _clean(record.get("date_text") or record.get("date"))
+    time_text = _clean(record.get("time_text") or record.get("time"))
+    status = _clean(record.get("status")).lower() or "planned"
+    owner_email = _clean(record.get("owner_email")).lower() or (default_owner_email or "")
+    owner_user_id = _clean(record.get("owner_user_id"))
+
+    if not title or not date_text or not time_text:
+        return None, "חובה למלא נושא, תאריך ושעה"
+    starts_at = _parse_starts_at(date_text, time_text)
+    if starts_at is None:
+        return None, "תאריך או שעה לא תקינים"
+    if status not in IMPORT_STATUSES:
+        return None, "סטטוס לא תקין"
+    if owner_user_id and (not owner_user_id.isdigit() or int(owner_user_id) > 2147483647):
+        return None, "מזהה בעלים לא תקין"
+    if not owner_user_id and not owner_email:
+        return None, "חסר בעלים"
+    location = _clean(record.get("location"))
+    notes = _clean(record.get("notes"))
+    # Postgres לא שומר תו NUL בטקסט, ושורה אחת כזו הייתה מפילה את כל ה-COPY
+    if "\x00" in "".join((title, date_text, time_text, owner_email, location, notes)):
+        return None, "תו לא חוקי בשורה"
+
+    return (
+        owner_user_id,
+        owner_email,
+        title,
+        date_text,
+        time_text[:5],
+        starts_at,
+        location,
+        notes,
+        status,
+    ), None
+
+
+class _ValidatedRowsReader:
+    # אובייקט דמוי-קובץ ש-copy_expert קורא ממנו. כל קריאה מאמתת עוד שורות מהקלט,
+    # כך שהפענוח ב-Python וה-COPY בשרת רצים במקביל והזיכרון לא תלוי בגודל הקובץ.
+    def __init__(self, records, default_owner_email, add_error):
+        self._records = records
+        self._default_owner_email = default_owner_email
+        self._add_error = add_error
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._pending = ""
+        self.total = 0
+        self.valid = 0
+        self.error = None
+
+    def read(self, size=-1):
+        size = size if size and size > 0 else 64 * 1024
+        try:
+            while len(self._pending) < size:
+                if not self._fill(size):
+                    break
+        except Exception as exc:
+            # psycopg2 עוטף שגיאה מתוך read() בשגיאת COPY. שומרים את המקורית כדי להעלות אותה
+            self.error = exc
+            raise
+        chunk, self._pending = self._pending[:size], self._pending[size:]
+        return chunk
+
+    def _fill(self, size):
+        buffer = self._buffer
+        buffer.seek(0)
+        buffer.truncate()
+        for line_no, record, error in self._records:
+            self.total += 1
+            if error is None:
+                values, error = validate_record(record, self._default_owner_email)
+            if error is not None:
+                self._add_error(line_no, error)
+                continue
+            self._writer.writerow((line_no,) + values)
+            self.valid += 1
+            if buffer.tell() >= size:
+                break
+        data = buffer.getvalue()
+        self._pending += data
+        return bool(data)
+
+
+def import_appointments(stream, fmt, default_owner_email=None):
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"unknown import format: {fmt}")
+
+    result = {"total": 0, "inserted": 0, "error_count": 0, "errors": []}
+
+    def add_error(line_no, message):
+        result["error_count"] += 1
+        if len(result["errors"]) < MAX_REPORTED_ERRORS:
+            result["errors"].append({"line": line_no, "error": message})
+
+    reader = _ValidatedRowsReader(iter_records(stream, fmt), default_owner_email, add_error)
+    with get_cursor() as cur:
+        cur.execute(
+            """
+            CREATE TEMP TABLE testapp_appointments_import (
+                line_no INTEGER NOT NULL,
+                owner_user_id INTEGER,
+                owner_email TEXT,
+                title TEXT NOT NULL,
+                date_text TEXT NOT NULL,
+                time_text TEXT NOT NULL,
+                starts_at TIMESTAMP NOT NULL,
+                location TEXT,
+                notes TEXT,
+                status TEXT NOT NULL
+            ) ON COMMIT DROP
+            """
+        )
+        try:
+            cur.copy_expert(
+                f"COPY testapp_appointments_import ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                reader,
+                size=COPY_CHUNK_BYTES,
+            )
+        except psycopg2.Error:
+            if reader.error is not None:
+                raise reader.error from None
+            raise
+        result["total"] = reader.total
+
+        if reader.valid:
+            cur.execute("ANALYZE testapp_appointments_import")
+            cur.execute(
+                """
+                SELECT s.line_no
+                FROM testapp_appointments_import s
+                LEFT JOIN users by_email ON s.owner_user_id IS NULL AND by_email.email = s.owner_email
+                LEFT JOIN users owner_u ON owner_u.id = COALESCE(s.owner_user_id, by_email.id)
+                WHERE owner_u.id IS NULL
+                ORDER BY s.line_no
+                """
+            )
+            for (line_no,) in cur.fetchall():
+                add_error(line_no, "הבעלים לא נמצא")
+
+            cur.execute(
+                """
+                INSERT INTO testapp_appointments
+                    (title, date_text, time_text, starts_at, location, notes, status, owner_user_id)
+                SELECT s.title, s.date_text, s.time_text, s.starts_at, s.location, s.notes, s.status, owner_u.id
+                FROM testapp_appointments_import s
+                LEFT JOIN users by_email ON s.owner_user_id IS NULL AND by_email.email = s.owner_email
+                JOIN users owner_u ON owner_u.id = COALESCE(s.owner_user_id, by_email.id)
+                ORDER BY s.line_no
+                """
+            )
+            result["inserted"] = cur.rowcount
+
+    result["errors"].sort(key=lambda e: e["line"])
+    return result
+
+
+def detect_format(filename, fallback="csv"):
+    name = (filename or "").lower()
+    if name.endswith(".ndjson") or name.endswith(".jsonl"):
+        return "ndjson"
+    if name.endswith(".csv"):
+        return "csv"
+    return fallback
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import appointments with COPY FROM STDIN")
+    parser.add_argument("path", help="CSV or NDJSON file, '-' for stdin")
+    parser.add_argument("--format", choices=sorted(IMPORT_FORMATS))
+    parser.add_argument("--owner-email", help="owner for rows without owner_email/owner_user_id")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    if args.path == "-":
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+        result = import_appointments(stream, fmt, args.owner_email)
+    else:
+        with open(args.path, encoding="utf-8-sig", newline="") as stream:
+            result = import_appointments(stream, fmt, args.owner_email)
+
+    for error in result["errors"]:
+        print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+    print(f"imported {result['inserted']} of {result['total']} rows, {result['error_count']} errors")
+
+
+if __name__ == "__main__":
+    main()
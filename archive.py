@@ -0,0 +1,113 @@
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+
+from db import get_cursor
+from repository import APPOINTMENT_COLUMNS
+
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_PAUSE = float(os.getenv("ARCHIVE_PAUSE", "0.05"))
+# אצווה שלא מקבלת נעילה בזמן הזה מוותרת ומנסה שוב, במקום לעמוד בתור לפני כתיבות של משתמשים
+ARCHIVE_LOCK_TIMEOUT = os.getenv("ARCHIVE_LOCK_TIMEOUT", "1s")
+ARCHIVE_LOCK_RETRIES = 5
+ARCHIVED_STATUSES = ["done", "canceled"]
+
+# כל אצווה היא טרנזקציה קצרה אחת: מחיקה מהטבלה החמה והכנסה לארכיון באותה פקודה. שורות
+# שמשתמש נועל כרגע מדולגות (SKIP LOCKED) ונאספות בהרצה הבאה, כך שהעבודה לא מחכה לכותבים.
+# אין מצב נשמר: ההתקדמות היא הנתונים עצמם, ועבודה שנעצרה באמצע פשוט מורצת שוב.
+ARCHIVE_BATCH_SQL = f"""
+    WITH batch AS (
+        SELECT id
+        FROM testapp_appointments
+        WHERE id > %s
+          AND status = ANY(%s)
+          AND starts_at < %s
+        ORDER BY id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    ),
+    moved AS (
+        DELETE FROM testapp_appointments a
+        USING batch
+        WHERE a.id = batch.id
+        RETURNING a.*
+    ),
+    archived AS (
+        INSERT INTO testapp_appointments_archive ({APPOINTMENT_COLUMNS})
+        SELECT {APPOINTMENT_COLUMNS} FROM moved
+        RETURNING id
+    )
+    SELECT MAX(id), COUNT(*) FROM archived
+"""
+
+
+def archive_cutoff(days=ARCHIVE_AFTER_DAYS, now=None):
+    return (now or datetime.now()) - timedelta(days=days)
+
+
+def archive_batch(cutoff, after_id=0, batch_size=ARCHIVE_BATCH_SIZE):
+    with get_cursor() as cur:
+        cur.execute("SET LOCAL lock_timeout = %s", (ARCHIVE_LOCK_TIMEOUT,))
+        cur.execute(ARCHIVE_BATCH_SQL, (after_id, ARCHIVED_STATUSES, cutoff, batch_size))
+        return cur.fetchone()
+
+
+def archive_appointments(days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, pause=ARCHIVE_PAUSE, max_batches=None, log=None):
+    cutoff = archive_cutoff(days)
+    last_id = 0
+    moved = 0
+    batches = 0
+    retries = 0
+    while max_batches is None or batches < max_batches:
+        try:
+            max_id, count = archive_batch(cutoff, last_id, batch_size)
+        except psycopg2.errors.LockNotAvailable:
+            # הנעילה היחידה שאפשר לחכות לה היא שורת הספירה של בעלים שבאמצע כתיבה
+            retries += 1
+            if retries > ARCHIVE_LOCK_RETRIES:
+                raise
+            if log:
+                log(f"lock timeout after id {last_id}, retrying")
+            time.sleep(pause or ARCHIVE_PAUSE)
+            continue
+
+        retries = 0
+        batches += 1
+        if max_id is None:
+            break
+        last_id = max_id
+        moved += count
+        if log:
+            log(f"archived {moved} appointments (up to id {last_id})")
+        if pause:
+            time.sleep(pause)
+    return moved
+
+
+def count_archive():
+    with get_cursor() as cur:
+        cur.execute("SELECT COUNT(*), MIN(archived_at), MAX(archived_at) FROM testapp_appointments_archive")
+        return cur.fetchone()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move finished appointments into testapp_appointments_archive in batches")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="archive done/canceled appointments that started this many days ago")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=ARCHIVE_PAUSE, help="seconds to sleep between batches")
+    parser.add_argument("--max-batches", type=int, default=None, help="stop after this many batches, the next run continues")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    moved = archive_appointments(args.days, args.batch_size, args.pause, args.max_batches, log=print if args.verbose else None)
+    total, oldest, newest = count_archive()
+    print(f"archived {moved} appointments, archive holds {total} (archived between {oldest} and {newest})")
+
+
+if __name__ == "__main__":
+    main()
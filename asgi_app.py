@@ -0,0 +1,444 @@
+import os
+from functools import wraps
+
+import jinja2
+from a2wsgi import WSGIMiddleware
+from psycopg_pool import AsyncConnectionPool
+from quart import Quart, Response, abort, flash, g, redirect, request, session, url_for
+from werkzeug.exceptions import HTTPException
+
+import app as sync_app
+from app import (
+    ALLOWED_STATUSES,
+    ALLOWED_THEMES,
+    PASSWORD_BUSY_MESSAGE,
+    STATUS_HISTORY_LIMIT,
+    admin_user_from_row,
+    appointment_from_row,
+    appointment_user_ids,
+    build_page_links,
+    get_theme_css,
+    get_theme_name,
+    insert_appointment_params,
+    owner_page_from_rows,
+    owner_page_query,
+    parse_list_filters,
+    parse_page_args,
+    parse_starts_at,
+    sanitize_next_url,
+    search_query,
+    search_terms,
+    status_event_from_row,
+    status_event_user_ids,
+)
+from assets import asset_url, inline_css
+from db import POOL_MAX_SIZE, POOL_MIN_SIZE, POOL_TIMEOUT, get_database_url
+from live import SSE_HEADERS, stream_events_async
+from passwords import PasswordHasherBusy, password_hasher
+from repository import (
+    ADMIN_USERS_SQL,
+    APPOINTMENT_BY_ID_SQL,
+    INSERT_APPOINTMENT_SQL,
+    LOGIN_SQL,
+    OWNER_DATA_VERSION_SQL,
+    PREPARE_STATEMENTS,
+    SET_STATUS_SQL,
+    STATUS_HISTORY_SQL,
+    UPDATE_PASSWORD_HASH_SQL,
+    USERS_BY_IDS_SQL,
+    USER_BY_ID_SQL,
+)
+from user_cache import user_cache
+
+# נקודת כניסה ASGI: המסלולים החמים (התחברות, רשימה, הוספה, סטטוס וניהול) רצים על asyncio
+# עם pool אסינכרוני של psycopg, וכל השאר מועבר לאפליקציית Flask הרגילה דרך WSGIMiddleware.
+# ה-SQL והמיפוי לשורות משותפים עם app.py, וגם עוגיית ה-session זהה, כך שאפשר לעבור בין השרתים.
+class SyncTemplateEnvironment(jinja2.Environment):
+    # התבניות לא ממתינות לשום דבר, ורינדור במצב async של Jinja איטי פי 3 בערך
+    # כי כל קטע פלט עובר דרך async generator. לכן הרינדור כאן סינכרוני.
+    def __init__(self, app, **options):
+        options.setdefault("loader", app.create_global_jinja_loader())
+        super().__init__(**options)
+
+
+class AsyncApp(Quart):
+    jinja_environment = SyncTemplateEnvironment
+
+
+app = AsyncApp(__name__)
+app.secret_key = sync_app.app.secret_key
+app.config["LIVE_UPDATES"] = os.getenv("LIVE_UPDATES", "1") != "0"
+
+WSGI_THREADS = POOL_MAX_SIZE
+
+_pool = None
+
+
+@app.before_serving
+async def open_pool():
+    global _pool
+    _pool = AsyncConnectionPool(
+        get_database_url(),
+        min_size=POOL_MIN_SIZE,
+        max_size=POOL_MAX_SIZE,
+        timeout=POOL_TIMEOUT,
+        # psycopg 3 מכין בעצמו כל שאילתה לפי הטקסט שלה, כאן כבר מההרצה הראשונה
+        kwargs={"prepare_threshold": 0 if PREPARE_STATEMENTS else None},
+        open=False,
+    )
+    await _pool.open()
+
+
+@app.after_serving
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+async def render_template(template_name, **context):
+    await app.update_template_context(context)
+    return app.jinja_env.get_template(template_name).render(context)
+
+
+async def fetchall(sql, params=None):
+    async with _pool.connection() as conn:
+        cur = await conn.execute(sql, params)
+        return await cur.fetchall()
+
+
+async def fetchone(sql, params=None):
+    async with _pool.connection() as conn:
+        cur = await conn.execute(sql, params)
+        return await cur.fetchone()
+
+
+async def execute(sql, params=None):
+    async with _pool.connection() as conn:
+        cur = await conn.execute(sql, params)
+        return cur.rowcount
+
+
+async def load_user(user_id):
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    row = await fetchone(USER_BY_ID_SQL, (user_id,))
+    if not row:
+        return None
+    user = {"id": row[0], "email": row[1], "is_admin": row[2]}
+    user_cache.set(user_id, user)
+    return user
+
+
+async def user_email_map(user_ids):
+    emails = {}
+    missing = []
+    for user_id in user_ids:
+        user = user_cache.get(user_id)
+        if user is None:
+            missing.append(user_id)
+        else:
+            emails[user_id] = user["email"]
+
+    if missing:
+        for row in await fetchall(USERS_BY_IDS_SQL, (missing,)):
+            user_cache.set(row[0], {"id": row[0], "email": row[1], "is_admin": row[2]})
+            emails[row[0]] = row[1]
+        for user_id in missing:
+            emails.setdefault(user_id, "")
+    return emails
+
+
+async def get_current_user():
+    if hasattr(g, "current_user"):
+        return g.current_user
+
+    user_id = session.get("user_id")
+    user = await load_user(user_id) if user_id else None
+    if user_id and not user:
+        session.pop("user_id", None)
+    g.current_user = user
+    return user
+
+
+def login_required(view_func):
+    @wraps(view_func)
+    async def wrapper(*args, **kwargs):
+        if not await get_current_user():
+            await flash("יש להתחבר כדי להמשיך")
+            return redirect(url_for("login"))
+        return await view_func(*args, **kwargs)
+
+    return wrapper
+
+
+def admin_required(view_func):
+    @wraps(view_func)
+    async def wrapper(*args, **kwargs):
+        user = await get_current_user()
+        if not user:
+            await flash("יש להתחבר כדי להמשיך")
+            return redirect(url_for("login"))
+        if not user["is_admin"]:
+            abort(403)
+        return await view_func(*args, **kwargs)
+
+    return wrapper
+
+
+@app.context_processor
+async def inject_globals():
+    name = get_theme_name(session)
+    return {
+        "current_user": await get_current_user(),
+        "theme_name": name,
+        "theme_css": asset_url(get_theme_css(name)),
+        "theme_css_inline": inline_css(get_theme_css(name)),
+        "live_updates": app.config["LIVE_UPDATES"],
+    }
+
+
+async def owner_data_version(owner_user_id):
+    row = await fetchone(OWNER_DATA_VERSION_SQL, (owner_user_id,))
+    return str(row[0]) if row else "0"
+
+
+async def fetch_appointments_for_owner(owner_user_id, before_id, after_id, limit, filters, cursor_at=None):
+    if filters["q"]:
+        terms = search_terms(filters["q"])
+        rows = []
+        if terms:
+            rows = await fetchall(*search_query(owner_user_id, terms, limit, filters))
+            if not rows:
+                rows = await fetchall(*search_query(owner_user_id, terms, limit, filters, partial=True))
+        emails = await user_email_map(appointment_user_ids(rows))
+        return [appointment_from_row(r, emails) for r in rows], {"limit": limit, "prev_from": None, "next_from": None}
+
+    rows = await fetchall(*owner_page_query(owner_user_id, before_id, after_id, limit, filters, cursor_at))
+    emails = await user_email_map(appointment_user_ids(rows))
+    return owner_page_from_rows(rows, before_id, after_id, limit, emails, keyed_by_time=bool(filters["when"]))
+
+
+async def render_owner_appointments(owner_user_id, **context):
+    # מצב ?stream=1 לא נתמך כאן, הרשימה תמיד מוחזרת בעמודים
+    filters = parse_list_filters(request.args)
+    before_id, after_id, limit, cursor_at = parse_page_args(request.args)
+    # הגרסה נקראת לפני השורות: שינוי שקורה ביניהן או לפני שה-EventSource מתחבר יגיע כגרסה חדשה
+    version = await owner_data_version(owner_user_id)
+    appointments, page = await fetch_appointments_for_owner(owner_user_id, before_id, after_id, limit, filters, cursor_at)
+    return await render_template(
+        "output.html",
+        appointments=appointments,
+        has_appointments=bool(appointments),
+        page_links=build_page_links(page, request, url_for),
+        data_version=version,
+        filters=filters,
+        current_path=request.path,
+        **context,
+    )
+
+
+@app.get("/")
+async def theme_select():
+    return await render_template("theme_select.html")
+
+
+@app.post("/theme/set/<name>")
+async def theme_set(name: str):
+    name = (name or "").strip().lower()
+    if name not in ALLOWED_THEMES:
+        name = "enterprise"
+    session["theme"] = name
+    return redirect(url_for("login"))
+
+
+@app.get("/login")
+async def login():
+    return await render_template("login.html")
+
+
+@app.post("/login")
+async def login_post():
+    form = await request.form
+    email = (form.get("email") or "").strip().lower()
+    password = (form.get("password") or "").strip()
+
+    row = await fetchone(LOGIN_SQL, (email,))
+    if not row:
+        await flash("אימייל או סיסמה שגויים")
+        return redirect(url_for("login"))
+
+    # בדיקת ה-hash כבדה ב-CPU ורצה במאגר התהליכים, כדי לא לחסום את לולאת האירועים
+    try:
+        ok, new_hash = await password_hasher.verify_async(row[1], password)
+    except PasswordHasherBusy:
+        await flash(PASSWORD_BUSY_MESSAGE)
+        return redirect(url_for("login"))
+    if not ok:
+        await flash("אימייל או סיסמה שגויים")
+        return redirect(url_for("login"))
+    if new_hash:
+        await execute(UPDATE_PASSWORD_HASH_SQL, (new_hash, row[0], row[1]))
+
+    session["user_id"] = row[0]
+    return redirect(url_for("list_appointments"))
+
+
+@app.post("/logout")
+@login_required
+async def logout():
+    session.pop("user_id", None)
+    await flash("התנתקת מהמערכת")
+    return redirect(url_for("login"))
+
+
+@app.get("/input")
+@login_required
+async def new_appointment():
+    return await render_template("input.html")
+
+
+@app.post("/input")
+@login_required
+async def create_appointment():
+    user = await get_current_user()
+    form = await request.form
+    title = (form.get("title") or "").strip()
+    date_text = (form.get("date") or "").strip()
+    time_text = (form.get("time") or "").strip()
+    location = (form.get("location") or "").strip()
+    notes = (form.get("notes") or "").strip()
+
+    if not title or not date_text or not time_text:
+        await flash("חובה למלא נושא, תאריך ושעה")
+        return redirect(url_for("new_appointment"))
+
+    starts_at = parse_starts_at(date_text, time_text)
+    if starts_at is None:
+        await flash("תאריך או שעה לא תקינים")
+        return redirect(url_for("new_appointment"))
+
+    await fetchone(INSERT_APPOINTMENT_SQL, insert_appointment_params(user["id"], title, starts_at, location, notes))
+    return redirect(url_for("list_appointments"))
+
+
+@app.get("/output")
+@login_required
+async def list_appointments():
+    user = await get_current_user()
+    return await render_owner_appointments(
+        user["id"],
+        view_user=user,
+        show_owner_column=False,
+        can_change_status=user["is_admin"],
+        can_manage_fields=True,
+        title_text="רשימת פגישות",
+    )
+
+
+@app.get("/events")
+@login_required
+async def appointment_events():
+    # מנוי פתוח הוא coroutine שממתין ל-asyncio.Event, בלי thread ובלי חיבור למסד משלו
+    if not app.config["LIVE_UPDATES"]:
+        abort(404)
+    user = await get_current_user()
+    owner_user_id = request.args.get("owner", type=int) or user["id"]
+    if owner_user_id != user["id"] and not user["is_admin"]:
+        abort(403)
+
+    response = Response(
+        stream_events_async(owner_user_id, lambda: owner_data_version(owner_user_id)),
+        mimetype="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+    response.timeout = None
+    return response
+
+
+@app.get("/status/<int:appt_id>")
+@admin_required
+async def status_page(appt_id: int):
+    row = await fetchone(APPOINTMENT_BY_ID_SQL, (appt_id,))
+    if not row:
+        await flash("הפגישה לא נמצאה")
+        return redirect(url_for("list_appointments"))
+
+    back_url = sanitize_next_url(request.args.get("next"), url_for)
+    history_rows = await fetchall(STATUS_HISTORY_SQL, (appt_id, STATUS_HISTORY_LIMIT))
+    emails = await user_email_map(appointment_user_ids([row]) | status_event_user_ids(history_rows))
+    return await render_template(
+        "status.html",
+        appointment=appointment_from_row(row, emails),
+        history=[status_event_from_row(r, emails) for r in history_rows],
+        back_url=back_url,
+    )
+
+
+@app.post("/status/<int:appt_id>")
+@admin_required
+async def status_update(appt_id: int):
+    user = await get_current_user()
+    form = await request.form
+    status = (form.get("status") or "").strip().lower()
+    back_url = sanitize_next_url(form.get("next"), url_for)
+
+    if status not in ALLOWED_STATUSES:
+        await flash("סטטוס לא תקין")
+        return redirect(url_for("status_page", appt_id=appt_id, next=back_url))
+
+    updated = await execute(SET_STATUS_SQL, (status, user["id"], appt_id))
+
+    if updated == 0:
+        await flash("לא ניתן לעדכן סטטוס")
+    else:
+        await flash("הסטטוס עודכן")
+    return redirect(back_url)
+
+
+@app.get("/admin/users")
+@admin_required
+async def admin_users():
+    users = [admin_user_from_row(r) for r in await fetchall(ADMIN_USERS_SQL)]
+    return await render_template("admin_users.html", users=users)
+
+
+@app.get("/admin/users/<int:user_id>/appointments")
+@admin_required
+async def admin_user_appointments(user_id: int):
+    user = await load_user(user_id)
+    if not user:
+        await flash("המשתמש לא נמצא")
+        return redirect(url_for("admin_users"))
+
+    current = await get_current_user()
+    return await render_owner_appointments(
+        user_id,
+        view_user=user,
+        show_owner_column=current["id"] != user_id,
+        can_change_status=True,
+        can_manage_fields=current["id"] == user_id,
+        title_text=f"רשימת פגישות עבור {user['email']}",
+    )
+
+
+_async_routes = app.url_map.bind("localhost")
+sync_application = WSGIMiddleware(sync_app.app, workers=WSGI_THREADS)
+
+
+def serves_async(method, path):
+    try:
+        _async_routes.match(path, method)
+    except HTTPException:
+        return False
+    return True
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http" and not serves_async(scope["method"], scope["path"]):
+        await sync_application(scope, receive, send)
+        return
+    await app(scope, receive, send)
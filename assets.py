@@ -0,0 +1,141 @@
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import abort, send_from_directory
+from markupsafe import Markup
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+ASSET_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_NAME = "manifest.json"
+# קבצי הבנייה: css/<theme>.css ממופה ל-css/<theme>.<hash>.css, לצידו .gz ו-.br
+ASSET_SOURCES = ("css",)
+ASSET_MAX_AGE = 365 * 24 * 3600
+# כתובות קבועות ולא url_for, כי גם נקודת הכניסה ASGI מרנדרת את base.html
+ASSET_URL_PREFIX = "/assets/"
+STATIC_URL_PREFIX = "/static/"
+# ערכות הנושא קטנות (2-3KB), כך שאפשר להטמיע את כולן ב-<style> ולחסוך בקשה בטעינה ראשונה
+ASSETS_INLINE_CSS = os.getenv("ASSETS_INLINE_CSS", "0") == "1"
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_manifest = None
+_inline = {}
+
+
+def build(static_dir=STATIC_DIR, asset_dir=ASSET_DIR):
+    if os.path.isdir(asset_dir):
+        shutil.rmtree(asset_dir)
+
+    manifest = {}
+    for source in ASSET_SOURCES:
+        for name in sorted(os.listdir(os.path.join(static_dir, source))):
+            logical = f"{source}/{name}"
+            with open(os.path.join(static_dir, logical), "rb") as f:
+                data = f.read()
+
+            stem, ext = os.path.splitext(name)
+            hashed = f"{source}/{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+            target = os.path.join(asset_dir, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(data)
+            with open(target + ".gz", "wb") as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(target + ".br", "wb") as f:
+                    f.write(brotli.compress(data, quality=11))
+            manifest[logical] = hashed
+
+    with open(os.path.join(asset_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    reset()
+    return manifest
+
+
+def reset():
+    global _manifest
+    _manifest = None
+    _inline.clear()
+
+
+def load_manifest():
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(os.path.join(ASSET_DIR, MANIFEST_NAME), encoding="utf-8") as f:
+                _manifest = json.load(f)
+        except FileNotFoundError:
+            # בלי בנייה (פיתוח מקומי) הקבצים מוגשים כמו קודם מ-/static
+            _manifest = {}
+    return _manifest
+
+
+def asset_url(logical):
+    hashed = load_manifest().get(logical)
+    if hashed is None:
+        return STATIC_URL_PREFIX + logical
+    return ASSET_URL_PREFIX + hashed
+
+
+def inline_css(logical):
+    if not ASSETS_INLINE_CSS:
+        return None
+    hashed = load_manifest().get(logical)
+    if hashed is None:
+        return None
+    css = _inline.get(hashed)
+    if css is None:
+        with open(os.path.join(ASSET_DIR, hashed), encoding="utf-8") as f:
+            css = Markup(f.read())
+        _inline[hashed] = css
+    return css
+
+
+def send_asset(filename, accept_encoding):
+    # רק קבצים שהבנייה יצרה. לשם יש hash של התוכן ולכן אפשר לשמור אותם בקאש לתמיד
+    if filename not in load_manifest().values():
+        abort(404)
+
+    accepted = {part.split(";")[0].strip() for part in accept_encoding.split(",")}
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.exists(os.path.join(ASSET_DIR, filename + suffix)):
+            response = send_from_directory(
+                ASSET_DIR,
+                filename + suffix,
+                mimetype=mimetypes.guess_type(filename)[0],
+                max_age=ASSET_MAX_AGE,
+                conditional=True,
+            )
+            response.headers["Content-Encoding"] = encoding
+            break
+    else:
+        response = send_from_directory(ASSET_DIR, filename, max_age=ASSET_MAX_AGE, conditional=True)
+
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress static assets into static/dist")
+    parser.parse_args()
+    manifest = build()
+    for logical, hashed in manifest.items():
+        print(f"{logical} -> {hashed}")
+    if brotli is None:
+        print("brotli is not installed, only .gz files were written")
+
+
+if __name__ == "__main__":
+    main()
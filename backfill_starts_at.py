@@ -0,0 +1,91 @@
+import argparse
+import time
+
+from db import get_cursor, get_db_connection
+from migrations import TRY_TIMESTAMP_FUNCTION
+
+
+# הסדר מאפשר הרצה לפני פריסת גרסת האפליקציה החדשה: הוספת עמודה nullable היא שינוי
+# קטלוג בלבד, המילוי רץ באצוות קצרות שכל אחת בטרנזקציה משלה, והאינדקס נבנה CONCURRENTLY.
+def ensure_column():
+    with get_cursor() as cur:
+        cur.execute(
+            """
+            ALTER TABLE testapp_appointments
+            ADD COLUMN IF NOT EXISTS starts_at TIMESTAMP;
+            """
+        )
+        cur.execute(TRY_TIMESTAMP_FUNCTION)
+
+
+def backfill(batch_size=1000, pause=0.0):
+    last_id = 0
+    filled = 0
+    while True:
+        with get_cursor() as cur:
+            cur.execute(
+                """
+                WITH batch AS (
+                    SELECT id
+                    FROM testapp_appointments
+                    WHERE id > %s
+                    ORDER BY id
+                    LIMIT %s
+                ),
+                updated AS (
+                    UPDATE testapp_appointments a
+                    SET starts_at = testapp_try_timestamp(a.date_text, a.time_text)
+                    FROM batch
+                    WHERE a.id = batch.id AND a.starts_at IS NULL
+                    RETURNING a.starts_at
+                )
+                SELECT (SELECT MAX(id) FROM batch), (SELECT COUNT(starts_at) FROM updated)
+                """,
+                (last_id, batch_size),
+            )
+            max_id, updated = cur.fetchone()
+
+        if max_id is None:
+            return filled
+        last_id = max_id
+        filled += updated
+        if pause:
+            time.sleep(pause)
+
+
+def create_index():
+    conn = get_db_connection()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_testapp_appointments_owner_user_id_starts_at
+                ON testapp_appointments(owner_user_id, starts_at, id);
+                """
+            )
+    finally:
+        conn.close()
+
+
+def count_unparsed():
+    with get_cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM testapp_appointments WHERE starts_at IS NULL")
+        return cur.fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill testapp_appointments.starts_at in batches")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    args = parser.parse_args()
+
+    ensure_column()
+    filled = backfill(args.batch_size, args.pause)
+    create_index()
+
+    print(f"starts_at backfilled for {filled} rows, {count_unparsed()} rows could not be parsed")
+
+
+if __name__ == "__main__":
+    main()
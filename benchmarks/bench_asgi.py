@@ -0,0 +1,142 @@
+import asyncio
+import os
+import sys
+import threading
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import httpx
+from psycopg2.extensions import make_dsn, parse_dsn
+from werkzeug.security import generate_password_hash
+
+from db import get_cursor, get_database_url, init_db
+from loadgen import run_load, running_server
+
+
+WORKERS = int(os.getenv("BENCH_WORKERS", str(os.cpu_count() or 1)))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "64"))
+SECONDS = float(os.getenv("BENCH_SECONDS", "10"))
+APPOINTMENTS = int(os.getenv("BENCH_APPOINTMENTS", "200"))
+PATH = os.getenv("BENCH_PATH", "/output")
+# השהיה מלאכותית בכל כיוון בין השרתים ל-Postgres, כדי לדמות מסד נתונים מרוחק
+DB_DELAY_MS = float(os.getenv("BENCH_DB_DELAY_MS", "0"))
+PROXY_PORT = 8709
+
+SERVERS = [
+    ("sync (gunicorn)", "sync", 8701),
+    ("asgi (uvicorn)", "asgi", 8702),
+]
+
+
+def seed():
+    init_db()
+    email = f"bench-asgi-{os.getpid()}@example.com"
+    with get_cursor() as cur:
+        cur.execute(
+            "INSERT INTO users (email, password_hash) VALUES (%s, %s) RETURNING id",
+            (email, generate_password_hash("bench")),
+        )
+        owner_id = cur.fetchone()[0]
+        cur.execute(
+            """
+            INSERT INTO testapp_appointments (title, date_text, time_text, starts_at, location, notes, owner_user_id)
+            SELECT 'bench ' || g, '2026-01-01', '09:00', '2026-01-01 09:00', 'תל אביב', '', %s
+            FROM generate_series(1, %s) g
+            """,
+            (owner_id, APPOINTMENTS),
+        )
+    return owner_id, email
+
+
+def cleanup(owner_id):
+    with get_cursor() as cur:
+        cur.execute("DELETE FROM testapp_appointments WHERE owner_user_id = %s", (owner_id,))
+        cur.execute("DELETE FROM users WHERE id = %s", (owner_id,))
+
+
+async def _pipe(reader, writer, delay):
+    loop = asyncio.get_running_loop()
+    pending = asyncio.Queue()
+
+    async def forward():
+        while True:
+            due, data = await pending.get()
+            if data is None:
+                break
+            await asyncio.sleep(due - loop.time())
+            writer.write(data)
+            await writer.drain()
+        writer.close()
+
+    task = asyncio.create_task(forward())
+    while data := await reader.read(65536):
+        pending.put_nowait((loop.time() + delay, data))
+    pending.put_nowait((0, None))
+    await task
+
+
+def start_delay_proxy(dsn, delay):
+    params = parse_dsn(dsn)
+    host = params.get("host") or "/var/run/postgresql"
+    port = int(params.get("port") or 5432)
+
+    async def handle(client_reader, client_writer):
+        if host.startswith("/"):
+            server_reader, server_writer = await asyncio.open_unix_connection(f"{host}/.s.PGSQL.{port}")
+        else:
+            server_reader, server_writer = await asyncio.open_connection(host, port)
+        await asyncio.gather(
+            _pipe(client_reader, server_writer, delay),
+            _pipe(server_reader, client_writer, delay),
+            return_exceptions=True,
+        )
+
+    async def serve():
+        server = await asyncio.start_server(handle, "127.0.0.1", PROXY_PORT)
+        async with server:
+            await server.serve_forever()
+
+    threading.Thread(target=asyncio.run, args=(serve(),), daemon=True).start()
+    return make_dsn(dsn, host="127.0.0.1", port=PROXY_PORT)
+
+
+async def load(base_url, email):
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        res = await client.post("/login", data={"email": email, "password": "bench"})
+        assert res.status_code == 302, res.status_code
+
+        async def send(worker, n):
+            return (await client.get(PATH)).status_code == 200
+
+        return await run_load(send, CONCURRENCY, SECONDS)
+
+
+def main():
+    owner_id, email = seed()
+    env = dict(os.environ)
+    if DB_DELAY_MS:
+        env["DATABASE_URL"] = start_delay_proxy(get_database_url(), DB_DELAY_MS / 1000)
+
+    results = []
+    try:
+        for name, kind, port in SERVERS:
+            with running_server(kind, port, WORKERS, env) as base_url:
+                results.append((name, asyncio.run(load(base_url, email))))
+    finally:
+        cleanup(owner_id)
+
+    print(
+        f"GET {PATH}, {WORKERS} workers each, {CONCURRENCY} concurrent clients, {SECONDS:.0f}s, "
+        f"{DB_DELAY_MS:g}ms added database latency each way"
+    )
+    print(f"{'server':<18}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, stats in results:
+        latency = stats["latency_ms"]
+        print(f"{name:<18}{stats['rps']:>10.0f}{latency['p50']:>10.1f}{latency['p99']:>10.1f}{stats['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
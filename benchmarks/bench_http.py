@@ -0,0 +1,212 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import httpx
+
+from db import get_cursor
+from loadgen import SERVER_COMMANDS, run_load, running_server
+from seed import DEFAULT_PASSWORD, DEFAULT_PREFIX
+
+
+SCENARIOS = ["login", "output", "input_form", "input_post", "status_page", "status_update", "admin_users"]
+MAX_SESSIONS = 32
+STATUS_CYCLE = ["planned", "done", "canceled"]
+
+
+def load_seed(prefix):
+    with get_cursor() as cur:
+        cur.execute(
+            "SELECT id, email, is_admin FROM users WHERE email LIKE %s ORDER BY id",
+            (f"{prefix}%",),
+        )
+        users = [{"id": r[0], "email": r[1], "is_admin": r[2]} for r in cur.fetchall()]
+        cur.execute(
+            """
+            SELECT a.id
+            FROM testapp_appointments a
+            JOIN users u ON u.id = a.owner_user_id
+            WHERE u.email LIKE %s
+            ORDER BY a.id
+            LIMIT 5000
+            """,
+            (f"{prefix}%",),
+        )
+        appointment_ids = [r[0] for r in cur.fetchall()]
+        cur.execute("SELECT COUNT(*) FROM testapp_appointments")
+        total_appointments = cur.fetchone()[0]
+
+    if not users or not any(u["is_admin"] for u in users) or not appointment_ids:
+        raise SystemExit("no seeded data found, run benchmarks/seed.py first")
+    return users, appointment_ids, total_appointments
+
+
+async def logged_in_client(base_url, email, password, concurrency):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60)
+    res = await client.post("/login", data={"email": email, "password": password})
+    if res.status_code != 302 or not res.headers.get("location", "").endswith("/output"):
+        await client.aclose()
+        raise SystemExit(f"login failed for {email}")
+    return client
+
+
+async def run_scenarios(base_url, scenarios, levels, seconds, users, appointment_ids, password):
+    max_concurrency = max(levels)
+    regular = [u for u in users if not u["is_admin"]] or users
+    admin = next(u for u in users if u["is_admin"])
+
+    sessions = [
+        await logged_in_client(base_url, u["email"], password, max_concurrency)
+        for u in regular[:MAX_SESSIONS]
+    ]
+    admin_client = await logged_in_client(base_url, admin["email"], password, max_concurrency)
+    anonymous = httpx.AsyncClient(
+        base_url=base_url,
+        limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        timeout=60,
+    )
+
+    def appointment_id(worker, n):
+        return appointment_ids[(worker * 7919 + n) % len(appointment_ids)]
+
+    async def login(worker, n):
+        user = regular[(worker + n) % len(regular)]
+        res = await anonymous.post("/login", data={"email": user["email"], "password": password})
+        anonymous.cookies.clear()
+        return res.status_code == 302
+
+    async def output(worker, n):
+        return (await sessions[worker % len(sessions)].get("/output")).status_code == 200
+
+    async def input_form(worker, n):
+        return (await sessions[worker % len(sessions)].get("/input")).status_code == 200
+
+    async def input_post(worker, n):
+        res = await sessions[worker % len(sessions)].post(
+            "/input",
+            data={"title": f"load {worker}-{n}", "date": "2026-06-01", "time": "10:00", "location": "", "notes": ""},
+        )
+        return res.status_code == 302
+
+    async def status_page(worker, n):
+        return (await admin_client.get(f"/status/{appointment_id(worker, n)}")).status_code == 200
+
+    async def status_update(worker, n):
+        res = await admin_client.post(
+            f"/status/{appointment_id(worker, n)}",
+            data={"status": STATUS_CYCLE[n % len(STATUS_CYCLE)], "next": "/output"},
+        )
+        return res.status_code == 302
+
+    async def admin_users(worker, n):
+        return (await admin_client.get("/admin/users")).status_code == 200
+
+    senders = {
+        "login": login,
+        "output": output,
+        "input_form": input_form,
+        "input_post": input_post,
+        "status_page": status_page,
+        "status_update": status_update,
+        "admin_users": admin_users,
+    }
+
+    results = []
+    try:
+        for scenario in scenarios:
+            for concurrency in levels:
+                stats = await run_load(senders[scenario], concurrency, seconds)
+                results.append({"scenario": scenario, "concurrency": concurrency, **stats})
+                print(
+                    f"{scenario:<14} c={concurrency:<4} {stats['rps']:>8.1f} req/s  "
+                    f"p50 {stats['latency_ms']['p50']:>8.1f} ms  p99 {stats['latency_ms']['p99']:>8.1f} ms  "
+                    f"errors {stats['errors']}",
+                    file=sys.stderr,
+                )
+    finally:
+        for client in [*sessions, admin_client, anonymous]:
+            await client.aclose()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_levels(text):
+    return [int(part) for part in text.split(",") if part.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the real endpoints at fixed concurrency levels and report JSON")
+    parser.add_argument("--url", help="benchmark an already running server instead of starting one")
+    parser.add_argument("--server", choices=sorted(SERVER_COMMANDS), default="sync")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=8711)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=parse_levels, default=parse_levels("1,8,32"))
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each scenario/concurrency run")
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    users, appointment_ids, total_appointments = load_seed(args.prefix)
+
+    def run(base_url):
+        return asyncio.run(
+            run_scenarios(base_url, scenarios, args.concurrency, args.seconds, users, appointment_ids, args.password)
+        )
+
+    if args.url:
+        results = run(args.url.rstrip("/"))
+    else:
+        with running_server(args.server, args.port, args.workers) as base_url:
+            results = run(base_url)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "server": "external" if args.url else args.server,
+            "workers": None if args.url else args.workers,
+            "cpu_count": os.cpu_count(),
+            "seconds_per_run": args.seconds,
+            "seeded_users": len(users),
+            "total_appointments": total_appointments,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            out.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
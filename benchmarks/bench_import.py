@@ -0,0 +1,47 @@
+import io
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from appointments_import import import_appointments
+from db import get_cursor, init_db
+
+
+ROWS = int(os.getenv("BENCH_ROWS", "200000"))
+
+
+def build_csv(rows, owner_email):
+    out = io.StringIO()
+    out.write("title,date,time,location,notes,status,owner_email\n")
+    for i in range(rows):
+        out.write(f"bench {i},2026-{i % 12 + 1:02d}-{i % 28 + 1:02d},{i % 24:02d}:{i % 60:02d},תל אביב,,planned,{owner_email}\n")
+    out.seek(0)
+    return out
+
+
+def main():
+    init_db()
+    owner_email = f"bench-import-{os.getpid()}@example.com"
+    with get_cursor() as cur:
+        cur.execute("INSERT INTO users (email, password_hash) VALUES (%s, 'x') RETURNING id", (owner_email,))
+        owner_id = cur.fetchone()[0]
+
+    payload = build_csv(ROWS, owner_email)
+    try:
+        started = time.perf_counter()
+        result = import_appointments(payload, "csv")
+        elapsed = time.perf_counter() - started
+    finally:
+        with get_cursor() as cur:
+            cur.execute("DELETE FROM testapp_appointments WHERE owner_user_id = %s", (owner_id,))
+            cur.execute("DELETE FROM users WHERE id = %s", (owner_id,))
+
+    print(f"imported {result['inserted']} rows in {elapsed:.2f}s ({result['inserted'] / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
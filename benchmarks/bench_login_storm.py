@@ -0,0 +1,115 @@
+import asyncio
+import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import httpx
+
+from db import get_cursor, init_db
+from loadgen import run_load, running_server
+from passwords import PASSWORD_HASH_WORKERS, password_hasher
+
+
+WORKERS = int(os.getenv("BENCH_WORKERS", str(os.cpu_count() or 1)))
+THREADS = int(os.getenv("BENCH_THREADS", "8"))
+LOGIN_CONCURRENCY = int(os.getenv("BENCH_LOGIN_CONCURRENCY", "32"))
+LIST_CONCURRENCY = int(os.getenv("BENCH_LIST_CONCURRENCY", "8"))
+SECONDS = float(os.getenv("BENCH_SECONDS", "10"))
+APPOINTMENTS = int(os.getenv("BENCH_APPOINTMENTS", "50"))
+PORT = 8711
+
+# ההתנהגות הקודמת (hash בתוך ה-thread בלי הגבלה), אותו חישוב עם הגבלת תור, ומאגר התהליכים
+POOL_WORKERS = str(max(PASSWORD_HASH_WORKERS, 1))
+CONFIGS = [
+    ("inline", {"PASSWORD_HASH_WORKERS": "0", "PASSWORD_HASH_MAX_PENDING": "1000000"}),
+    ("inline, bounded", {"PASSWORD_HASH_WORKERS": "0", "PASSWORD_HASH_MAX_PENDING": "2"}),
+    (f"pool ({POOL_WORKERS} procs)", {"PASSWORD_HASH_WORKERS": POOL_WORKERS}),
+]
+
+
+def seed():
+    init_db()
+    email = f"bench-login-{os.getpid()}@example.com"
+    with get_cursor() as cur:
+        cur.execute(
+            "INSERT INTO users (email, password_hash) VALUES (%s, %s) RETURNING id",
+            (email, password_hasher.hash("bench")),
+        )
+        owner_id = cur.fetchone()[0]
+        cur.execute(
+            """
+            INSERT INTO testapp_appointments (title, date_text, time_text, starts_at, location, notes, owner_user_id)
+            SELECT 'bench ' || g, '2026-01-01', '09:00', '2026-01-01 09:00', '', '', %s
+            FROM generate_series(1, %s) g
+            """,
+            (owner_id, APPOINTMENTS),
+        )
+    return owner_id, email
+
+
+def cleanup(owner_id):
+    with get_cursor() as cur:
+        cur.execute("DELETE FROM testapp_appointments WHERE owner_user_id = %s", (owner_id,))
+        cur.execute("DELETE FROM users WHERE id = %s", (owner_id,))
+
+
+async def load(base_url, email, storm):
+    def client(concurrency):
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        return httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60)
+
+    async with client(LIST_CONCURRENCY) as lister, client(LOGIN_CONCURRENCY) as login_client:
+        res = await lister.post("/login", data={"email": email, "password": "bench"})
+        assert res.status_code == 302, res.status_code
+
+        async def send_list(worker, n):
+            return (await lister.get("/output")).status_code == 200
+
+        async def send_login(worker, n):
+            res = await login_client.post("/login", data={"email": email, "password": "bench"})
+            login_client.cookies.clear()
+            return res.headers.get("location", "").endswith("/output")
+
+        if not storm:
+            return None, await run_load(send_list, LIST_CONCURRENCY, SECONDS)
+        return await asyncio.gather(
+            run_load(send_login, LOGIN_CONCURRENCY, SECONDS),
+            run_load(send_list, LIST_CONCURRENCY, SECONDS),
+        )
+
+
+def main():
+    owner_id, email = seed()
+    results = []
+    try:
+        for name, overrides in CONFIGS:
+            env = dict(os.environ, **overrides)
+            with running_server("gthread", PORT, WORKERS, env, threads=THREADS) as base_url:
+                results.append((name, "idle", *asyncio.run(load(base_url, email, storm=False))))
+                results.append((name, "login storm", *asyncio.run(load(base_url, email, storm=True))))
+    finally:
+        cleanup(owner_id)
+
+    print(
+        f"gunicorn {WORKERS} workers x {THREADS} threads, {LOGIN_CONCURRENCY} login clients, "
+        f"{LIST_CONCURRENCY} /output clients, {SECONDS:.0f}s, {password_hasher.method}"
+    )
+    print(
+        f"{'hashing':<18}{'logins':<13}{'login/s':>9}{'rejected':>10}"
+        f"{'list req/s':>12}{'list p50':>10}{'list p99':>10}"
+    )
+    for name, mode, logins, listing in results:
+        latency = listing["latency_ms"]
+        login_rps = f"{logins['rps']:.0f}" if logins else "-"
+        rejected = str(logins["errors"]) if logins else "-"
+        print(
+            f"{name:<18}{mode:<13}{login_rps:>9}{rejected:>10}"
+            f"{listing['rps']:>12.0f}{latency['p50']:>10.1f}{latency['p99']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import repository
+from app import owner_page_query
+from db import get_cursor
+from seed import DEFAULT_PREFIX
+
+
+def load_sample(prefix):
+    with get_cursor() as cur:
+        cur.execute(
+            """
+            SELECT u.id, u.email, MIN(a.id)
+            FROM users u
+            JOIN testapp_appointments a ON a.owner_user_id = u.id
+            WHERE u.email LIKE %s
+            GROUP BY u.id, u.email
+            ORDER BY u.id
+            LIMIT 1
+            """,
+            (f"{prefix}%",),
+        )
+        row = cur.fetchone()
+    if not row:
+        raise SystemExit("no seeded data found, run benchmarks/seed.py first")
+    return row
+
+
+def hot_queries(user_id, email, appointment_id):
+    # מה שבקשה ל-/output, /login ו-/status מריצות, באותו טקסט ובאותם פרמטרים
+    return {
+        "user_by_id": (repository.USER_BY_ID_SQL, (user_id,)),
+        "login": (repository.LOGIN_SQL, (email,)),
+        "owner_page": owner_page_query(user_id),
+        "owner_page_upcoming": owner_page_query(user_id, filters={"when": "upcoming", "from": None, "to": None}),
+        "appointment_by_id": (repository.APPOINTMENT_BY_ID_SQL, (appointment_id,)),
+        "admin_users": (repository.ADMIN_USERS_SQL, None),
+    }
+
+
+def planning_ms(cur, sql, params):
+    cur.execute("EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) " + cur.mogrify(sql, params).decode())
+    plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Planning Time"]
+
+
+def time_executions(cur, sql, params, iterations, prepared):
+    repository.PREPARE_STATEMENTS = prepared
+    repository.execute(cur, sql, params)
+    cur.fetchall()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        repository.execute(cur, sql, params)
+        cur.fetchall()
+    return (time.perf_counter() - started) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare plain and prepared execution of the hot queries")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX)
+    args = parser.parse_args()
+
+    user_id, email, appointment_id = load_sample(args.prefix)
+    queries = hot_queries(user_id, email, appointment_id)
+
+    results = {}
+    with get_cursor() as cur:
+        for name, (sql, params) in queries.items():
+            results[name] = (
+                planning_ms(cur, sql, params),
+                time_executions(cur, sql, params, args.iterations, prepared=False),
+                time_executions(cur, sql, params, args.iterations, prepared=True),
+            )
+
+    print(f"{'query':<22} {'planning ms':>12} {'plain ms':>10} {'prepared ms':>12} {'saved ms':>10}")
+    for name, (planning, plain, prepared) in results.items():
+        print(f"{name:<22} {planning:>12.3f} {plain:>10.3f} {prepared:>12.3f} {plain - prepared:>10.3f}")
+
+    # בקשה מחוברת ל-/output מריצה את טעינת המשתמש (כשאין לו cache) ואת עמוד הרשימה
+    per_request = sum(results[name][1] - results[name][2] for name in ("user_by_id", "owner_page"))
+    print(f"\nsaved per /output request: {per_request:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
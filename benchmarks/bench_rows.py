@@ -0,0 +1,150 @@
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import appointments_from_rows, format_timestamp
+from db import get_cursor
+from repository import APPOINTMENT_LIST_COLUMNS
+from seed import DEFAULT_PREFIX
+from user_cache import user_cache
+
+
+# השאילתה והמיפוי כפי שהיו לפני רשומות ה-tuple, לצורך השוואה בלבד
+LEGACY_COLUMNS = """
+    a.id, a.title, a.date_text, a.time_text, a.location, a.notes, a.status,
+    a.updated_at, a.status_updated_at, a.created_at,
+    owner_u.email AS owner_email, status_u.email AS status_updated_by_email,
+    a.starts_at, a.owner_user_id
+"""
+LEGACY_JOINS = """
+    LEFT JOIN users owner_u ON owner_u.id = a.owner_user_id
+    LEFT JOIN users status_u ON status_u.id = a.status_updated_by_user_id
+"""
+
+# השדות שהתבנית output.html מציגה בכל שורה
+TEMPLATE_FIELDS = (
+    "id", "title", "date", "time", "location", "notes", "status",
+    "updated_at_text", "status_updated_at_text", "status_updated_by_email", "owner_email",
+)
+
+
+def legacy_from_row(r):
+    return {
+        "id": r[0],
+        "title": r[1],
+        "date": r[2],
+        "time": r[3],
+        "location": r[4] or "",
+        "notes": r[5] or "",
+        "status": r[6],
+        "updated_at": r[7],
+        "updated_at_text": format_timestamp(r[7]),
+        "status_updated_at": r[8],
+        "status_updated_at_text": format_timestamp(r[8]),
+        "created_at": r[9],
+        "owner_email": r[10] or "",
+        "status_updated_by_email": r[11] or "",
+        "starts_at": r[12],
+        "owner_user_id": r[13],
+    }
+
+
+def fetch(columns, joins, prefix, limit):
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT {columns}
+            FROM testapp_appointments a
+            {joins}
+            WHERE a.owner_user_id IN (SELECT id FROM users WHERE email LIKE %s)
+            ORDER BY a.id
+            LIMIT %s
+            """,
+            (f"{prefix}%", limit),
+        )
+        return cur.fetchall()
+
+
+def measure(name, columns, joins, build, access, prefix, limit):
+    gc.collect()
+    started = time.perf_counter()
+    rows = fetch(columns, joins, prefix, limit)
+    fetched = time.perf_counter()
+    user_cache.invalidate()
+    records = build(rows)
+    built = time.perf_counter()
+    del records
+
+    # הזיכרון נמדד בבנייה נפרדת, כי tracemalloc מאט כל הקצאה
+    user_cache.invalidate()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = build(rows)
+    del rows
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    started_access = time.perf_counter()
+    for record in records:
+        for field in TEMPLATE_FIELDS:
+            access(record, field)
+    accessed = time.perf_counter()
+
+    return {
+        "name": name,
+        "rows": len(records),
+        "query_ms": (fetched - started) * 1000,
+        "build_ms": (built - fetched) * 1000,
+        "access_ms": (accessed - started_access) * 1000,
+        "memory_mb": memory / 1024 / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dict rows with tuple-backed appointment records")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX)
+    args = parser.parse_args()
+
+    # ה-cache מתרוקן לפני כל בנייה כמו בבקשה ראשונה, כך שמפת האימיילים כוללת את השאילתה שלה
+    results = [
+        measure(
+            "dict + joins",
+            LEGACY_COLUMNS,
+            LEGACY_JOINS,
+            lambda rows: [legacy_from_row(r) for r in rows],
+            lambda record, field: record[field],
+            args.prefix,
+            args.rows,
+        ),
+        measure(
+            "Appointment + email map",
+            APPOINTMENT_LIST_COLUMNS,
+            "",
+            appointments_from_rows,
+            getattr,
+            args.prefix,
+            args.rows,
+        ),
+    ]
+    if results[0]["rows"] < args.rows:
+        print(f"only {results[0]['rows']} seeded rows found, run benchmarks/seed.py for more", file=sys.stderr)
+
+    print(f"{'mapping':<26} {'rows':>8} {'query ms':>10} {'build ms':>10} {'access ms':>10} {'memory MB':>10}")
+    for r in results:
+        print(
+            f"{r['name']:<26} {r['rows']:>8} {r['query_ms']:>10.1f} {r['build_ms']:>10.1f} "
+            f"{r['access_ms']:>10.1f} {r['memory_mb']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import asyncio
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import httpx
+
+from db import get_cursor, init_db
+from loadgen import percentile, started_server
+from passwords import password_hasher
+
+
+SUBSCRIBERS = int(os.getenv("BENCH_SUBSCRIBERS", "2000"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "5"))
+SERVER = os.getenv("BENCH_SERVER", "asgi")
+PORT = 8712
+
+
+def seed():
+    init_db()
+    password_hash = password_hasher.hash("bench")
+    suffix = os.getpid()
+    with get_cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO users (email, password_hash, is_admin)
+            VALUES (%s, %s, FALSE), (%s, %s, TRUE)
+            RETURNING id
+            """,
+            (f"bench-sse-{suffix}@example.com", password_hash, f"bench-sse-admin-{suffix}@example.com", password_hash),
+        )
+        owner_id, admin_id = [r[0] for r in cur.fetchall()]
+        cur.execute(
+            """
+            INSERT INTO testapp_appointments (title, date_text, time_text, starts_at, location, notes, owner_user_id)
+            VALUES ('bench sse', '2026-01-01', '09:00', '2026-01-01 09:00', '', '', %s)
+            RETURNING id
+            """,
+            (owner_id,),
+        )
+        appt_id = cur.fetchone()[0]
+    return owner_id, admin_id, appt_id, f"bench-sse-{suffix}@example.com", f"bench-sse-admin-{suffix}@example.com"
+
+
+def cleanup(owner_id, admin_id):
+    with get_cursor() as cur:
+        cur.execute("DELETE FROM testapp_appointments WHERE owner_user_id = %s", (owner_id,))
+        cur.execute("DELETE FROM users WHERE id IN (%s, %s)", (owner_id, admin_id))
+
+
+def rss_kb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+async def logged_in(base_url, email, connections):
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=httpx.Timeout(30, read=None))
+    res = await client.post("/login", data={"email": email, "password": "bench"})
+    assert res.status_code == 302, res.status_code
+    return client
+
+
+async def run(base_url, pid, appt_id, owner_email, admin_email):
+    owner = await logged_in(base_url, owner_email, SUBSCRIBERS + 1)
+    admin = await logged_in(base_url, admin_email, 1)
+    events = [[] for _ in range(SUBSCRIBERS + 1)]
+    connected = asyncio.Semaphore(0)
+
+    async def subscriber(index):
+        async with owner.stream("GET", "/events") as res:
+            async for line in res.aiter_lines():
+                if line.startswith("data: "):
+                    events[index].append(time.perf_counter())
+                    if len(events[index]) == 1:
+                        connected.release()
+
+    # חיבור ראשון מפעיל את חיבור ה-LISTEN, כך שהמדידה היא רק של המנויים עצמם
+    tasks = [asyncio.create_task(subscriber(0))]
+    await connected.acquire()
+    await asyncio.sleep(0.5)
+    before = rss_kb(pid)
+
+    tasks += [asyncio.create_task(subscriber(i)) for i in range(1, SUBSCRIBERS + 1)]
+    for _ in range(SUBSCRIBERS):
+        await connected.acquire()
+    await asyncio.sleep(0.5)
+    after = rss_kb(pid)
+
+    latencies = []
+    for n in range(ROUNDS):
+        expected = n + 2
+        started = time.perf_counter()
+        status = "done" if n % 2 == 0 else "planned"
+        await admin.post(f"/status/{appt_id}", data={"status": status, "next": "/output"})
+        while any(len(received) < expected for received in events):
+            await asyncio.sleep(0.005)
+        latencies.append(sorted(received[expected - 1] - started for received in events))
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await owner.aclose()
+    await admin.aclose()
+    return before, after, latencies
+
+
+def main():
+    owner_id, admin_id, appt_id, owner_email, admin_email = seed()
+    try:
+        with started_server(SERVER, PORT, 1, dict(os.environ)) as (base_url, proc):
+            before, after, latencies = asyncio.run(run(base_url, proc.pid, appt_id, owner_email, admin_email))
+    finally:
+        cleanup(owner_id, admin_id)
+
+    print(f"{SUBSCRIBERS} idle /events streams on one {SERVER} worker, {ROUNDS} status changes")
+    print(f"server RSS {before / 1024:.1f} MB -> {after / 1024:.1f} MB, {(after - before) / SUBSCRIBERS:.1f} KB per subscriber")
+    print(f"{'round':<8}{'first ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'last ms':>10}")
+    for n, values in enumerate(latencies, start=1):
+        ms = [v * 1000 for v in values]
+        print(f"{n:<8}{ms[0]:>10.1f}{percentile(ms, 0.5):>10.1f}{percentile(ms, 0.99):>10.1f}{ms[-1]:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import app as app_module
+from db import get_cursor, init_db
+from user_cache import user_cache
+
+
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "200"))
+PATHS = ["/output", "/input", "/admin/users"]
+
+
+class CountingCursor:
+    def __init__(self, cur, counter):
+        self._cur = cur
+        self._counter = counter
+
+    def execute(self, query, params=None):
+        self._counter["queries"] += 1
+        return self._cur.execute(query, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+def install_counter():
+    counter = {"queries": 0}
+
+    @contextmanager
+    def counting_get_cursor():
+        with get_cursor() as cur:
+            yield CountingCursor(cur, counter)
+
+    app_module.get_cursor = counting_get_cursor
+    return counter
+
+
+def run(client, counter, ttl):
+    user_cache.ttl = ttl
+    user_cache.invalidate()
+
+    results = {}
+    for path in PATHS:
+        client.get(path)
+        counter["queries"] = 0
+        started = time.perf_counter()
+        for _ in range(REQUESTS):
+            res = client.get(path)
+            assert res.status_code == 200, (path, res.status_code)
+        elapsed = time.perf_counter() - started
+        results[path] = (counter["queries"] / REQUESTS, elapsed / REQUESTS * 1000)
+    return results
+
+
+def main():
+    init_db()
+    email = f"bench-{os.getpid()}-{int(time.time())}@example.com"
+    client = app_module.app.test_client()
+    client.post("/register", data={"email": email, "password": "secret", "is_admin": "on"})
+    client.post("/login", data={"email": email, "password": "secret"})
+    client.post("/input", data={"title": "bench", "date": "2026-01-01", "time": "09:00"})
+
+    counter = install_counter()
+    try:
+        without_cache = run(client, counter, ttl=0)
+        with_cache = run(client, counter, ttl=30)
+    finally:
+        with get_cursor() as cur:
+            cur.execute(
+                """
+                DELETE FROM testapp_appointments
+                WHERE owner_user_id IN (SELECT id FROM users WHERE email = %s)
+                """,
+                (email,),
+            )
+            cur.execute("DELETE FROM users WHERE email = %s", (email,))
+
+    print(f"{'path':<14} {'queries/req (no cache)':>24} {'queries/req (cache)':>21} {'ms/req (no cache)':>19} {'ms/req (cache)':>16}")
+    for path in PATHS:
+        q0, ms0 = without_cache[path]
+        q1, ms1 = with_cache[path]
+        print(f"{path:<14} {q0:>24.2f} {q1:>21.2f} {ms0:>19.2f} {ms1:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
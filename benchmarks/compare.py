@@ -0,0 +1,38 @@
+import argparse
+import json
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return report["meta"], {(r["scenario"], r["concurrency"]): r for r in report["results"]}
+
+
+def change(old, new):
+    if not old:
+        return "   n/a"
+    return f"{(new - old) / old * 100:+6.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two bench_http.py JSON reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    old_meta, old = load(args.baseline)
+    new_meta, new = load(args.candidate)
+    print(f"baseline {old_meta.get('commit')} vs candidate {new_meta.get('commit')}")
+    print(f"{'scenario':<14}{'c':>5}{'req/s':>10}{'Δ':>9}{'p99 ms':>10}{'Δ':>9}")
+    for key in sorted(old.keys() & new.keys()):
+        a, b = old[key], new[key]
+        print(
+            f"{key[0]:<14}{key[1]:>5}{b['rps']:>10.1f}{change(a['rps'], b['rps']):>9}"
+            f"{b['latency_ms']['p99']:>10.1f}{change(a['latency_ms']['p99'], b['latency_ms']['p99']):>9}"
+        )
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f"{key[0]:<14}{key[1]:>5}  only in {'baseline' if key in old else 'candidate'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import subprocess
+import time
+from contextlib import contextmanager
+
+import httpx
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+SERVER_COMMANDS = {
+    "sync": ["gunicorn", "app:app", "--workers", "{workers}", "--bind", "127.0.0.1:{port}"],
+    "gthread": [
+        "gunicorn", "app:app", "--workers", "{workers}", "--threads", "{threads}", "--bind", "127.0.0.1:{port}",
+    ],
+    "asgi": ["uvicorn", "asgi_app:application", "--workers", "{workers}", "--port", "{port}", "--no-access-log"],
+}
+
+
+@contextmanager
+def running_server(kind, port, workers, env=None, threads=1):
+    with started_server(kind, port, workers, env, threads) as (base_url, _):
+        yield base_url
+
+
+@contextmanager
+def started_server(kind, port, workers, env=None, threads=1):
+    proc = subprocess.Popen(
+        [part.format(port=port, workers=workers, threads=threads) for part in SERVER_COMMANDS[kind]],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 20
+        while True:
+            try:
+                httpx.get(f"{base_url}/login", timeout=1)
+                break
+            except httpx.HTTPError:
+                if time.monotonic() > deadline or proc.poll() is not None:
+                    raise RuntimeError(f"{kind} server on port {port} did not start")
+                time.sleep(0.2)
+        yield base_url, proc
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    ms = [value * 1000 for value in latencies]
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(ms) / len(ms), 2) if ms else 0.0,
+            "p50": round(percentile(ms, 0.50), 2),
+            "p90": round(percentile(ms, 0.90), 2),
+            "p99": round(percentile(ms, 0.99), 2),
+            "max": round(ms[-1], 2) if ms else 0.0,
+        },
+    }
+
+
+async def run_load(send, concurrency, seconds):
+    # send(worker, n) שולח בקשה אחת ומחזיר True אם התשובה הייתה הצפויה
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker(index):
+        nonlocal errors
+        n = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                ok = await send(index, n)
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+            n += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
@@ -0,0 +1,144 @@
+import argparse
+import io
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from werkzeug.security import generate_password_hash
+
+from db import get_cursor, init_db
+
+
+DEFAULT_PREFIX = "bench-"
+DEFAULT_PASSWORD = "bench"
+TITLE_WORDS = ["פגישת צוות", "רופא שיניים", "ישיבת הנהלה", "שיחת לקוח", "review", "standup", "דוח רבעוני", "ראיון עבודה"]
+LOCATIONS = ["תל אביב", "ירושלים", "חיפה", "באר שבע", "Zoom", ""]
+
+
+def parse_status_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("planned", "done", "canceled") or not weight.strip().isdigit():
+            raise argparse.ArgumentTypeError(f"bad status mix entry: {part!r}")
+        mix[name] = int(weight)
+    if sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("status mix weights must add up to more than 0")
+    return mix
+
+
+def user_email(prefix, index):
+    return f"{prefix}{index}@example.com"
+
+
+def clean(prefix=DEFAULT_PREFIX):
+    with get_cursor() as cur:
+        cur.execute(
+            """
+            DELETE FROM testapp_appointments
+            WHERE owner_user_id IN (SELECT id FROM users WHERE email LIKE %s)
+            """,
+            (f"{prefix}%",),
+        )
+        appointments = cur.rowcount
+        cur.execute("DELETE FROM users WHERE email LIKE %s", (f"{prefix}%",))
+        return cur.rowcount, appointments
+
+
+def seed(users, per_user, status_mix, admins=1, prefix=DEFAULT_PREFIX, password=DEFAULT_PASSWORD):
+    # כל המשתמשים חולקים hash אחד, כך שה-seed לא מבזבז דקות על scrypt
+    password_hash = generate_password_hash(password)
+    rows = io.StringIO()
+    for i in range(users):
+        rows.write(f"{user_email(prefix, i)}\t{password_hash}\t{'t' if i < admins else 'f'}\n")
+    rows.seek(0)
+
+    total = sum(status_mix.values())
+    planned_until = status_mix.get("planned", 0) * 100 // total
+    done_until = planned_until + status_mix.get("done", 0) * 100 // total
+
+    with get_cursor() as cur:
+        cur.copy_expert("COPY users (email, password_hash, is_admin) FROM STDIN", rows)
+        cur.execute("SELECT id FROM users WHERE email LIKE %s ORDER BY id", (f"{prefix}%",))
+        owner_ids = [r[0] for r in cur.fetchall()]
+
+        # השורות נוצרות בשרת בפקודה אחת. הערכים נגזרים מהמספר הסידורי ולכן זהים בכל הרצה
+        cur.execute(
+            """
+            INSERT INTO testapp_appointments
+                (title, date_text, time_text, starts_at, location, notes, status, owner_user_id)
+            SELECT
+                (%(titles)s::text[])[(n * 7) %% cardinality(%(titles)s::text[]) + 1] || ' ' || n,
+                to_char(starts_at, 'YYYY-MM-DD'),
+                to_char(starts_at, 'HH24:MI'),
+                starts_at,
+                (%(locations)s::text[])[(n * 3) %% cardinality(%(locations)s::text[]) + 1],
+                CASE WHEN n %% 4 = 0 THEN 'הערה לפגישה ' || n ELSE '' END,
+                CASE
+                    WHEN (n * 37) %% 100 < %(planned_until)s THEN 'planned'
+                    WHEN (n * 37) %% 100 < %(done_until)s THEN 'done'
+                    ELSE 'canceled'
+                END,
+                owner_id
+            FROM unnest(%(owner_ids)s::int[]) AS owner_id
+            CROSS JOIN generate_series(1, %(per_user)s) AS n
+            CROSS JOIN LATERAL (
+                SELECT TIMESTAMP '2026-01-01 08:00'
+                    + ((n * 13) %% 730 - 365) * INTERVAL '1 day'
+                    + (n %% 10) * INTERVAL '1 hour' AS starts_at
+            ) t
+            """,
+            {
+                "titles": TITLE_WORDS,
+                "locations": LOCATIONS,
+                "planned_until": planned_until,
+                "done_until": done_until,
+                "owner_ids": owner_ids,
+                "per_user": per_user,
+            },
+        )
+        appointments = cur.rowcount
+
+    with get_cursor() as cur:
+        cur.execute("ANALYZE users")
+        cur.execute("ANALYZE testapp_appointments")
+    return len(owner_ids), appointments
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a local database with synthetic users and appointments")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--appointments-per-user", type=int, default=200)
+    parser.add_argument("--status-mix", type=parse_status_mix, default=parse_status_mix("planned=60,done=30,canceled=10"))
+    parser.add_argument("--admins", type=int, default=1, help="the first N seeded users are admins")
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX, help="email prefix that marks seeded users")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--clean", action="store_true", help="only delete users and appointments from a previous seed")
+    args = parser.parse_args()
+
+    init_db()
+    users, appointments = clean(args.prefix)
+    print(f"removed {users} seeded users and {appointments} appointments")
+    if args.clean:
+        return
+
+    started = time.perf_counter()
+    users, appointments = seed(
+        args.users,
+        args.appointments_per_user,
+        args.status_mix,
+        admins=args.admins,
+        prefix=args.prefix,
+        password=args.password,
+    )
+    elapsed = time.perf_counter() - started
+    print(f"seeded {users} users and {appointments} appointments in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
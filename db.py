@@ -1,107 +1,317 @@
 import os
+import threading
+import time
 import psycopg2
 from contextlib import contextmanager
+from psycopg2 import extensions
 
 
-def get_db_connection():
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# חיבור שעמד במנוחה יותר מכך נבדק ב-SELECT 1 לפני שהוא נמסר. 0 = בדיקה בכל שליפה
+POOL_HEALTH_CHECK_AFTER = float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER", "30"))
+
+
+class PoolTimeout(RuntimeError):
+    pass
+
+
+def get_database_url():
     database_url = os.getenv("DATABASE_URL")
     if not database_url:
         raise RuntimeError("DATABASE_URL לא מוגדר")
-    return psycopg2.connect(database_url)
+    return database_url
+
+
+def get_db_connection():
+    return psycopg2.connect(get_database_url())
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        dsn,
+        min_size=POOL_MIN_SIZE,
+        max_size=POOL_MAX_SIZE,
+        timeout=POOL_TIMEOUT,
+        health_check_after=POOL_HEALTH_CHECK_AFTER,
+    ):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("גודל מאגר חיבורים לא תקין")
+
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+
+        self._cond = threading.Condition()
+        self._idle = []
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._closed = False
+
+        for _ in range(min_size):
+            conn = self._connect()
+            self._size += 1
+            self._idle.append((conn, time.monotonic()))
+
+    def _connect(self):
+        return psycopg2.connect(self.dsn)
+
+    def _is_healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - idle_since < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def getconn(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("מאגר החיבורים סגור")
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._size < self.max_size:
+                    conn, idle_since = None, None
+                    self._size += 1
+                    self._in_use += 1
+                    break
+
+                if not waited:
+                    waited = True
+                    self._waits += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"לא התפנה חיבור למסד הנתונים תוך {timeout} שניות"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        if conn is not None and not self._is_healthy(conn, idle_since):
+            self._close_quietly(conn)
+            with self._cond:
+                self._discarded += 1
+            conn = None
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+        return conn
+
+    def putconn(self, conn, discard=False):
+        if not discard and not conn.closed:
+            status = conn.get_transaction_status()
+            if status in (extensions.TRANSACTION_STATUS_INTRANS, extensions.TRANSACTION_STATUS_INERROR):
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    discard = True
+        if not discard:
+            discard = (
+                conn.closed
+                or conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE
+            )
+
+        with self._cond:
+            self._in_use -= 1
+            if discard or self._closed:
+                self._size -= 1
+                self._discarded += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+        if discard or self._closed:
+            self._close_quietly(conn)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+            }
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = ConnectionPool(get_database_url())
+            _pool_pid = pid
+    return _pool
+
+
+def close_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        pool, _pool, _pool_pid = _pool, None, None
+    if pool is not None:
+        pool.close()
+
+
+def pool_stats():
+    if _pool is None or _pool_pid != os.getpid():
+        return None
+    return _pool.stats()
+
+
+def _reset_pool_after_fork():
+    # החיבורים שייכים לתהליך האב. סגירה שלהם מהילד תשלח Terminate על אותו socket
+    # ותפיל את החיבור של האב, לכן רק שוכחים אותם ופותחים מאגר חדש בשימוש הבא.
+    global _pool, _pool_pid, _pool_lock
+    _pool = None
+    _pool_pid = None
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+
+# מאזינים למדידת הגישה למסד (metrics.py, בדיקות). כל מאזין נקרא כ-listener(event, seconds, query, params)
+# עם event "acquire" או "query". כשאין מאזינים get_cursor לא מודד ולא עוטף את הסמן.
+_db_listeners = ()
+
+
+def add_db_listener(listener):
+    global _db_listeners
+    if listener not in _db_listeners:
+        _db_listeners = _db_listeners + (listener,)
+
+
+def remove_db_listener(listener):
+    global _db_listeners
+    _db_listeners = tuple(l for l in _db_listeners if l is not listener)
+
+
+def _notify(event, seconds, query=None, params=None):
+    for listener in _db_listeners:
+        listener(event, seconds, query, params)
+
+
+class _ObservedCursor(extensions.cursor):
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _notify("query", time.perf_counter() - started, query, vars)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _notify("query", time.perf_counter() - started, query, None)
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            _notify("query", time.perf_counter() - started, sql, None)
 
 
 @contextmanager
-def get_cursor():
-    conn = get_db_connection()
+def get_cursor(name=None, itersize=None):
+    observed = bool(_db_listeners)
+    pool = get_pool()
+    if observed:
+        started = time.perf_counter()
+        conn = pool.getconn()
+        _notify("acquire", time.perf_counter() - started)
+    else:
+        conn = pool.getconn()
+    cur = None
+    discard = False
     try:
-        cur = conn.cursor()
+        cur = conn.cursor(name=name, cursor_factory=_ObservedCursor if observed else None)
+        if itersize:
+            cur.itersize = itersize
         yield cur
         conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
+    except Exception as exc:
+        discard = isinstance(exc, (psycopg2.OperationalError, psycopg2.InterfaceError))
         try:
-            cur.close()
+            conn.rollback()
         except Exception:
-            pass
-        conn.close()
+            discard = True
+        raise
+    finally:
+        if cur is not None:
+            try:
+                cur.close()
+            except Exception:
+                pass
+        pool.putconn(conn, discard=discard)
 
 
 def init_db():
-    with get_cursor() as cur:
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                is_admin BOOLEAN NOT NULL DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            """
-        )
-
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS testapp_appointments (
-                id SERIAL PRIMARY KEY,
-                title TEXT NOT NULL,
-                date_text TEXT NOT NULL,
-                time_text TEXT NOT NULL,
-                location TEXT,
-                notes TEXT,
-                status TEXT NOT NULL DEFAULT 'planned' CHECK (status IN ('planned', 'done', 'canceled')),
-                updated_at TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            """
-        )
-
-        cur.execute(
-            """
-            ALTER TABLE testapp_appointments
-            ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'planned';
-            """
-        )
-        cur.execute(
-            """
-            DO $$
-            BEGIN
-                IF NOT EXISTS (
-                    SELECT 1
-                    FROM pg_constraint
-                    WHERE conname = 'testapp_appointments_status_check'
-                ) THEN
-                    ALTER TABLE testapp_appointments
-                    ADD CONSTRAINT testapp_appointments_status_check
-                    CHECK (status IN ('planned', 'done', 'canceled'));
-                END IF;
-            END $$;
-            """
-        )
-
-        cur.execute(
-            """
-            ALTER TABLE testapp_appointments
-            ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
-            """
-        )
-        cur.execute(
-            """
-            ALTER TABLE testapp_appointments
-            ADD COLUMN IF NOT EXISTS owner_user_id INTEGER;
-            """
-        )
-        cur.execute(
-            """
-            ALTER TABLE testapp_appointments
-            ADD COLUMN IF NOT EXISTS status_updated_at TIMESTAMP;
-            """
-        )
-        cur.execute(
-            """
-            ALTER TABLE testapp_appointments
-            ADD COLUMN IF NOT EXISTS status_updated_by_user_id INTEGER;
-            """
-        )
+    # הסכמה מנוהלת ב-migrations.py (הייבוא כאן כי migrations משתמש בחיבורים של מודול זה)
+    from migrations import migrate
+
+    migrate()
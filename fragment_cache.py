@@ -0,0 +1,163 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+# memory: LRU בתוך התהליך. sqlite: קובץ מקומי שכל ה-workers על אותה מכונה חולקים. off: בלי קאש
+FRAGMENT_CACHE_BACKEND = os.getenv("FRAGMENT_CACHE_BACKEND", "memory")
+FRAGMENT_CACHE_MAX_ENTRIES = int(os.getenv("FRAGMENT_CACHE_MAX_ENTRIES", "1000"))
+
+
+def default_cache_path():
+    # קובץ נפרד לכל מסד: המפתחות בנויים ממזהים ומגרסאות שמתחילים מאפס בכל מסד, ושני מסדים
+    # על אותה מכונה (פיתוח ובדיקות למשל) היו מקבלים זה את ה-HTML של זה
+    database = hashlib.sha256(os.getenv("DATABASE_URL", "").encode()).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"testapp-fragments-{database}.sqlite3")
+
+
+FRAGMENT_CACHE_PATH = os.getenv("FRAGMENT_CACHE_PATH") or default_cache_path()
+
+
+def fragment_key(*parts):
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+class MemoryBackend:
+    def __init__(self, max_entries=FRAGMENT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        evicted = 0
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SqliteBackend:
+    # חיבור לכל thread ולכל תהליך: חיבור sqlite לא עובר בבטחה בין threads ולא דרך fork
+    def __init__(self, path=FRAGMENT_CACHE_PATH, max_entries=FRAGMENT_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS fragments (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    used_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS fragments_used_at ON fragments (used_at)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute("SELECT value FROM fragments WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE fragments SET used_at = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def set(self, key, value):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO fragments (key, value, used_at) VALUES (?, ?, ?)",
+            (key, value, time.time()),
+        )
+        return conn.execute(
+            """
+            DELETE FROM fragments
+            WHERE key IN (SELECT key FROM fragments ORDER BY used_at DESC LIMIT -1 OFFSET ?)
+            """,
+            (self.max_entries,),
+        ).rowcount
+
+    def clear(self):
+        self._conn().execute("DELETE FROM fragments")
+
+    def size(self):
+        return self._conn().execute("SELECT COUNT(*) FROM fragments").fetchone()[0]
+
+
+class FragmentCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_render(self, key, render):
+        if self.backend is None:
+            return render()
+
+        value = self.backend.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        value = render()
+        evicted = self.backend.set(key, value)
+        with self._lock:
+            self.misses += 1
+            self.evictions += evicted
+        return value
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+        stats["size"] = self.backend.size() if self.backend is not None else 0
+        return stats
+
+
+def make_backend(name=FRAGMENT_CACHE_BACKEND):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SqliteBackend()
+    if name == "off":
+        return None
+    raise ValueError(f"FRAGMENT_CACHE_BACKEND לא מוכר: {name}")
+
+
+fragment_cache = FragmentCache(make_backend())
@@ -1,72 +1,14 @@
 import os
-import psycopg2
 
-
-DDL_STATEMENTS = [
-    """
-    CREATE TABLE IF NOT EXISTS users (
-      id SERIAL PRIMARY KEY,
-      email TEXT UNIQUE NOT NULL,
-      password_hash TEXT NOT NULL,
-      is_admin BOOLEAN NOT NULL DEFAULT FALSE,
-      created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
-    );
-    """,
-    """
-    CREATE TABLE IF NOT EXISTS testapp_appointments (
-      id SERIAL PRIMARY KEY,
-      owner_user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
-
-      title TEXT NOT NULL,
-      date_text TEXT NOT NULL,
-      time_text TEXT NOT NULL,
-      location TEXT,
-      notes TEXT,
-
-      status TEXT NOT NULL DEFAULT 'planned',
-      updated_at TIMESTAMP,
-      status_updated_at TIMESTAMP,
-      status_updated_by_user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
-
-      created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
-    );
-    """,
-    """
-    DO $$
-    BEGIN
-      IF NOT EXISTS (
-        SELECT 1
-        FROM pg_constraint
-        WHERE conname = 'testapp_appointments_status_check'
-      ) THEN
-        ALTER TABLE testapp_appointments
-        ADD CONSTRAINT testapp_appointments_status_check
-        CHECK (status IN ('planned', 'done', 'canceled'));
-      END IF;
-    END $$;
-    """,
-    """
-    CREATE INDEX IF NOT EXISTS idx_testapp_appointments_owner_user_id
-      ON testapp_appointments(owner_user_id);
-    """,
-    """
-    CREATE INDEX IF NOT EXISTS idx_testapp_appointments_created_at
-      ON testapp_appointments(created_at);
-    """,
-]
+from migrations import LATEST_VERSION, migrate
 
 
 def main():
-    database_url = os.environ.get("DATABASE_URL")
-    if not database_url:
+    if not os.environ.get("DATABASE_URL"):
         raise RuntimeError("DATABASE_URL לא מוגדר")
 
-    with psycopg2.connect(database_url) as conn:
-        with conn.cursor() as cur:
-            for stmt in DDL_STATEMENTS:
-                cur.execute(stmt)
-
-    print("DB init done")
+    applied = migrate(log=print)
+    print(f"DB init done (schema version {LATEST_VERSION}, applied {len(applied)})")
 
 
 if __name__ == "__main__":
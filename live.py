@@ -0,0 +1,188 @@
+import asyncio
+import os
+import random
+import select
+import threading
+import time
+
+import psycopg2
+
+from db import get_db_connection
+from migrations import APPOINTMENTS_CHANNEL
+
+
+# כל כמה שניות חיבור SSE שקט מקבל הערת keepalive, כדי ש-proxy לא יסגור אותו ושלקוח שנעלם יתגלה
+LIVE_HEARTBEAT = float(os.getenv("LIVE_HEARTBEAT", "25"))
+LIVE_RECONNECT_DELAY = float(os.getenv("LIVE_RECONNECT_DELAY", "2"))
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+SSE_KEEPALIVE = ": keepalive\n\n"
+
+
+def sse_event(version):
+    return f"event: appointments\ndata: {version}\n\n"
+
+
+def sse_retry():
+    # פיזור זמן החיבור מחדש, כדי שאלפי דפדפנים לא יחזרו באותו רגע אחרי נפילה
+    return f"retry: {random.randint(2000, 6000)}\n\n"
+
+
+class Subscription:
+    # מנוי רק זוכר את הגרסה האחרונה. כמה הודעות ברצף מתאחדות לאירוע אחד
+    __slots__ = ("owner_user_id", "version", "closed", "wake")
+
+    def __init__(self, owner_user_id, wake):
+        self.owner_user_id = owner_user_id
+        self.version = None
+        self.closed = False
+        self.wake = wake
+
+
+def _wake(subscription):
+    try:
+        subscription.wake()
+    except RuntimeError:
+        # לולאת האירועים של המנוי כבר נסגרה, והוא יוסר כשה-generator שלו ייסגר
+        pass
+
+
+class LiveHub:
+    # חיבור LISTEN אחד לכל תהליך, בלי קשר למספר הדפדפנים המחוברים
+    def __init__(self, channel=APPOINTMENTS_CHANNEL):
+        self.channel = channel
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._thread = None
+        self._pid = None
+        self.ready = threading.Event()
+        self.notifications = 0
+        self.reconnects = 0
+
+    def subscribe(self, owner_user_id, wake):
+        subscription = Subscription(owner_user_id, wake)
+        with self._lock:
+            self._subscribers.setdefault(owner_user_id, set()).add(subscription)
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self.ready.clear()
+                self._thread = threading.Thread(target=self._listen, name="live-listen", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            group = self._subscribers.get(subscription.owner_user_id)
+            if group is not None:
+                group.discard(subscription)
+                if not group:
+                    del self._subscribers[subscription.owner_user_id]
+
+    def publish(self, owner_user_id, version):
+        with self._lock:
+            self.notifications += 1
+            group = list(self._subscribers.get(owner_user_id, ()))
+        for subscription in group:
+            subscription.version = version
+            _wake(subscription)
+
+    def close_all(self):
+        with self._lock:
+            subscriptions = [s for group in self._subscribers.values() for s in group]
+        for subscription in subscriptions:
+            subscription.closed = True
+            _wake(subscription)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": sum(len(group) for group in self._subscribers.values()),
+                "notifications": self.notifications,
+                "reconnects": self.reconnects,
+            }
+
+    def _listen(self):
+        while True:
+            conn = None
+            try:
+                conn = get_db_connection()
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {self.channel}")
+                    self.ready.set()
+                    while True:
+                        if not select.select([conn], [], [], LIVE_HEARTBEAT)[0]:
+                            # שקט ארוך: בדיקה שהחיבור עוד חי, אחרת נפילה שקטה לא תתגלה
+                            cur.execute("SELECT 1")
+                            continue
+                        conn.poll()
+                        while conn.notifies:
+                            notify = conn.notifies.pop(0)
+                            owner, _, version = notify.payload.partition(":")
+                            self.publish(int(owner), version)
+            except (psycopg2.Error, OSError, ValueError):
+                pass
+            finally:
+                self.ready.clear()
+                if conn is not None:
+                    conn.close()
+
+            # הודעות מזמן הנפילה אבדו. החיבורים נסגרים, הדפדפנים מתחברים מחדש ומקבלים את הגרסה מהמסד
+            with self._lock:
+                self.reconnects += 1
+            self.close_all()
+            time.sleep(LIVE_RECONNECT_DELAY)
+
+
+def stream_events(owner_user_id, load_version, hub=None):
+    hub = hub or live_hub
+    wake = threading.Event()
+    subscription = hub.subscribe(owner_user_id, wake.set)
+    try:
+        hub.ready.wait(LIVE_RECONNECT_DELAY)
+        # הגרסה נקראת אחרי ההרשמה, כך ששינוי שקורה בינתיים לא הולך לאיבוד
+        last = load_version()
+        yield sse_retry()
+        yield sse_event(last)
+        while not subscription.closed:
+            woken = wake.wait(LIVE_HEARTBEAT)
+            wake.clear()
+            if subscription.closed:
+                break
+            if subscription.version is not None and subscription.version != last:
+                last = subscription.version
+                yield sse_event(last)
+            elif not woken:
+                yield SSE_KEEPALIVE
+    finally:
+        hub.unsubscribe(subscription)
+
+
+async def stream_events_async(owner_user_id, load_version, hub=None):
+    hub = hub or live_hub
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+    subscription = hub.subscribe(owner_user_id, lambda: loop.call_soon_threadsafe(wake.set))
+    try:
+        if not hub.ready.is_set():
+            await asyncio.to_thread(hub.ready.wait, LIVE_RECONNECT_DELAY)
+        last = await load_version()
+        yield sse_retry()
+        yield sse_event(last)
+        while not subscription.closed:
+            # טיימר ולא wait_for: מנוי שקט לא מחזיק task נוסף, שזה רוב הזיכרון שלו אחרי החיבור עצמו
+            heartbeat = loop.call_later(LIVE_HEARTBEAT, wake.set)
+            await wake.wait()
+            heartbeat.cancel()
+            wake.clear()
+            if subscription.closed:
+                break
+            if subscription.version is not None and subscription.version != last:
+                last = subscription.version
+                yield sse_event(last)
+            else:
+                yield SSE_KEEPALIVE
+    finally:
+        hub.unsubscribe(subscription)
+
+
+live_hub = LiveHub()
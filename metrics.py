@@ -0,0 +1,205 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+
+from flask import before_render_template, g, request, template_rendered
+
+from db import add_db_listener, pool_stats
+from fragment_cache import fragment_cache
+from live import live_hub
+from passwords import password_hasher
+
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# המדידות של הבקשה הנוכחית. contextvar ולא g כדי שגם מאזין ה-DB, שלא תלוי ב-Flask,
+# ימצא אותן, ושאילתות מ-threads אחרים (למשל ייצוא) לא ייזקפו לבקשה.
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+def new_request_metrics():
+    return {"queries": 0, "db": 0.0, "acquire": 0.0, "render": 0.0, "render_started": None}
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def observe(self, endpoint, seconds, stats):
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None:
+                entry = {
+                    "buckets": [0] * (len(self.buckets) + 1),
+                    "count": 0,
+                    "sum": 0.0,
+                    "queries": 0,
+                    "db": 0.0,
+                    "acquire": 0.0,
+                    "render": 0.0,
+                }
+                self._endpoints[endpoint] = entry
+            entry["buckets"][bisect.bisect_left(self.buckets, seconds)] += 1
+            entry["count"] += 1
+            entry["sum"] += seconds
+            entry["queries"] += stats["queries"]
+            entry["db"] += stats["db"]
+            entry["acquire"] += stats["acquire"]
+            entry["render"] += stats["render"]
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(entry, buckets=list(entry["buckets"])) for name, entry in self._endpoints.items()}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+registry = MetricsRegistry()
+
+
+def _on_db_event(event, seconds, query, params):
+    stats = _current.get()
+    if stats is None:
+        return
+    if event == "query":
+        stats["queries"] += 1
+        stats["db"] += seconds
+    else:
+        stats["acquire"] += seconds
+
+
+def _on_render_start(sender, template, context, **extra):
+    stats = _current.get()
+    if stats is not None:
+        stats["render_started"] = time.perf_counter()
+
+
+def _on_render_end(sender, template, context, **extra):
+    stats = _current.get()
+    if stats is not None and stats["render_started"] is not None:
+        stats["render"] += time.perf_counter() - stats["render_started"]
+        stats["render_started"] = None
+
+
+def _start_request():
+    g._metrics_started = time.perf_counter()
+    g._metrics_token = _current.set(new_request_metrics())
+
+
+def _finish_request(response):
+    stats = _current.get()
+    if stats is None or not hasattr(g, "_metrics_started"):
+        return response
+
+    total = time.perf_counter() - g._metrics_started
+    registry.observe(request.endpoint or "unmatched", total, stats)
+    response.headers["Server-Timing"] = server_timing(stats, total)
+    return response
+
+
+def _end_request(exc):
+    token = g.pop("_metrics_token", None)
+    if token is not None:
+        _current.reset(token)
+
+
+def server_timing(stats, total):
+    return ", ".join(
+        [
+            f'db;dur={stats["db"] * 1000:.2f};desc="{stats["queries"]} queries"',
+            f'db-acquire;dur={stats["acquire"] * 1000:.2f}',
+            f'render;dur={stats["render"] * 1000:.2f}',
+            f"total;dur={total * 1000:.2f}",
+        ]
+    )
+
+
+def init_app(app):
+    if not METRICS_ENABLED:
+        return
+    add_db_listener(_on_db_event)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_end_request)
+    before_render_template.connect(_on_render_start, app)
+    template_rendered.connect(_on_render_end, app)
+
+
+def _format_labels(**labels):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+def render_metrics():
+    lines = []
+    endpoints = sorted(registry.snapshot().items())
+
+    lines.append("# HELP testapp_request_duration_seconds Request latency by Flask endpoint.")
+    lines.append("# TYPE testapp_request_duration_seconds histogram")
+    for name, entry in endpoints:
+        cumulative = 0
+        for bound, count in zip(registry.buckets + ("+Inf",), entry["buckets"]):
+            cumulative += count
+            lines.append(f"testapp_request_duration_seconds_bucket{_format_labels(endpoint=name, le=bound)} {cumulative}")
+        lines.append(f"testapp_request_duration_seconds_sum{_format_labels(endpoint=name)} {entry['sum']:.6f}")
+        lines.append(f"testapp_request_duration_seconds_count{_format_labels(endpoint=name)} {entry['count']}")
+
+    counters = (
+        ("testapp_db_queries_total", "SQL statements executed while serving the endpoint.", "queries", "{}"),
+        ("testapp_db_seconds_total", "Time spent executing SQL.", "db", "{:.6f}"),
+        ("testapp_db_acquire_seconds_total", "Time spent waiting for a pooled connection.", "acquire", "{:.6f}"),
+        ("testapp_template_render_seconds_total", "Time spent rendering templates.", "render", "{:.6f}"),
+    )
+    for metric, help_text, key, fmt in counters:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for name, entry in endpoints:
+            lines.append(f"{metric}{_format_labels(endpoint=name)} {fmt.format(entry[key])}")
+
+    stats = pool_stats()
+    if stats is not None:
+        lines.append("# HELP testapp_db_pool_connections Connections in this process's pool.")
+        lines.append("# TYPE testapp_db_pool_connections gauge")
+        for state in ("in_use", "idle", "waiting"):
+            lines.append(f"testapp_db_pool_connections{_format_labels(state=state)} {stats[state]}")
+        lines.append("# TYPE testapp_db_pool_waits_total counter")
+        lines.append(f"testapp_db_pool_waits_total {stats['waits']}")
+        lines.append("# TYPE testapp_db_pool_timeouts_total counter")
+        lines.append(f"testapp_db_pool_timeouts_total {stats['timeouts']}")
+
+    cache = fragment_cache.stats()
+    lines.append("# HELP testapp_fragment_cache_requests_total Rendered appointment tables served from or added to the cache.")
+    lines.append("# TYPE testapp_fragment_cache_requests_total counter")
+    lines.append(f"testapp_fragment_cache_requests_total{_format_labels(result='hit')} {cache['hits']}")
+    lines.append(f"testapp_fragment_cache_requests_total{_format_labels(result='miss')} {cache['misses']}")
+    lines.append("# TYPE testapp_fragment_cache_evictions_total counter")
+    lines.append(f"testapp_fragment_cache_evictions_total {cache['evictions']}")
+    lines.append("# TYPE testapp_fragment_cache_entries gauge")
+    lines.append(f"testapp_fragment_cache_entries {cache['size']}")
+
+    live = live_hub.stats()
+    lines.append("# HELP testapp_live_subscribers Open /events streams in this process.")
+    lines.append("# TYPE testapp_live_subscribers gauge")
+    lines.append(f"testapp_live_subscribers {live['subscribers']}")
+    lines.append("# TYPE testapp_live_notifications_total counter")
+    lines.append(f"testapp_live_notifications_total {live['notifications']}")
+    lines.append("# TYPE testapp_live_reconnects_total counter")
+    lines.append(f"testapp_live_reconnects_total {live['reconnects']}")
+
+    hashing = password_hasher.stats()
+    lines.append("# HELP testapp_password_hash_pending Password hashes running or queued in this process.")
+    lines.append("# TYPE testapp_password_hash_pending gauge")
+    lines.append(f"testapp_password_hash_pending {hashing['pending']}")
+    lines.append("# HELP testapp_password_hash_rejected_total Logins and registrations turned away because the hash queue was full.")
+    lines.append("# TYPE testapp_password_hash_rejected_total counter")
+    lines.append(f"testapp_password_hash_rejected_total {hashing['rejected']}")
+    lines.append("# TYPE testapp_password_rehashed_total counter")
+    lines.append(f"testapp_password_rehashed_total {hashing['rehashed']}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,782 @@
+import argparse
+import os
+
+import psycopg2
+
+from db import get_cursor, get_db_connection
+
+
+# מפתח ה-advisory lock שמבטיח שרק תהליך אחד מריץ מיגרציות בכל רגע
+MIGRATION_LOCK_KEY = 74657301
+# מיגרציה שלא מקבלת נעילה בזמן הזה נכשלת, במקום לעמוד בתור ולחסום את כל השאילתות שאחריה
+MIGRATION_LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "30s")
+
+SCHEMA_VERSION_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+TRY_TIMESTAMP_FUNCTION = """
+    CREATE OR REPLACE FUNCTION testapp_try_timestamp(date_text TEXT, time_text TEXT)
+    RETURNS TIMESTAMP
+    LANGUAGE plpgsql
+    STABLE
+    AS $$
+    BEGIN
+        RETURN date_text::date + time_text::time;
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END;
+    $$;
+"""
+
+
+# סיכום ספירת הסטטוסים לכל בעלים. הטריגרים ברמת משפט עם טבלאות מעבר, כך שגם
+# עדכון/מחיקה מרובי שורות ו-COPY מעדכנים כל בעלים בפקודה אחת ולא שורה-שורה.
+STATUS_COUNTS_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS appointment_status_counts (
+        owner_user_id INTEGER PRIMARY KEY,
+        planned INTEGER NOT NULL DEFAULT 0,
+        done INTEGER NOT NULL DEFAULT 0,
+        canceled INTEGER NOT NULL DEFAULT 0
+    );
+    """,
+    """
+    CREATE OR REPLACE FUNCTION testapp_apply_status_counts()
+    RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+    DECLARE
+        changes TEXT;
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            DELETE FROM appointment_status_counts;
+            RETURN NULL;
+        ELSIF TG_OP = 'INSERT' THEN
+            changes := 'SELECT owner_user_id, status, 1 AS delta FROM new_rows';
+        ELSIF TG_OP = 'DELETE' THEN
+            changes := 'SELECT owner_user_id, status, -1 AS delta FROM old_rows';
+        ELSE
+            changes := 'SELECT owner_user_id, status, 1 AS delta FROM new_rows '
+                       'UNION ALL SELECT owner_user_id, status, -1 AS delta FROM old_rows';
+        END IF;
+
+        EXECUTE format(
+            $sql$
+            INSERT INTO appointment_status_counts AS c (owner_user_id, planned, done, canceled)
+            SELECT *
+            FROM (
+                SELECT
+                    owner_user_id,
+                    COALESCE(SUM(delta) FILTER (WHERE status = 'planned'), 0) AS planned,
+                    COALESCE(SUM(delta) FILTER (WHERE status = 'done'), 0) AS done,
+                    COALESCE(SUM(delta) FILTER (WHERE status = 'canceled'), 0) AS canceled
+                FROM (%s) changes
+                WHERE owner_user_id IS NOT NULL
+                GROUP BY owner_user_id
+            ) deltas
+            WHERE planned <> 0 OR done <> 0 OR canceled <> 0
+            ORDER BY owner_user_id
+            ON CONFLICT (owner_user_id) DO UPDATE
+            SET planned = c.planned + EXCLUDED.planned,
+                done = c.done + EXCLUDED.done,
+                canceled = c.canceled + EXCLUDED.canceled
+            $sql$,
+            changes
+        );
+        RETURN NULL;
+    END;
+    $$;
+    """,
+    """
+    CREATE OR REPLACE TRIGGER testapp_appointments_counts_insert
+    AFTER INSERT ON testapp_appointments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION testapp_apply_status_counts();
+    """,
+    """
+    CREATE OR REPLACE TRIGGER testapp_appointments_counts_update
+    AFTER UPDATE ON testapp_appointments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION testapp_apply_status_counts();
+    """,
+    """
+    CREATE OR REPLACE TRIGGER testapp_appointments_counts_delete
+    AFTER DELETE ON testapp_appointments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION testapp_apply_status_counts();
+    """,
+    """
+    CREATE OR REPLACE TRIGGER testapp_appointments_counts_truncate
+    AFTER TRUNCATE ON testapp_appointments
+    FOR EACH STATEMENT EXECUTE FUNCTION testapp_apply_status_counts();
+    """,
+]
+
+# גרסת נתונים לכל בעלים, לקאש של הטבלאות המרונדרות ול-ETag של ה-API. כל משפט שנוגע בפגישות
+# של בעלים מקדם את הגרסה שלו, גם בלי שינוי סטטוס. הערכים באים מ-sequence ולכן לא חוזרים
+# על עצמם גם אחרי TRUNCATE או בנייה מחדש של הטבלה, ומפתח קאש ישן לא יתאים לנתונים חדשים.
+DATA_VERSION_DDL = [
+    "CREATE SEQUENCE IF NOT EXISTS testapp_data_version_seq",
+    """
+    ALTER TABLE appointment_status_counts
+    ADD COLUMN IF NOT EXISTS data_version BIGINT NOT NULL DEFAULT nextval('testapp_data_version_seq'),
+    ADD COLUMN IF NOT EXISTS changed_at TIMESTAMPTZ NOT NULL DEFAULT now();
+    """,
+    """
+    CREATE OR REPLACE FUNCTION testapp_apply_status_counts()
+    RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+    DECLARE
+        changes TEXT;
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            DELETE FROM appointment_status_counts;
+            RETURN NULL;
+        ELSIF TG_OP = 'INSERT' THEN
+            changes := 'SELECT owner_user_id, status, 1 AS delta FROM new_rows';
+        ELSIF TG_OP = 'DELETE' THEN
+            changes := 'SELECT owner_user_id, status, -1 AS delta FROM old_rows';
+        ELSE
+            changes := 'SELECT owner_user_id, status, 1 AS delta FROM new_rows '
+                       'UNION ALL SELECT owner_user_id, status, -1 AS delta FROM old_rows';
+        END IF;
+
+        EXECUTE format(
+            $sql$
+            INSERT INTO appointment_status_counts AS c (owner_user_id, planned, done, canceled)
+            SELECT
+                owner_user_id,
+                COALESCE(SUM(delta) FILTER (WHERE status = 'planned'), 0),
+                COALESCE(SUM(delta) FILTER (WHERE status = 'done'), 0),
+                COALESCE(SUM(delta) FILTER (WHERE status = 'canceled'), 0)
+            FROM (%s) changes
+            WHERE owner_user_id IS NOT NULL
+            GROUP BY owner_user_id
+            ORDER BY owner_user_id
+            ON CONFLICT (owner_user_id) DO UPDATE
+            SET planned = c.planned + EXCLUDED.planned,
+                done = c.done + EXCLUDED.done,
+                canceled = c.canceled + EXCLUDED.canceled,
+                data_version = nextval('testapp_data_version_seq'),
+                changed_at = now()
+            $sql$,
+            changes
+        );
+        RETURN NULL;
+    END;
+    $$;
+    """,
+]
+
+# הודעה לכל בעלים שהגרסה שלו קודמה, עם "<owner_user_id>:<data_version>". NOTIFY נשלח רק
+# ב-commit, והודעות זהות באותה טרנזקציה מתאחדות, כך שפעולה מרובת שורות שולחת הודעה אחת לבעלים.
+APPOINTMENTS_CHANNEL = "testapp_appointments"
+
+NOTIFY_DDL = [
+    f"""
+    CREATE OR REPLACE FUNCTION testapp_apply_status_counts()
+    RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+    DECLARE
+        changes TEXT;
+        changed RECORD;
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            DELETE FROM appointment_status_counts;
+            RETURN NULL;
+        ELSIF TG_OP = 'INSERT' THEN
+            changes := 'SELECT owner_user_id, status, 1 AS delta FROM new_rows';
+        ELSIF TG_OP = 'DELETE' THEN
+            changes := 'SELECT owner_user_id, status, -1 AS delta FROM old_rows';
+        ELSE
+            changes := 'SELECT owner_user_id, status, 1 AS delta FROM new_rows '
+                       'UNION ALL SELECT owner_user_id, status, -1 AS delta FROM old_rows';
+        END IF;
+
+        FOR changed IN EXECUTE format(
+            $sql$
+            INSERT INTO appointment_status_counts AS c (owner_user_id, planned, done, canceled)
+            SELECT
+                owner_user_id,
+                COALESCE(SUM(delta) FILTER (WHERE status = 'planned'), 0),
+                COALESCE(SUM(delta) FILTER (WHERE status = 'done'), 0),
+                COALESCE(SUM(delta) FILTER (WHERE status = 'canceled'), 0)
+            FROM (%s) changes
+            WHERE owner_user_id IS NOT NULL
+            GROUP BY owner_user_id
+            ORDER BY owner_user_id
+            ON CONFLICT (owner_user_id) DO UPDATE
+            SET planned = c.planned + EXCLUDED.planned,
+                done = c.done + EXCLUDED.done,
+                canceled = c.canceled + EXCLUDED.canceled,
+                data_version = nextval('testapp_data_version_seq'),
+                changed_at = now()
+            RETURNING c.owner_user_id, c.data_version
+            $sql$,
+            changes
+        ) LOOP
+            PERFORM pg_notify('{APPOINTMENTS_CHANNEL}', changed.owner_user_id || ':' || changed.data_version);
+        END LOOP;
+        RETURN NULL;
+    END;
+    $$;
+    """,
+]
+
+# היסטוריית מעברי סטטוס: טבלה שרק מוסיפים אליה, מחולקת לפי חודש, כך שהטבלה החמה לא גדלה
+# ושאילתה על טווח זמן קוראת רק את החודשים שבטווח. השורות נכתבות מטריגר ברמת משפט, באותה
+# טרנזקציה של העדכון, ולכן גם עדכון מרובה (bulk) נרשם. אין מפתח זר לפגישה, כדי שההיסטוריה
+# תישאר גם אחרי מחיקה.
+STATUS_EVENTS_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS appointment_status_events (
+        appointment_id INTEGER NOT NULL,
+        owner_user_id INTEGER,
+        old_status TEXT,
+        new_status TEXT NOT NULL,
+        changed_at TIMESTAMP NOT NULL,
+        changed_by_user_id INTEGER REFERENCES users(id) ON DELETE SET NULL
+    ) PARTITION BY RANGE (changed_at);
+    """,
+    # BRIN קטן מאוד ומתאים לעמודה שגדלה עם סדר ההכנסה. אינדקס על הטבלה האב נוצר בכל מחיצה חדשה
+    """
+    CREATE INDEX IF NOT EXISTS idx_appointment_status_events_changed_at
+    ON appointment_status_events USING BRIN (changed_at);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_appointment_status_events_appointment
+    ON appointment_status_events (appointment_id, changed_at);
+    """,
+    """
+    CREATE OR REPLACE FUNCTION testapp_status_events_partition(at TIMESTAMP)
+    RETURNS TEXT
+    LANGUAGE plpgsql
+    AS $$
+    DECLARE
+        month_start TIMESTAMP := date_trunc('month', at);
+        partition_name TEXT := 'appointment_status_events_' || to_char(at, 'YYYY_MM');
+    BEGIN
+        IF to_regclass(partition_name) IS NOT NULL THEN
+            RETURN partition_name;
+        END IF;
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF appointment_status_events FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, month_start + INTERVAL '1 month'
+            );
+        EXCEPTION WHEN duplicate_table OR unique_violation THEN
+            -- טרנזקציה מקבילה יצרה את אותה מחיצה
+            NULL;
+        END;
+        RETURN partition_name;
+    END;
+    $$;
+    """,
+    # מי ששינה נרשם רק כשהעדכון קבע status_updated_by_user_id. השלמה ע"י הבעלים לא נוגעת בו
+    """
+    CREATE OR REPLACE FUNCTION testapp_record_status_events()
+    RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+    BEGIN
+        PERFORM testapp_status_events_partition(LOCALTIMESTAMP);
+        INSERT INTO appointment_status_events
+            (appointment_id, owner_user_id, old_status, new_status, changed_at, changed_by_user_id)
+        SELECT
+            n.id,
+            n.owner_user_id,
+            o.status,
+            n.status,
+            LOCALTIMESTAMP,
+            CASE WHEN n.status_updated_at IS DISTINCT FROM o.status_updated_at THEN n.status_updated_by_user_id END
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        WHERE n.status IS DISTINCT FROM o.status;
+        RETURN NULL;
+    END;
+    $$;
+    """,
+    """
+    CREATE OR REPLACE TRIGGER testapp_appointments_status_events
+    AFTER UPDATE ON testapp_appointments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION testapp_record_status_events();
+    """,
+    # החודש הנוכחי והבא נוצרים מראש, כך שה-DDL לא קורה בתוך עדכון של משתמש
+    "SELECT testapp_status_events_partition(LOCALTIMESTAMP)",
+    "SELECT testapp_status_events_partition(LOCALTIMESTAMP + INTERVAL '1 month')",
+]
+
+# חיפוש טקסט מלא. התצורה simple לא מבצעת stemming ולכן מתאימה גם לעברית, והאינדקס
+# הטריגרמי משמש לחלקי מילים (למשל "תל" בתוך "בתל-אביב"). אם pg_trgm לא זמין החיפוש
+# החלקי עדיין עובד, רק בסריקה של השורות של אותו בעלים.
+SEARCH_TEXT_EXPRESSION = "(title || ' ' || COALESCE(location, '') || ' ' || COALESCE(notes, ''))"
+
+SEARCH_VECTOR_EXPRESSION = """
+    setweight(to_tsvector('simple', COALESCE({row}title, '')), 'A')
+    || setweight(to_tsvector('simple', COALESCE({row}location, '')), 'B')
+    || setweight(to_tsvector('simple', COALESCE({row}notes, '')), 'C')
+"""
+
+# עמודה מחושבת (GENERATED ... STORED) הייתה כותבת מחדש את כל הטבלה תחת ACCESS EXCLUSIVE.
+# במקום זה: עמודה רגילה שמתווספת בלי לגעת בשורות, טריגר לשורות חדשות ומעודכנות, מילוי
+# השורות הקיימות באצוות קצרות, והאינדקס נבנה CONCURRENTLY במיגרציה 6.
+# במסדים שכבר הריצו את הגרסה הקודמת של המיגרציה העמודה נשארת מחושבת, ושם אין צורך בטריגר.
+SEARCH_BACKFILL_BATCH_SIZE = int(os.getenv("SEARCH_BACKFILL_BATCH_SIZE", "1000"))
+
+SEARCH_COLUMN_DDL = [
+    "ALTER TABLE testapp_appointments ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    f"""
+    CREATE OR REPLACE FUNCTION testapp_search_vector()
+    RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+    BEGIN
+        NEW.search_vector := {SEARCH_VECTOR_EXPRESSION.format(row="NEW.").strip()};
+        RETURN NEW;
+    END;
+    $$;
+    """,
+]
+
+
+def search_vector_trigger_sql(table):
+    return f"""
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM pg_attribute
+            WHERE attrelid = '{table}'::regclass AND attname = 'search_vector' AND attgenerated = ''
+        ) THEN
+            CREATE OR REPLACE TRIGGER {table}_search_vector
+            BEFORE INSERT OR UPDATE OF title, location, notes ON {table}
+            FOR EACH ROW EXECUTE FUNCTION testapp_search_vector();
+        END IF;
+    END $$;
+    """
+
+
+def backfill_search_vector(cur):
+    # כל אצווה היא טרנזקציה קצרה משלה (המיגרציה לא transactional), כך שנעילות השורות לא מצטברות.
+    # ההתקדמות לפי המפתח הראשי ולא לפי search_vector IS NULL, שאין עליו אינדקס: אחרת כל אצווה
+    # הייתה סורקת מחדש את כל השורות שכבר מולאו
+    last_id = 0
+    while True:
+        cur.execute(
+            f"""
+            WITH batch AS (
+                SELECT id FROM testapp_appointments
+                WHERE id > %s
+                ORDER BY id
+                LIMIT %s
+            ),
+            filled AS (
+                UPDATE testapp_appointments a
+                SET search_vector = {SEARCH_VECTOR_EXPRESSION.format(row="a.").strip()}
+                FROM batch
+                WHERE a.id = batch.id AND a.search_vector IS NULL
+            )
+            SELECT MAX(id) FROM batch
+            """,
+            (last_id, SEARCH_BACKFILL_BATCH_SIZE),
+        )
+        last_id = cur.fetchone()[0]
+        if last_id is None:
+            return
+
+
+REBUILD_STATUS_COUNTS_SQL = """
+    LOCK TABLE testapp_appointments IN SHARE MODE;
+    DELETE FROM appointment_status_counts;
+    INSERT INTO appointment_status_counts (owner_user_id, planned, done, canceled)
+    SELECT
+        owner_user_id,
+        COUNT(*) FILTER (WHERE status = 'planned'),
+        COUNT(*) FILTER (WHERE status = 'done'),
+        COUNT(*) FILTER (WHERE status = 'canceled')
+    FROM testapp_appointments
+    WHERE owner_user_id IS NOT NULL
+    GROUP BY owner_user_id;
+"""
+
+# מאז הארכיון הספירה היא של שתי הטבלאות. מיגרציה 7 נשארת עם הגרסה הקודמת, שרצה לפני שיש ארכיון
+REBUILD_ALL_STATUS_COUNTS_SQL = """
+    LOCK TABLE testapp_appointments, testapp_appointments_archive IN SHARE MODE;
+    DELETE FROM appointment_status_counts;
+    INSERT INTO appointment_status_counts (owner_user_id, planned, done, canceled)
+    SELECT
+        owner_user_id,
+        COUNT(*) FILTER (WHERE status = 'planned'),
+        COUNT(*) FILTER (WHERE status = 'done'),
+        COUNT(*) FILTER (WHERE status = 'canceled')
+    FROM (
+        SELECT owner_user_id, status FROM testapp_appointments
+        UNION ALL
+        SELECT owner_user_id, status FROM testapp_appointments_archive
+    ) a
+    WHERE owner_user_id IS NOT NULL
+    GROUP BY owner_user_id;
+"""
+
+# ארכיון לפגישות שהסתיימו מזמן (archive.py מעביר אליו). אותן עמודות ואותם מזהים, כך שתצוגה
+# "כולל ארכיון" היא UNION ALL פשוט. טריגרי הספירה רשומים גם כאן, ולכן העברה לארכיון לא משנה
+# את הספירה של הבעלים (רק מקדמת את הגרסה שלו).
+ARCHIVE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS testapp_appointments_archive (
+        LIKE testapp_appointments INCLUDING GENERATED INCLUDING CONSTRAINTS,
+        archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id),
+        FOREIGN KEY (owner_user_id) REFERENCES users(id) ON DELETE SET NULL,
+        FOREIGN KEY (status_updated_by_user_id) REFERENCES users(id) ON DELETE SET NULL
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_testapp_appointments_archive_owner_user_id_id
+    ON testapp_appointments_archive (owner_user_id, id DESC);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_testapp_appointments_archive_owner_user_id_starts_at
+    ON testapp_appointments_archive (owner_user_id, starts_at, id);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_testapp_appointments_archive_search_vector
+    ON testapp_appointments_archive USING GIN (search_vector);
+    """,
+    f"""
+    DO $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+            CREATE INDEX IF NOT EXISTS idx_testapp_appointments_archive_search_trgm
+            ON testapp_appointments_archive USING GIN ({SEARCH_TEXT_EXPRESSION} gin_trgm_ops);
+        END IF;
+    END $$;
+    """,
+    search_vector_trigger_sql("testapp_appointments_archive"),
+    """
+    CREATE OR REPLACE TRIGGER testapp_appointments_archive_counts_insert
+    AFTER INSERT ON testapp_appointments_archive
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION testapp_apply_status_counts();
+    """,
+    """
+    CREATE OR REPLACE TRIGGER testapp_appointments_archive_counts_update
+    AFTER UPDATE ON testapp_appointments_archive
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION testapp_apply_status_counts();
+    """,
+    """
+    CREATE OR REPLACE TRIGGER testapp_appointments_archive_counts_delete
+    AFTER DELETE ON testapp_appointments_archive
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION testapp_apply_status_counts();
+    """,
+]
+
+
+def create_index_concurrently(name, definition):
+    def step(cur):
+        # בנייה CONCURRENTLY שנכשלה משאירה אינדקס INVALID, ו-IF NOT EXISTS היה מדלג עליו לתמיד
+        cur.execute(
+            """
+            SELECT NOT i.indisvalid
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = %s
+            """,
+            (name,),
+        )
+        row = cur.fetchone()
+        if row and row[0]:
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        cur.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}")
+
+    return step
+
+
+def create_trigram_index(cur):
+    try:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except psycopg2.Error:
+        # בלי pg_trgm החיפוש החלקי עדיין עובד, רק בסריקה של השורות של אותו בעלים
+        return
+    create_index_concurrently(
+        "idx_testapp_appointments_search_trgm",
+        f"testapp_appointments USING GIN ({SEARCH_TEXT_EXPRESSION} gin_trgm_ops)",
+    )(cur)
+
+
+# כל מיגרציה רצה פעם אחת ונרשמת ב-schema_version. מיגרציות transactional רצות בטרנזקציה אחת,
+# והאחרות (CONCURRENTLY, VALIDATE) רצות פקודה-פקודה ולכן כל צעד בהן חייב להיות idempotent.
+MIGRATIONS = [
+    {
+        "version": 1,
+        "name": "baseline tables",
+        "transactional": True,
+        "steps": [
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id SERIAL PRIMARY KEY,
+                email TEXT UNIQUE NOT NULL,
+                password_hash TEXT NOT NULL,
+                is_admin BOOLEAN NOT NULL DEFAULT FALSE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS testapp_appointments (
+                id SERIAL PRIMARY KEY,
+                title TEXT NOT NULL,
+                date_text TEXT NOT NULL,
+                time_text TEXT NOT NULL,
+                location TEXT,
+                notes TEXT,
+                status TEXT NOT NULL DEFAULT 'planned' CHECK (status IN ('planned', 'done', 'canceled')),
+                updated_at TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                owner_user_id INTEGER,
+                status_updated_at TIMESTAMP,
+                status_updated_by_user_id INTEGER
+            );
+            """,
+            # מסדי נתונים ישנים נוצרו לפני חלק מהעמודות
+            """
+            ALTER TABLE testapp_appointments
+            ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'planned',
+            ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP,
+            ADD COLUMN IF NOT EXISTS owner_user_id INTEGER,
+            ADD COLUMN IF NOT EXISTS status_updated_at TIMESTAMP,
+            ADD COLUMN IF NOT EXISTS status_updated_by_user_id INTEGER;
+            """,
+            """
+            DO $$
+            BEGIN
+                IF NOT EXISTS (
+                    SELECT 1
+                    FROM pg_constraint
+                    WHERE conname = 'testapp_appointments_status_check'
+                ) THEN
+                    ALTER TABLE testapp_appointments
+                    ADD CONSTRAINT testapp_appointments_status_check
+                    CHECK (status IN ('planned', 'done', 'canceled'));
+                END IF;
+            END $$;
+            """,
+        ],
+    },
+    {
+        "version": 2,
+        "name": "starts_at column",
+        "transactional": True,
+        "steps": [
+            """
+            ALTER TABLE testapp_appointments
+            ADD COLUMN IF NOT EXISTS starts_at TIMESTAMP;
+            """,
+            TRY_TIMESTAMP_FUNCTION,
+        ],
+    },
+    {
+        "version": 3,
+        "name": "owner list indexes",
+        "transactional": False,
+        "steps": [
+            create_index_concurrently(
+                "idx_testapp_appointments_owner_user_id_id",
+                "testapp_appointments(owner_user_id, id DESC)",
+            ),
+            create_index_concurrently(
+                "idx_testapp_appointments_owner_user_id_starts_at",
+                "testapp_appointments(owner_user_id, starts_at, id)",
+            ),
+            # נוצרו רק על ידי init_db.py הישן: הראשון מכוסה ע"י (owner_user_id, id), בשני אף שאילתה לא משתמשת
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_testapp_appointments_owner_user_id",
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_testapp_appointments_created_at",
+        ],
+    },
+    {
+        "version": 4,
+        "name": "user foreign keys",
+        "transactional": False,
+        "steps": [
+            """
+            UPDATE testapp_appointments a
+            SET owner_user_id = NULL
+            WHERE owner_user_id IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM users u WHERE u.id = a.owner_user_id);
+            """,
+            """
+            UPDATE testapp_appointments a
+            SET status_updated_by_user_id = NULL
+            WHERE status_updated_by_user_id IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM users u WHERE u.id = a.status_updated_by_user_id);
+            """,
+            # NOT VALID מוסיף את האילוץ בלי לסרוק את הטבלה, ו-VALIDATE סורק בלי לחסום כתיבות
+            """
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'testapp_appointments_owner_user_id_fkey') THEN
+                    ALTER TABLE testapp_appointments
+                    ADD CONSTRAINT testapp_appointments_owner_user_id_fkey
+                    FOREIGN KEY (owner_user_id) REFERENCES users(id) ON DELETE SET NULL NOT VALID;
+                END IF;
+                IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'testapp_appointments_status_updated_by_user_id_fkey') THEN
+                    ALTER TABLE testapp_appointments
+                    ADD CONSTRAINT testapp_appointments_status_updated_by_user_id_fkey
+                    FOREIGN KEY (status_updated_by_user_id) REFERENCES users(id) ON DELETE SET NULL NOT VALID;
+                END IF;
+            END $$;
+            """,
+            "ALTER TABLE testapp_appointments VALIDATE CONSTRAINT testapp_appointments_owner_user_id_fkey",
+            "ALTER TABLE testapp_appointments VALIDATE CONSTRAINT testapp_appointments_status_updated_by_user_id_fkey",
+        ],
+    },
+    {
+        "version": 5,
+        "name": "search column",
+        "transactional": False,
+        "steps": [*SEARCH_COLUMN_DDL, search_vector_trigger_sql("testapp_appointments"), backfill_search_vector],
+    },
+    {
+        "version": 6,
+        "name": "search indexes",
+        "transactional": False,
+        "steps": [
+            create_index_concurrently(
+                "idx_testapp_appointments_search_vector",
+                "testapp_appointments USING GIN (search_vector)",
+            ),
+            create_trigram_index,
+        ],
+    },
+    {
+        "version": 7,
+        "name": "status counters",
+        "transactional": True,
+        "steps": [*STATUS_COUNTS_DDL, REBUILD_STATUS_COUNTS_SQL],
+    },
+    {
+        "version": 8,
+        "name": "owner data versions",
+        "transactional": True,
+        "steps": DATA_VERSION_DDL,
+    },
+    {
+        "version": 9,
+        "name": "notify owners on change",
+        "transactional": True,
+        "steps": NOTIFY_DDL,
+    },
+    {
+        "version": 10,
+        "name": "status history",
+        "transactional": True,
+        "steps": STATUS_EVENTS_DDL,
+    },
+    {
+        "version": 11,
+        "name": "appointment archive",
+        "transactional": True,
+        "steps": ARCHIVE_DDL,
+    },
+]
+
+LATEST_VERSION = MIGRATIONS[-1]["version"]
+
+
+# מחיצות appointment_status_events נוצרות מראש בכל עלייה ובהרצה מתוזמנת של status_history.py,
+# כדי שהעדכון הראשון של חודש חדש לא יריץ CREATE TABLE בתוך הטרנזקציה של המשתמש
+STATUS_EVENTS_MONTHS_AHEAD = int(os.getenv("STATUS_EVENTS_MONTHS_AHEAD", "2"))
+
+ENSURE_PARTITIONS_SQL = """
+    SELECT testapp_status_events_partition(LOCALTIMESTAMP + make_interval(months => n))
+    FROM generate_series(0, %s) AS n
+"""
+
+
+def ensure_partitions(months_ahead=STATUS_EVENTS_MONTHS_AHEAD):
+    with get_cursor() as cur:
+        cur.execute(ENSURE_PARTITIONS_SQL, (months_ahead,))
+        return [r[0] for r in cur.fetchall()]
+
+
+def current_version():
+    try:
+        with get_cursor() as cur:
+            cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+            return cur.fetchone()[0]
+    except psycopg2.errors.UndefinedTable:
+        return 0
+
+
+def migrate(log=None):
+    # כשהסכמה עדכנית אלו שתי שאילתות (גרסה ומחיצות), כך שאפשר לקרוא לזה בכל עלייה של כל worker
+    if current_version() >= LATEST_VERSION:
+        ensure_partitions()
+        return []
+
+    applied = []
+    conn = get_db_connection()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+            cur.execute("SET lock_timeout = %s", (MIGRATION_LOCK_TIMEOUT,))
+            cur.execute(SCHEMA_VERSION_SQL)
+            cur.execute("SELECT version FROM schema_version")
+            done = {r[0] for r in cur.fetchall()}
+
+            for migration in MIGRATIONS:
+                if migration["version"] in done:
+                    continue
+                if log:
+                    log(f"applying {migration['version']}: {migration['name']}")
+                conn.autocommit = not migration["transactional"]
+                try:
+                    for step in migration["steps"]:
+                        if callable(step):
+                            step(cur)
+                        else:
+                            cur.execute(step)
+                    cur.execute(
+                        "INSERT INTO schema_version (version, name) VALUES (%s, %s)",
+                        (migration["version"], migration["name"]),
+                    )
+                    if not conn.autocommit:
+                        conn.commit()
+                except Exception:
+                    if not conn.autocommit:
+                        conn.rollback()
+                    raise
+                finally:
+                    conn.autocommit = True
+                applied.append(migration["version"])
+            cur.execute(ENSURE_PARTITIONS_SQL, (STATUS_EVENTS_MONTHS_AHEAD,))
+    finally:
+        # סגירת החיבור משחררת גם את ה-advisory lock
+        conn.close()
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--status", action="store_true", help="only print the current and latest version")
+    args = parser.parse_args()
+
+    if args.status:
+        print(f"schema version {current_version()}, latest {LATEST_VERSION}")
+        return
+
+    applied = migrate(log=print)
+    print(f"schema is at version {LATEST_VERSION}, applied {len(applied)} migrations")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import asyncio
+import concurrent.futures
+import concurrent.futures.process
+import functools
+import multiprocessing
+import os
+import threading
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+# בפורמט המלא שנשמר בתחילת ה-hash: scrypt:<n>:<r>:<p> או pbkdf2:<hash>:<iterations>.
+# hash שמור עם פרמטרים אחרים מחושב מחדש בהתחברות המוצלחת הבאה
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+# תהליכים שמחשבים hash. 0 = חישוב בתוך ה-worker שמטפל בבקשה, כמו קודם
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(os.cpu_count() or 1, 4))))
+# כמה חישובים יכולים לרוץ או לחכות בבת אחת בתהליך הזה. מעבר לזה הבקשה נדחית מיד ולא נכנסת לתור
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(max(PASSWORD_HASH_WORKERS, 1) * 2)))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+
+class PasswordHasherBusy(RuntimeError):
+    pass
+
+
+@functools.lru_cache(maxsize=None)
+def normalize_method(method):
+    # werkzeug משלים פרמטרים חסרים כשהוא כותב את ה-hash ("scrypt" נשמר כ-scrypt:32768:8:1),
+    # ולכן משווים לקידומת שהוא באמת כותב. נחשב פעם אחת לכל תהליך
+    return generate_password_hash("", method=method).split("$", 1)[0]
+
+
+def needs_rehash(stored_hash, method=PASSWORD_HASH_METHOD):
+    return stored_hash.split("$", 1)[0] != normalize_method(method)
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(stored_hash, password, method):
+    # הבדיקה וה-hash החדש באותה קריאה, כדי שהחלפת פרמטרים לא תעלה עוד סבב בתור
+    if not check_password_hash(stored_hash, password):
+        return False, None
+    if needs_rehash(stored_hash, method):
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+class PasswordHasher:
+    def __init__(
+        self,
+        workers=PASSWORD_HASH_WORKERS,
+        max_pending=PASSWORD_HASH_MAX_PENDING,
+        method=PASSWORD_HASH_METHOD,
+        timeout=PASSWORD_HASH_TIMEOUT,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.method = method
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.pending = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # spawn ולא fork: תהליך שנוצר מתוך worker לא יורש ממנו חיבורי DB ו-threads
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _acquire(self):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy("too many password hashes pending")
+            self.pending += 1
+
+    def _release(self):
+        with self._lock:
+            self.pending -= 1
+
+    def _discard_pool(self, executor):
+        # תהליך שנהרג (OOM, kill) שובר את כל המאגר. הבקשה הבאה תיצור מאגר חדש
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn, *args):
+        # המקום בתור משתחרר רק כשהעבודה עצמה הסתיימה או בוטלה, ולא כשהבקשה הפסיקה לחכות לה.
+        # אחרת עבודות שפג הזמן שלהן ממשיכות לרוץ במאגר ו-max_pending לא מגביל את התור
+        executor = self._pool()
+        try:
+            future = executor.submit(fn, *args)
+        except (RuntimeError, concurrent.futures.process.BrokenProcessPool):
+            self._release()
+            self._discard_pool(executor)
+            raise PasswordHasherBusy("password hash pool is broken") from None
+        future.add_done_callback(lambda _: self._release())
+        return executor, future
+
+    def _run(self, fn, *args):
+        self._acquire()
+        if not self.workers:
+            try:
+                return fn(*args)
+            finally:
+                self._release()
+
+        executor, future = self._submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy("password hash timed out") from None
+        except concurrent.futures.process.BrokenProcessPool:
+            self._discard_pool(executor)
+            raise PasswordHasherBusy("password hash pool is broken") from None
+
+    async def _run_async(self, fn, *args):
+        self._acquire()
+        if not self.workers:
+            try:
+                return await asyncio.to_thread(fn, *args)
+            finally:
+                self._release()
+
+        executor, future = self._submit(fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy("password hash timed out") from None
+        except concurrent.futures.process.BrokenProcessPool:
+            self._discard_pool(executor)
+            raise PasswordHasherBusy("password hash pool is broken") from None
+
+    def _count_rehash(self, result):
+        if result[1] is not None:
+            with self._lock:
+                self.rehashed += 1
+        return result
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        return self._count_rehash(self._run(_verify, stored_hash, password, self.method))
+
+    async def hash_async(self, password):
+        return await self._run_async(_hash, password, self.method)
+
+    async def verify_async(self, stored_hash, password):
+        return self._count_rehash(await self._run_async(_verify, stored_hash, password, self.method))
+
+    def stats(self):
+        with self._lock:
+            return {"pending": self.pending, "rejected": self.rejected, "rehashed": self.rehashed}
+
+
+password_hasher = PasswordHasher()
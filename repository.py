@@ -0,0 +1,265 @@
+import os
+import re
+import threading
+import weakref
+
+from db import get_cursor
+
+
+# השאילתות החמות מוכנות (PREPARE) פעם אחת לכל חיבור במאגר ומורצות ב-EXECUTE, כך שהשרת
+# לא מנתח ומתכנן אותן מחדש בכל בקשה. DB_PREPARE_STATEMENTS=0 מבטל, למשל מאחורי pgbouncer
+# במצב transaction שבו חיבור השרת מתחלף בין פקודות.
+PREPARE_STATEMENTS = os.getenv("DB_PREPARE_STATEMENTS", "1") != "0"
+
+APPOINTMENT_LIST_COLUMNS = """
+    a.id,
+    a.title,
+    a.date_text,
+    a.time_text,
+    a.location,
+    a.notes,
+    a.status,
+    a.updated_at,
+    a.status_updated_at,
+    a.created_at,
+    a.starts_at,
+    a.owner_user_id,
+    a.status_updated_by_user_id
+"""
+
+# עמודות הטבלה עצמה (בלי search_vector, שמחושב במסד), משותפות לטבלה החמה ולארכיון
+APPOINTMENT_COLUMNS = """
+    id, title, date_text, time_text, location, notes, status, updated_at, created_at,
+    owner_user_id, status_updated_at, status_updated_by_user_id, starts_at
+"""
+
+# הסט החם ועוד הארכיון, לתצוגה "כולל ארכיון". UNION ALL פשוט נפתח אצל המתכנן, והתנאים
+# והמיון יורדים לכל טבלה בנפרד ונקראים דרך האינדקסים שלה. המזהים לא מתנגשים כי הארכיון
+# שומר את המזהה המקורי.
+APPOINTMENTS_WITH_ARCHIVE_SQL = f"""(
+    SELECT {APPOINTMENT_COLUMNS}, search_vector, FALSE AS archived FROM testapp_appointments
+    UNION ALL
+    SELECT {APPOINTMENT_COLUMNS}, search_vector, TRUE AS archived FROM testapp_appointments_archive
+)"""
+
+APPOINTMENT_BY_ID_SQL = f"""
+    SELECT {APPOINTMENT_LIST_COLUMNS}
+    FROM testapp_appointments a
+    WHERE a.id = %s
+"""
+
+# הכתיבות מחזירות את השורה המלאה באותה פקודה, כך שמצב "שורה" ו-API לא שולפים אותה שוב
+INSERT_APPOINTMENT_SQL = f"""
+    INSERT INTO testapp_appointments AS a (title, date_text, time_text, starts_at, location, notes, status, owner_user_id)
+    VALUES (%s, %s, %s, %s, %s, %s, 'planned', %s)
+    RETURNING {APPOINTMENT_LIST_COLUMNS}
+"""
+
+SET_STATUS_SQL = f"""
+    UPDATE testapp_appointments a
+    SET status = %s,
+        status_updated_at = CURRENT_TIMESTAMP,
+        status_updated_by_user_id = %s
+    WHERE a.id = %s
+    RETURNING {APPOINTMENT_LIST_COLUMNS}
+"""
+
+USER_BY_ID_SQL = """
+    SELECT id, email, is_admin
+    FROM users
+    WHERE id = %s
+"""
+
+USERS_BY_IDS_SQL = """
+    SELECT id, email, is_admin
+    FROM users
+    WHERE id = ANY(%s)
+"""
+
+LOGIN_SQL = """
+    SELECT id, password_hash
+    FROM users
+    WHERE email = %s
+"""
+
+# ה-hash הישן בתנאי: אם הסיסמה הוחלפה בינתיים, העדכון לא דורס אותה
+UPDATE_PASSWORD_HASH_SQL = """
+    UPDATE users
+    SET password_hash = %s
+    WHERE id = %s AND password_hash = %s
+"""
+
+DATABASE_OID_SQL = "SELECT oid FROM pg_database WHERE datname = current_database()"
+
+OWNER_DATA_VERSION_SQL = """
+    SELECT data_version, changed_at
+    FROM appointment_status_counts
+    WHERE owner_user_id = %s
+"""
+
+STATUS_HISTORY_SQL = """
+    SELECT changed_at, old_status, new_status, changed_by_user_id
+    FROM appointment_status_events
+    WHERE appointment_id = %s
+    ORDER BY changed_at DESC
+    LIMIT %s
+"""
+
+# הטווח הוא על מפתח החלוקה, כך שנקראות רק המחיצות של החודשים שבטווח (גם בתוכנית הכללית
+# של שאילתה מוכנה, שבה המחיצות מסוננות בזמן הריצה)
+STATUS_TRANSITIONS_SQL = """
+    SELECT
+        e.changed_at,
+        e.old_status,
+        e.new_status,
+        e.changed_by_user_id,
+        e.appointment_id,
+        a.title,
+        e.owner_user_id
+    FROM appointment_status_events e
+    LEFT JOIN testapp_appointments a ON a.id = e.appointment_id
+    WHERE e.changed_at >= %s AND e.changed_at < %s
+      AND e.new_status = ANY(%s)
+    ORDER BY e.changed_at DESC
+    LIMIT %s
+"""
+
+ADMIN_USERS_SQL = """
+    SELECT
+        u.id,
+        u.email,
+        u.is_admin,
+        u.created_at,
+        COALESCE(c.planned, 0),
+        COALESCE(c.done, 0),
+        COALESCE(c.canceled, 0)
+    FROM users u
+    LEFT JOIN appointment_status_counts c ON c.owner_user_id = u.id
+    ORDER BY u.id ASC
+"""
+
+# שם קבוע לכל טקסט SQL, זהה בכל החיבורים של התהליך. החיבור עצמו זוכר מה כבר הוכן
+# עליו, והרשומה נעלמת יחד איתו כשהמאגר זורק אותו.
+_statement_names = {}
+_prepared = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _numbered_placeholders(sql):
+    count = 0
+
+    def number(match):
+        nonlocal count
+        if match.group() == "%%":
+            return "%"
+        count += 1
+        return f"${count}"
+
+    return re.sub(r"%%|%s", number, sql)
+
+
+def statement_name(sql):
+    name = _statement_names.get(sql)
+    if name is None:
+        with _lock:
+            name = _statement_names.setdefault(sql, f"testapp_q{len(_statement_names) + 1}")
+    return name
+
+
+def execute(cur, sql, params=None):
+    # רק לשאילתות שמספר הווריאציות שלהן חסום. סמן עם שם (DECLARE) לא יכול להריץ EXECUTE
+    if not PREPARE_STATEMENTS or cur.name:
+        cur.execute(sql, params)
+        return
+
+    name = statement_name(sql)
+    conn = cur.connection
+    with _lock:
+        prepared = _prepared.setdefault(conn, set())
+    if name not in prepared:
+        # PREPARE לא טרנזקציוני, ולכן נשאר על החיבור גם אחרי rollback
+        cur.execute(f"PREPARE {name} AS {_numbered_placeholders(sql)}")
+        prepared.add(name)
+
+    if params:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
+
+
+def fetch_user_row(user_id):
+    with get_cursor() as cur:
+        execute(cur, USER_BY_ID_SQL, (user_id,))
+        return cur.fetchone()
+
+
+def fetch_user_rows(user_ids):
+    with get_cursor() as cur:
+        execute(cur, USERS_BY_IDS_SQL, (list(user_ids),))
+        return cur.fetchall()
+
+
+def fetch_login_row(email):
+    with get_cursor() as cur:
+        execute(cur, LOGIN_SQL, (email,))
+        return cur.fetchone()
+
+
+def update_password_hash(user_id, old_hash, new_hash):
+    with get_cursor() as cur:
+        execute(cur, UPDATE_PASSWORD_HASH_SQL, (new_hash, user_id, old_hash))
+        return cur.rowcount
+
+
+def fetch_appointment_row(appt_id):
+    with get_cursor() as cur:
+        execute(cur, APPOINTMENT_BY_ID_SQL, (appt_id,))
+        return cur.fetchone()
+
+
+def fetch_rows(sql, params):
+    with get_cursor() as cur:
+        execute(cur, sql, params)
+        return cur.fetchall()
+
+
+def insert_appointment_row(params):
+    with get_cursor() as cur:
+        execute(cur, INSERT_APPOINTMENT_SQL, params)
+        return cur.fetchone()
+
+
+def set_status(appt_id, status, updated_by_user_id):
+    with get_cursor() as cur:
+        execute(cur, SET_STATUS_SQL, (status, updated_by_user_id, appt_id))
+        return cur.fetchone()
+
+
+def fetch_database_oid():
+    with get_cursor() as cur:
+        cur.execute(DATABASE_OID_SQL)
+        return cur.fetchone()[0]
+
+
+def fetch_owner_data_version(owner_user_id):
+    with get_cursor() as cur:
+        execute(cur, OWNER_DATA_VERSION_SQL, (owner_user_id,))
+        return cur.fetchone()
+
+
+def fetch_status_history_rows(appt_id, limit):
+    with get_cursor() as cur:
+        execute(cur, STATUS_HISTORY_SQL, (appt_id, limit))
+        return cur.fetchall()
+
+
+def fetch_status_transition_rows(start, end, statuses, limit):
+    with get_cursor() as cur:
+        execute(cur, STATUS_TRANSITIONS_SQL, (start, end, list(statuses), limit))
+        return cur.fetchall()
+
+
+def fetch_admin_user_rows():
+    with get_cursor() as cur:
+        execute(cur, ADMIN_USERS_SQL)
+        return cur.fetchall()
@@ -15,4 +15,11 @@ if [ -z "$DATABASE_URL" ]; then
 fi
 
 echo "Using DATABASE_URL=$DATABASE_URL"
+python migrations.py
+python assets.py
+# עדכונים חיים בדפדפן (LIVE_UPDATES) פעילים רק ב-SERVER=asgi. ב-gunicorn הסינכרוני כל חיבור
+# פתוח מחזיק worker, ולכן שם הם כבויים אלא אם LIVE_UPDATES=1 עם worker class שמחזיק חיבורים
+if [ "$SERVER" = "asgi" ]; then
+  exec uvicorn asgi_app:application
+fi
 gunicorn app:app
@@ -2,10 +2,8 @@
 -- PostgreSQL database dump
 --
 
-\restrict 30IyscYGXu4Am5h81nVttANDd0LrxBghsMCthBfLVc5CMxORSHqyaBDbWYPTQ7G
-
--- Dumped from database version 14.19 (Homebrew)
--- Dumped by pg_dump version 14.19 (Homebrew)
+-- Dumped from database version 16.2
+-- Dumped by pg_dump version 16.2
 
 SET statement_timeout = 0;
 SET lock_timeout = 0;
@@ -18,10 +16,227 @@ SET xmloption = content;
 SET client_min_messages = warning;
 SET row_security = off;
 
+--
+-- Name: testapp_apply_status_counts(); Type: FUNCTION; Schema: public; Owner: -
+--
+
+CREATE FUNCTION public.testapp_apply_status_counts() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $_$
+    DECLARE
+        changes TEXT;
+        changed RECORD;
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            DELETE FROM appointment_status_counts;
+            RETURN NULL;
+        ELSIF TG_OP = 'INSERT' THEN
+            changes := 'SELECT owner_user_id, status, 1 AS delta FROM new_rows';
+        ELSIF TG_OP = 'DELETE' THEN
+            changes := 'SELECT owner_user_id, status, -1 AS delta FROM old_rows';
+        ELSE
+            changes := 'SELECT owner_user_id, status, 1 AS delta FROM new_rows '
+                       'UNION ALL SELECT owner_user_id, status, -1 AS delta FROM old_rows';
+        END IF;
+
+        FOR changed IN EXECUTE format(
+            $sql$
+            INSERT INTO appointment_status_counts AS c (owner_user_id, planned, done, canceled)
+            SELECT
+                owner_user_id,
+                COALESCE(SUM(delta) FILTER (WHERE status = 'planned'), 0),
+                COALESCE(SUM(delta) FILTER (WHERE status = 'done'), 0),
+                COALESCE(SUM(delta) FILTER (WHERE status = 'canceled'), 0)
+            FROM (%s) changes
+            WHERE owner_user_id IS NOT NULL
+            GROUP BY owner_user_id
+            ORDER BY owner_user_id
+            ON CONFLICT (owner_user_id) DO UPDATE
+            SET planned = c.planned + EXCLUDED.planned,
+                done = c.done + EXCLUDED.done,
+                canceled = c.canceled + EXCLUDED.canceled,
+                data_version = nextval('testapp_data_version_seq'),
+                changed_at = now()
+            RETURNING c.owner_user_id, c.data_version
+            $sql$,
+            changes
+        ) LOOP
+            PERFORM pg_notify('testapp_appointments', changed.owner_user_id || ':' || changed.data_version);
+        END LOOP;
+        RETURN NULL;
+    END;
+    $_$;
+
+
+--
+-- Name: testapp_record_status_events(); Type: FUNCTION; Schema: public; Owner: -
+--
+
+CREATE FUNCTION public.testapp_record_status_events() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+    BEGIN
+        PERFORM testapp_status_events_partition(LOCALTIMESTAMP);
+        INSERT INTO appointment_status_events
+            (appointment_id, owner_user_id, old_status, new_status, changed_at, changed_by_user_id)
+        SELECT
+            n.id,
+            n.owner_user_id,
+            o.status,
+            n.status,
+            LOCALTIMESTAMP,
+            CASE WHEN n.status_updated_at IS DISTINCT FROM o.status_updated_at THEN n.status_updated_by_user_id END
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        WHERE n.status IS DISTINCT FROM o.status;
+        RETURN NULL;
+    END;
+    $$;
+
+
+--
+-- Name: testapp_search_vector(); Type: FUNCTION; Schema: public; Owner: -
+--
+
+CREATE FUNCTION public.testapp_search_vector() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+    BEGIN
+        NEW.search_vector := setweight(to_tsvector('simple', COALESCE(NEW.title, '')), 'A')
+    || setweight(to_tsvector('simple', COALESCE(NEW.location, '')), 'B')
+    || setweight(to_tsvector('simple', COALESCE(NEW.notes, '')), 'C');
+        RETURN NEW;
+    END;
+    $$;
+
+
+--
+-- Name: testapp_status_events_partition(timestamp without time zone); Type: FUNCTION; Schema: public; Owner: -
+--
+
+CREATE FUNCTION public.testapp_status_events_partition(at timestamp without time zone) RETURNS text
+    LANGUAGE plpgsql
+    AS $$
+    DECLARE
+        month_start TIMESTAMP := date_trunc('month', at);
+        partition_name TEXT := 'appointment_status_events_' || to_char(at, 'YYYY_MM');
+    BEGIN
+        IF to_regclass(partition_name) IS NOT NULL THEN
+            RETURN partition_name;
+        END IF;
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF appointment_status_events FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, month_start + INTERVAL '1 month'
+            );
+        EXCEPTION WHEN duplicate_table OR unique_violation THEN
+            -- טרנזקציה מקבילה יצרה את אותה מחיצה
+            NULL;
+        END;
+        RETURN partition_name;
+    END;
+    $$;
+
+
+--
+-- Name: testapp_try_timestamp(text, text); Type: FUNCTION; Schema: public; Owner: -
+--
+
+CREATE FUNCTION public.testapp_try_timestamp(date_text text, time_text text) RETURNS timestamp without time zone
+    LANGUAGE plpgsql STABLE
+    AS $$
+    BEGIN
+        RETURN date_text::date + time_text::time;
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END;
+    $$;
+
+
+--
+-- Name: testapp_data_version_seq; Type: SEQUENCE; Schema: public; Owner: -
+--
+
+CREATE SEQUENCE public.testapp_data_version_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
 SET default_tablespace = '';
 
 SET default_table_access_method = heap;
 
+--
+-- Name: appointment_status_counts; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.appointment_status_counts (
+    owner_user_id integer NOT NULL,
+    planned integer DEFAULT 0 NOT NULL,
+    done integer DEFAULT 0 NOT NULL,
+    canceled integer DEFAULT 0 NOT NULL,
+    data_version bigint DEFAULT nextval('public.testapp_data_version_seq'::regclass) NOT NULL,
+    changed_at timestamp with time zone DEFAULT now() NOT NULL
+);
+
+
+--
+-- Name: appointment_status_events; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.appointment_status_events (
+    appointment_id integer NOT NULL,
+    owner_user_id integer,
+    old_status text,
+    new_status text NOT NULL,
+    changed_at timestamp without time zone NOT NULL,
+    changed_by_user_id integer
+)
+PARTITION BY RANGE (changed_at);
+
+
+--
+-- Name: appointment_status_events_2026_10; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.appointment_status_events_2026_10 (
+    appointment_id integer NOT NULL,
+    owner_user_id integer,
+    old_status text,
+    new_status text NOT NULL,
+    changed_at timestamp without time zone NOT NULL,
+    changed_by_user_id integer
+);
+
+
+--
+-- Name: appointment_status_events_2026_11; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.appointment_status_events_2026_11 (
+    appointment_id integer NOT NULL,
+    owner_user_id integer,
+    old_status text,
+    new_status text NOT NULL,
+    changed_at timestamp without time zone NOT NULL,
+    changed_by_user_id integer
+);
+
+
+--
+-- Name: schema_version; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.schema_version (
+    version integer NOT NULL,
+    name text NOT NULL,
+    applied_at timestamp without time zone DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+
 --
 -- Name: testapp_appointments; Type: TABLE; Schema: public; Owner: -
 --
@@ -39,6 +254,32 @@ CREATE TABLE public.testapp_appointments (
     owner_user_id integer,
     status_updated_at timestamp without time zone,
     status_updated_by_user_id integer,
+    starts_at timestamp without time zone,
+    search_vector tsvector,
+    CONSTRAINT testapp_appointments_status_check CHECK ((status = ANY (ARRAY['planned'::text, 'done'::text, 'canceled'::text])))
+);
+
+
+--
+-- Name: testapp_appointments_archive; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.testapp_appointments_archive (
+    id integer NOT NULL,
+    title text NOT NULL,
+    date_text text NOT NULL,
+    time_text text NOT NULL,
+    location text,
+    notes text,
+    status text NOT NULL,
+    updated_at timestamp without time zone,
+    created_at timestamp without time zone,
+    owner_user_id integer,
+    status_updated_at timestamp without time zone,
+    status_updated_by_user_id integer,
+    starts_at timestamp without time zone,
+    search_vector tsvector,
+    archived_at timestamp without time zone DEFAULT CURRENT_TIMESTAMP NOT NULL,
     CONSTRAINT testapp_appointments_status_check CHECK ((status = ANY (ARRAY['planned'::text, 'done'::text, 'canceled'::text])))
 );
 
@@ -96,6 +337,20 @@ CREATE SEQUENCE public.users_id_seq
 ALTER SEQUENCE public.users_id_seq OWNED BY public.users.id;
 
 
+--
+-- Name: appointment_status_events_2026_10; Type: TABLE ATTACH; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.appointment_status_events ATTACH PARTITION public.appointment_status_events_2026_10 FOR VALUES FROM ('2026-10-01 00:00:00') TO ('2026-11-01 00:00:00');
+
+
+--
+-- Name: appointment_status_events_2026_11; Type: TABLE ATTACH; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.appointment_status_events ATTACH PARTITION public.appointment_status_events_2026_11 FOR VALUES FROM ('2026-11-01 00:00:00') TO ('2026-12-01 00:00:00');
+
+
 --
 -- Name: testapp_appointments id; Type: DEFAULT; Schema: public; Owner: -
 --
@@ -110,6 +365,30 @@ ALTER TABLE ONLY public.testapp_appointments ALTER COLUMN id SET DEFAULT nextval
 ALTER TABLE ONLY public.users ALTER COLUMN id SET DEFAULT nextval('public.users_id_seq'::regclass);
 
 
+--
+-- Name: appointment_status_counts appointment_status_counts_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.appointment_status_counts
+    ADD CONSTRAINT appointment_status_counts_pkey PRIMARY KEY (owner_user_id);
+
+
+--
+-- Name: schema_version schema_version_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.schema_version
+    ADD CONSTRAINT schema_version_pkey PRIMARY KEY (version);
+
+
+--
+-- Name: testapp_appointments_archive testapp_appointments_archive_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.testapp_appointments_archive
+    ADD CONSTRAINT testapp_appointments_archive_pkey PRIMARY KEY (id);
+
+
 --
 -- Name: testapp_appointments testapp_appointments_pkey; Type: CONSTRAINT; Schema: public; Owner: -
 --
@@ -134,8 +413,229 @@ ALTER TABLE ONLY public.users
     ADD CONSTRAINT users_pkey PRIMARY KEY (id);
 
 
+--
+-- Name: idx_appointment_status_events_appointment; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_appointment_status_events_appointment ON ONLY public.appointment_status_events USING btree (appointment_id, changed_at);
+
+
+--
+-- Name: appointment_status_events_2026_10_appointment_id_changed_at_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX appointment_status_events_2026_10_appointment_id_changed_at_idx ON public.appointment_status_events_2026_10 USING btree (appointment_id, changed_at);
+
+
+--
+-- Name: idx_appointment_status_events_changed_at; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_appointment_status_events_changed_at ON ONLY public.appointment_status_events USING brin (changed_at);
+
+
+--
+-- Name: appointment_status_events_2026_10_changed_at_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX appointment_status_events_2026_10_changed_at_idx ON public.appointment_status_events_2026_10 USING brin (changed_at);
+
+
+--
+-- Name: appointment_status_events_2026_11_appointment_id_changed_at_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX appointment_status_events_2026_11_appointment_id_changed_at_idx ON public.appointment_status_events_2026_11 USING btree (appointment_id, changed_at);
+
+
+--
+-- Name: appointment_status_events_2026_11_changed_at_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX appointment_status_events_2026_11_changed_at_idx ON public.appointment_status_events_2026_11 USING brin (changed_at);
+
+
+--
+-- Name: idx_testapp_appointments_archive_owner_user_id_id; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_testapp_appointments_archive_owner_user_id_id ON public.testapp_appointments_archive USING btree (owner_user_id, id DESC);
+
+
+--
+-- Name: idx_testapp_appointments_archive_owner_user_id_starts_at; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_testapp_appointments_archive_owner_user_id_starts_at ON public.testapp_appointments_archive USING btree (owner_user_id, starts_at, id);
+
+
+--
+-- Name: idx_testapp_appointments_archive_search_vector; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_testapp_appointments_archive_search_vector ON public.testapp_appointments_archive USING gin (search_vector);
+
+
+--
+-- Name: idx_testapp_appointments_owner_user_id_id; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_testapp_appointments_owner_user_id_id ON public.testapp_appointments USING btree (owner_user_id, id DESC);
+
+
+--
+-- Name: idx_testapp_appointments_owner_user_id_starts_at; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_testapp_appointments_owner_user_id_starts_at ON public.testapp_appointments USING btree (owner_user_id, starts_at, id);
+
+
+--
+-- Name: idx_testapp_appointments_search_vector; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_testapp_appointments_search_vector ON public.testapp_appointments USING gin (search_vector);
+
+
+--
+-- Name: appointment_status_events_2026_10_appointment_id_changed_at_idx; Type: INDEX ATTACH; Schema: public; Owner: -
+--
+
+ALTER INDEX public.idx_appointment_status_events_appointment ATTACH PARTITION public.appointment_status_events_2026_10_appointment_id_changed_at_idx;
+
+
+--
+-- Name: appointment_status_events_2026_10_changed_at_idx; Type: INDEX ATTACH; Schema: public; Owner: -
+--
+
+ALTER INDEX public.idx_appointment_status_events_changed_at ATTACH PARTITION public.appointment_status_events_2026_10_changed_at_idx;
+
+
+--
+-- Name: appointment_status_events_2026_11_appointment_id_changed_at_idx; Type: INDEX ATTACH; Schema: public; Owner: -
+--
+
+ALTER INDEX public.idx_appointment_status_events_appointment ATTACH PARTITION public.appointment_status_events_2026_11_appointment_id_changed_at_idx;
+
+
+--
+-- Name: appointment_status_events_2026_11_changed_at_idx; Type: INDEX ATTACH; Schema: public; Owner: -
+--
+
+ALTER INDEX public.idx_appointment_status_events_changed_at ATTACH PARTITION public.appointment_status_events_2026_11_changed_at_idx;
+
+
+--
+-- Name: testapp_appointments_archive testapp_appointments_archive_counts_delete; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER testapp_appointments_archive_counts_delete AFTER DELETE ON public.testapp_appointments_archive REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION public.testapp_apply_status_counts();
+
+
+--
+-- Name: testapp_appointments_archive testapp_appointments_archive_counts_insert; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER testapp_appointments_archive_counts_insert AFTER INSERT ON public.testapp_appointments_archive REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.testapp_apply_status_counts();
+
+
+--
+-- Name: testapp_appointments_archive testapp_appointments_archive_counts_update; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER testapp_appointments_archive_counts_update AFTER UPDATE ON public.testapp_appointments_archive REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.testapp_apply_status_counts();
+
+
+--
+-- Name: testapp_appointments_archive testapp_appointments_archive_search_vector; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER testapp_appointments_archive_search_vector BEFORE INSERT OR UPDATE OF title, location, notes ON public.testapp_appointments_archive FOR EACH ROW EXECUTE FUNCTION public.testapp_search_vector();
+
+
+--
+-- Name: testapp_appointments testapp_appointments_counts_delete; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER testapp_appointments_counts_delete AFTER DELETE ON public.testapp_appointments REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION public.testapp_apply_status_counts();
+
+
+--
+-- Name: testapp_appointments testapp_appointments_counts_insert; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER testapp_appointments_counts_insert AFTER INSERT ON public.testapp_appointments REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.testapp_apply_status_counts();
+
+
+--
+-- Name: testapp_appointments testapp_appointments_counts_truncate; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER testapp_appointments_counts_truncate AFTER TRUNCATE ON public.testapp_appointments FOR EACH STATEMENT EXECUTE FUNCTION public.testapp_apply_status_counts();
+
+
+--
+-- Name: testapp_appointments testapp_appointments_counts_update; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER testapp_appointments_counts_update AFTER UPDATE ON public.testapp_appointments REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.testapp_apply_status_counts();
+
+
+--
+-- Name: testapp_appointments testapp_appointments_search_vector; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER testapp_appointments_search_vector BEFORE INSERT OR UPDATE OF title, location, notes ON public.testapp_appointments FOR EACH ROW EXECUTE FUNCTION public.testapp_search_vector();
+
+
+--
+-- Name: testapp_appointments testapp_appointments_status_events; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER testapp_appointments_status_events AFTER UPDATE ON public.testapp_appointments REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.testapp_record_status_events();
+
+
+--
+-- Name: appointment_status_events appointment_status_events_changed_by_user_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE public.appointment_status_events
+    ADD CONSTRAINT appointment_status_events_changed_by_user_id_fkey FOREIGN KEY (changed_by_user_id) REFERENCES public.users(id) ON DELETE SET NULL;
+
+
+--
+-- Name: testapp_appointments_archive testapp_appointments_archive_owner_user_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.testapp_appointments_archive
+    ADD CONSTRAINT testapp_appointments_archive_owner_user_id_fkey FOREIGN KEY (owner_user_id) REFERENCES public.users(id) ON DELETE SET NULL;
+
+
+--
+-- Name: testapp_appointments_archive testapp_appointments_archive_status_updated_by_user_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.testapp_appointments_archive
+    ADD CONSTRAINT testapp_appointments_archive_status_updated_by_user_id_fkey FOREIGN KEY (status_updated_by_user_id) REFERENCES public.users(id) ON DELETE SET NULL;
+
+
+--
+-- Name: testapp_appointments testapp_appointments_owner_user_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.testapp_appointments
+    ADD CONSTRAINT testapp_appointments_owner_user_id_fkey FOREIGN KEY (owner_user_id) REFERENCES public.users(id) ON DELETE SET NULL;
+
+
+--
+-- Name: testapp_appointments testapp_appointments_status_updated_by_user_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.testapp_appointments
+    ADD CONSTRAINT testapp_appointments_status_updated_by_user_id_fkey FOREIGN KEY (status_updated_by_user_id) REFERENCES public.users(id) ON DELETE SET NULL;
+
+
 --
 -- PostgreSQL database dump complete
 --
 
-\unrestrict 30IyscYGXu4Am5h81nVttANDd0LrxBghsMCthBfLVc5CMxORSHqyaBDbWYPTQ7G
@@ -0,0 +1,74 @@
+import argparse
+import sys
+
+from db import get_cursor
+from migrations import REBUILD_ALL_STATUS_COUNTS_SQL
+
+
+def rebuild_status_counts():
+    with get_cursor() as cur:
+        cur.execute(REBUILD_ALL_STATUS_COUNTS_SQL)
+        cur.execute("SELECT COUNT(*) FROM appointment_status_counts")
+        return cur.fetchone()[0]
+
+
+def check_status_counts():
+    with get_cursor() as cur:
+        cur.execute(
+            """
+            WITH live AS (
+                SELECT
+                    owner_user_id,
+                    COUNT(*) FILTER (WHERE status = 'planned') AS planned,
+                    COUNT(*) FILTER (WHERE status = 'done') AS done,
+                    COUNT(*) FILTER (WHERE status = 'canceled') AS canceled
+                FROM (
+                    SELECT owner_user_id, status FROM testapp_appointments
+                    UNION ALL
+                    SELECT owner_user_id, status FROM testapp_appointments_archive
+                ) a
+                WHERE owner_user_id IS NOT NULL
+                GROUP BY owner_user_id
+            )
+            SELECT
+                COALESCE(live.owner_user_id, s.owner_user_id),
+                COALESCE(live.planned, 0), COALESCE(live.done, 0), COALESCE(live.canceled, 0),
+                COALESCE(s.planned, 0), COALESCE(s.done, 0), COALESCE(s.canceled, 0)
+            FROM live
+            FULL JOIN appointment_status_counts s ON s.owner_user_id = live.owner_user_id
+            WHERE (COALESCE(live.planned, 0), COALESCE(live.done, 0), COALESCE(live.canceled, 0))
+               IS DISTINCT FROM (COALESCE(s.planned, 0), COALESCE(s.done, 0), COALESCE(s.canceled, 0))
+            ORDER BY 1
+            """
+        )
+        rows = cur.fetchall()
+
+    return [
+        {"owner_user_id": r[0], "expected": r[1:4], "stored": r[4:7]}
+        for r in rows
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or rebuild appointment_status_counts")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the summary from testapp_appointments and its archive")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        owners = rebuild_status_counts()
+        print(f"rebuilt status counts for {owners} owners")
+
+    mismatches = check_status_counts()
+    for m in mismatches:
+        print(
+            f"owner {m['owner_user_id']}: expected planned/done/canceled {m['expected']}, stored {m['stored']}",
+            file=sys.stderr,
+        )
+    if mismatches:
+        print(f"{len(mismatches)} owners out of sync, run with --rebuild")
+        sys.exit(1)
+    print("status counts OK")
+
+
+if __name__ == "__main__":
+    main()
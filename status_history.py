@@ -0,0 +1,33 @@
+import argparse
+
+from db import get_cursor
+from migrations import STATUS_EVENTS_MONTHS_AHEAD, ensure_partitions
+
+
+def partition_sizes():
+    with get_cursor() as cur:
+        cur.execute(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint, pg_total_relation_size(c.oid)
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'appointment_status_events'::regclass
+            ORDER BY c.relname
+            """
+        )
+        return cur.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create upcoming appointment_status_events partitions")
+    parser.add_argument("--ahead", type=int, default=STATUS_EVENTS_MONTHS_AHEAD, help="months after the current one to create")
+    args = parser.parse_args()
+
+    created = ensure_partitions(args.ahead)
+    print(f"partitions ready up to {created[-1]}")
+    for name, bound, rows, size in partition_sizes():
+        print(f"{name}: {bound}, ~{max(rows, 0)} rows, {size // 1024} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -92,7 +92,7 @@ def app_module():
     os.environ["DATABASE_URL"] = test_db_url
 
     # ניקוי cache של מודולים
-    for module_name in ("app", "db"):
+    for module_name in ("app", "db", "migrations"):
         if module_name in sys.modules:
             del sys.modules[module_name]
 
@@ -120,6 +120,7 @@ def reset_db(db_module):
             RESTART IDENTITY CASCADE
             """
         )
+    importlib.import_module("user_cache").user_cache.invalidate()
 
 
 @pytest.fixture
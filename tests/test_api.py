@@ -0,0 +1,139 @@
+from datetime import datetime
+
+from test_app import fetch_user_id_by_email, login_user, logout_user, register_user
+
+
+def create_via_api(client, title="api", date="2026-04-01", time="09:30"):
+    res = client.post("/api/appointments", json={"title": title, "date": date, "time": time})
+    assert res.status_code == 201
+    return res.get_json()
+
+
+def test_api_requires_login(client):
+    res = client.get("/api/appointments")
+    assert res.status_code == 401
+    assert res.get_json()["error"]
+
+
+def test_api_create_list_and_fetch(client):
+    register_user(client, "api@example.com")
+    login_user(client, "api@example.com")
+
+    created = create_via_api(client, title="from api")
+    assert created["title"] == "from api"
+    assert created["starts_at"] == "2026-04-01T09:30:00"
+    assert created["status"] == "planned"
+
+    listed = client.get("/api/appointments").get_json()
+    assert [a["id"] for a in listed["appointments"]] == [created["id"]]
+    assert listed["next"] is None
+
+    single = client.get(f"/api/appointments/{created['id']}")
+    assert single.get_json()["owner_email"] == "api@example.com"
+
+    bad = client.post("/api/appointments", json={"title": "x", "date": "2026-02-31", "time": "09:00"})
+    assert bad.status_code == 400
+
+
+def test_api_list_answers_304_until_data_changes(client):
+    register_user(client, "etag@example.com")
+    login_user(client, "etag@example.com")
+    created = create_via_api(client)
+
+    first = client.get("/api/appointments")
+    etag = first.headers["ETag"]
+    assert first.headers["Last-Modified"]
+
+    again = client.get("/api/appointments", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.get_data() == b""
+
+    client.post(f"/api/appointments/{created['id']}/complete")
+    after_complete = client.get("/api/appointments", headers={"If-None-Match": etag})
+    assert after_complete.status_code == 200
+    assert after_complete.get_json()["appointments"][0]["status"] == "done"
+
+    etag = after_complete.headers["ETag"]
+    client.patch(f"/api/appointments/{created['id']}", json={"notes": "changed"})
+    assert client.get("/api/appointments", headers={"If-None-Match": etag}).status_code == 200
+
+    etag = client.get("/api/appointments").headers["ETag"]
+    assert client.delete(f"/api/appointments/{created['id']}").status_code == 204
+    assert client.get("/api/appointments", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_api_etag_differs_per_page_and_filter(client):
+    register_user(client, "etag-args@example.com")
+    login_user(client, "etag-args@example.com")
+    create_via_api(client)
+
+    plain = client.get("/api/appointments").headers["ETag"]
+    filtered = client.get("/api/appointments?when=past").headers["ETag"]
+    assert plain != filtered
+
+
+def test_api_time_filters_do_not_answer_304_across_minutes(client, app_module, monkeypatch):
+    register_user(client, "etag-clock@example.com")
+    login_user(client, "etag-clock@example.com")
+    create_via_api(client)
+
+    class Clock(datetime):
+        current = datetime(2026, 4, 1, 9, 29)
+
+        @classmethod
+        def now(cls, tz=None):
+            return cls.current
+
+    monkeypatch.setattr(app_module, "datetime", Clock)
+    etag = client.get("/api/appointments?when=upcoming").headers["ETag"]
+    assert client.get("/api/appointments?when=upcoming", headers={"If-None-Match": etag}).status_code == 304
+
+    Clock.current = datetime(2026, 4, 1, 9, 31)
+    assert client.get("/api/appointments?when=upcoming", headers={"If-None-Match": etag}).status_code == 200
+
+    plain = client.get("/api/appointments").headers["ETag"]
+    Clock.current = datetime(2026, 4, 1, 9, 45)
+    assert client.get("/api/appointments", headers={"If-None-Match": plain}).status_code == 304
+
+
+def test_api_rejects_json_that_is_not_an_object(client):
+    register_user(client, "json-shape@example.com", is_admin=True)
+    login_user(client, "json-shape@example.com")
+    created = create_via_api(client)
+
+    for body in ([1], "x", 5):
+        for method, path in (
+            ("post", "/api/appointments"),
+            ("patch", f"/api/appointments/{created['id']}"),
+            ("post", f"/api/appointments/{created['id']}/status"),
+        ):
+            res = getattr(client, method)(path, json=body)
+            assert res.status_code == 400
+            assert res.get_json()["error"] == "expected a JSON object"
+
+
+def test_api_enforces_ownership_and_admin_status(client, db_module):
+    register_user(client, "api-owner@example.com")
+    login_user(client, "api-owner@example.com")
+    created = create_via_api(client)
+    owner_id = fetch_user_id_by_email(db_module, "api-owner@example.com")
+    logout_user(client)
+
+    register_user(client, "api-intruder@example.com")
+    login_user(client, "api-intruder@example.com")
+    assert client.get(f"/api/appointments/{created['id']}").status_code == 404
+    assert client.delete(f"/api/appointments/{created['id']}").status_code == 404
+    assert client.get(f"/api/appointments?owner={owner_id}").status_code == 403
+    assert client.post(f"/api/appointments/{created['id']}/status", json={"status": "done"}).status_code == 403
+    logout_user(client)
+
+    register_user(client, "api-admin@example.com", is_admin=True)
+    login_user(client, "api-admin@example.com")
+    listed = client.get(f"/api/appointments?owner={owner_id}").get_json()
+    assert [a["id"] for a in listed["appointments"]] == [created["id"]]
+
+    res = client.post(f"/api/appointments/{created['id']}/status", json={"status": "canceled"})
+    assert res.status_code == 200
+    body = res.get_json()
+    assert body["status"] == "canceled"
+    assert body["status_updated_by_email"] == "api-admin@example.com"
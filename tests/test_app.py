@@ -1,3 +1,7 @@
+import re
+import time
+
+
 def register_user(client, email, password="secret", is_admin=False):
     data = {
         "email": email,
@@ -146,6 +150,66 @@ def test_admin_status_change_stores_audit_and_shown_on_status_page(client, db_mo
     assert "עדכון סטטוס אחרון" in page_text
 
 
+def test_list_resolves_owner_and_status_emails_without_joins(client, app_module, db_module):
+    register_user(client, "listed@example.com")
+    login_user(client, "listed@example.com")
+    for i in range(3):
+        create_appointment(client, title=f"listed-{i}")
+    owner_id = fetch_user_id_by_email(db_module, "listed@example.com")
+    logout_user(client)
+
+    register_user(client, "auditor@example.com", is_admin=True)
+    login_user(client, "auditor@example.com")
+    for appt_id in (1, 2):
+        client.post(f"/status/{appt_id}", data={"status": "done", "next": "/output"})
+
+    app_module.user_cache.invalidate()
+    queries = []
+
+    def listener(event, seconds, query, params):
+        if event == "query":
+            queries.append(query)
+
+    db_module.add_db_listener(listener)
+    try:
+        page = client.get(f"/admin/users/{owner_id}/appointments").get_data(as_text=True)
+        paged_queries = list(queries)
+        streamed = client.get(f"/admin/users/{owner_id}/appointments?stream=1").get_data(as_text=True)
+    finally:
+        db_module.remove_db_listener(listener)
+
+    for text in (page, streamed):
+        assert text.count("<td>listed@example.com</td>") == 3
+        assert text.count("<td>auditor@example.com</td>") == 2
+    assert not any("JOIN users" in q for q in paged_queries)
+
+
+def test_stream_does_not_take_a_second_connection_while_the_cursor_is_open(client, app_module, db_module):
+    register_user(client, "streamer@example.com", is_admin=True)
+    login_user(client, "streamer@example.com")
+    for i in range(3):
+        create_appointment(client, title=f"held-{i}")
+    client.post("/status/2", data={"status": "done", "next": "/output"})
+    owner_id = fetch_user_id_by_email(db_module, "streamer@example.com")
+    app_module.user_cache.invalidate()
+
+    in_use = []
+
+    def listener(event, *args):
+        if event == "acquire":
+            in_use.append(db_module.pool_stats()["in_use"])
+
+    db_module.add_db_listener(listener)
+    try:
+        rows = app_module.iter_appointments_for_owner(owner_id)
+        emails = [(a.owner_email, a.status_updated_by_email) for a in rows]
+    finally:
+        db_module.remove_db_listener(listener)
+
+    assert emails == [("streamer@example.com", ""), ("streamer@example.com", "streamer@example.com"), ("streamer@example.com", "")]
+    assert max(in_use) == 1
+
+
 def test_edit_cannot_change_date_or_status_and_updates_updated_at(client, db_module):
     register_user(client, "user3@example.com")
     login_user(client, "user3@example.com")
@@ -226,3 +290,339 @@ def test_theme_route_invalid_theme_falls_back_to_enterprise(client):
 
     login_res = client.get("/login")
     assert "css/enterprise.css" in login_res.get_data(as_text=True)
+
+
+def test_output_is_paginated_with_keyset_links(client, db_module):
+    register_user(client, "pager@example.com")
+    login_user(client, "pager@example.com")
+    for i in range(5):
+        create_appointment(client, title=f"appt-{i}")
+
+    first = client.get("/output?limit=2").get_data(as_text=True)
+    assert "appt-4" in first and "appt-3" in first
+    assert "appt-2" not in first
+    assert "before=4" in first
+    assert "after=" not in first
+
+    second = client.get("/output?limit=2&before=4").get_data(as_text=True)
+    assert "appt-2" in second and "appt-1" in second
+    assert "appt-3" not in second
+    assert "after=3" in second
+    assert "before=2" in second
+
+    back = client.get("/output?limit=2&after=3").get_data(as_text=True)
+    assert "appt-4" in back and "appt-3" in back
+    assert "after=" not in back
+
+    last = client.get("/output?limit=2&before=2").get_data(as_text=True)
+    assert "appt-0" in last
+    assert "before=" not in last
+
+
+def test_output_page_size_is_clamped(client, app_module):
+    register_user(client, "clamp@example.com")
+    login_user(client, "clamp@example.com")
+    create_appointment(client, title="only")
+
+    res = client.get(f"/output?limit={app_module.MAX_PAGE_SIZE + 1000}")
+    assert res.status_code == 200
+    assert "only" in res.get_data(as_text=True)
+
+
+def test_current_user_is_served_from_cache_until_invalidated(client, db_module):
+    from user_cache import user_cache
+
+    register_user(client, "cached-admin@example.com", is_admin=True)
+    login_user(client, "cached-admin@example.com")
+    admin_id = fetch_user_id_by_email(db_module, "cached-admin@example.com")
+    assert client.get("/admin/users").status_code == 200
+
+    with db_module.get_cursor() as cur:
+        cur.execute("UPDATE users SET is_admin = FALSE WHERE id = %s", (admin_id,))
+
+    assert client.get("/admin/users").status_code == 200
+
+    user_cache.invalidate(admin_id)
+    assert client.get("/admin/users").status_code == 403
+
+
+def test_deleted_user_is_logged_out_after_cache_ttl(client, db_module, monkeypatch):
+    from user_cache import user_cache
+
+    monkeypatch.setattr(user_cache, "ttl", 0.05)
+    register_user(client, "gone@example.com")
+    login_user(client, "gone@example.com")
+    assert client.get("/output").status_code == 200
+
+    with db_module.get_cursor() as cur:
+        cur.execute("DELETE FROM users WHERE email = 'gone@example.com'")
+
+    time.sleep(0.1)
+    res = client.get("/output", follow_redirects=False)
+    assert res.status_code == 302
+    assert res.headers["Location"].endswith("/login")
+
+
+def test_create_appointment_rejects_invalid_date_and_stores_starts_at(client, db_module):
+    register_user(client, "dates@example.com")
+    login_user(client, "dates@example.com")
+
+    res = client.post(
+        "/input",
+        data={"title": "bad", "date": "2026-13-45", "time": "09:00"},
+        follow_redirects=True,
+    )
+    assert "תאריך או שעה לא תקינים" in res.get_data(as_text=True)
+
+    create_appointment(client, title="good", date_text="2026-03-04", time_text="08:15")
+    appt_id = fetch_latest_appt_id(db_module)
+    client.post(
+        f"/edit/{appt_id}",
+        data={"title": "good", "time_text": "17:45", "location": "", "notes": ""},
+    )
+
+    with db_module.get_cursor() as cur:
+        cur.execute("SELECT COUNT(*), MAX(starts_at) FROM testapp_appointments")
+        count, starts_at = cur.fetchone()
+    assert count == 1
+    assert starts_at.strftime("%Y-%m-%d %H:%M") == "2026-03-04 17:45"
+
+
+def test_output_filters_by_upcoming_past_and_date_range(client):
+    register_user(client, "filters@example.com")
+    login_user(client, "filters@example.com")
+    create_appointment(client, title="long-ago", date_text="2001-05-01", time_text="10:00")
+    create_appointment(client, title="far-future", date_text="2099-05-01", time_text="10:00")
+    create_appointment(client, title="near-future", date_text="2098-01-01", time_text="10:00")
+
+    upcoming = client.get("/output?when=upcoming").get_data(as_text=True)
+    assert "long-ago" not in upcoming
+    assert upcoming.index("near-future") < upcoming.index("far-future")
+
+    past = client.get("/output?when=past").get_data(as_text=True)
+    assert "long-ago" in past
+    assert "future" not in past
+
+    ranged = client.get("/output?from=2098-01-01&to=2098-12-31").get_data(as_text=True)
+    assert "near-future" in ranged
+    assert "far-future" not in ranged
+    assert "long-ago" not in ranged
+
+
+def test_date_filtered_pages_follow_starts_at_order(client):
+    register_user(client, "datepages@example.com")
+    login_user(client, "datepages@example.com")
+    for day in ("05", "01", "04", "02", "03"):
+        create_appointment(client, title=f"day-{day}", date_text=f"2090-01-{day}", time_text="09:00")
+
+    first = client.get("/output?when=upcoming&limit=2").get_data(as_text=True)
+    assert "day-01" in first and "day-02" in first
+    assert "day-03" not in first
+
+    # day-02 נוצרה רביעית, לכן הסמן לדף הבא הוא המזהה שלה
+    second = client.get("/output?when=upcoming&limit=2&before=4").get_data(as_text=True)
+    assert "day-03" in second and "day-04" in second
+    assert "day-02" not in second
+    assert "when=upcoming" in second
+
+
+def test_date_filtered_next_link_survives_deleting_its_cursor_row(client, app_module):
+    register_user(client, "stalecursor@example.com")
+    login_user(client, "stalecursor@example.com")
+    for day in ("01", "02", "03", "04"):
+        create_appointment(client, title=f"day-{day}", date_text=f"2090-01-{day}", time_text="09:00")
+
+    first = client.get("/output?when=upcoming&limit=2").get_data(as_text=True)
+    next_url = re.search(r'href="([^"]*before=[^"]*)"', first).group(1).replace("&amp;", "&")
+    assert "at=2090-01-02T09:00:00" in next_url
+
+    client.post("/delete/2")
+    second = client.get(next_url).get_data(as_text=True)
+    assert "day-03" in second and "day-04" in second
+
+    listed = client.get(next_url.replace("/output", "/api/appointments")).get_json()["appointments"]
+    assert [a["title"] for a in listed] == ["day-03", "day-04"]
+
+
+def test_backfill_starts_at_fills_legacy_rows_in_batches(db_module):
+    import backfill_starts_at
+
+    with db_module.get_cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO testapp_appointments (title, date_text, time_text, status)
+            VALUES ('a', '2026-01-01', '09:00', 'planned'),
+                   ('b', '2026-01-02', '10:30', 'planned'),
+                   ('c', 'מחר', 'בבוקר', 'planned')
+            """
+        )
+
+    assert backfill_starts_at.backfill(batch_size=1) == 2
+    assert backfill_starts_at.count_unparsed() == 1
+    backfill_starts_at.create_index()
+
+
+def test_stream_mode_renders_full_history_without_pagination(client, app_module, db_module, monkeypatch):
+    monkeypatch.setattr(app_module, "STREAM_CHUNK_SIZE", 2)
+    register_user(client, "stream@example.com")
+    login_user(client, "stream@example.com")
+    for i in range(5):
+        create_appointment(client, title=f"streamed-{i}")
+
+    res = client.get("/output?stream=1&limit=2")
+    assert res.is_streamed
+    text = res.get_data(as_text=True)
+    for i in range(5):
+        assert f"streamed-{i}" in text
+    assert text.index("streamed-4") < text.index("streamed-0")
+    assert "before=" not in text
+    assert db_module.pool_stats()["in_use"] == 0
+
+
+def test_stream_mode_with_no_rows_shows_empty_message(client):
+    register_user(client, "stream-empty@example.com")
+    login_user(client, "stream-empty@example.com")
+
+    text = client.get("/output?stream=1").get_data(as_text=True)
+    assert "אין פגישות שמורות" in text
+
+
+def test_owner_bulk_complete_and_delete_only_touch_own_rows(client, db_module):
+    register_user(client, "bulk-other@example.com")
+    login_user(client, "bulk-other@example.com")
+    create_appointment(client, title="foreign")
+    foreign_id = fetch_latest_appt_id(db_module)
+    logout_user(client)
+
+    register_user(client, "bulk-owner@example.com")
+    login_user(client, "bulk-owner@example.com")
+    for i in range(3):
+        create_appointment(client, title=f"mine-{i}")
+    mine = [foreign_id + 1, foreign_id + 2, foreign_id + 3]
+
+    res = client.post(
+        "/bulk/complete",
+        data={"ids": [mine[0], mine[1], foreign_id]},
+        headers={"Accept": "application/json"},
+    )
+    body = res.get_json()
+    assert body["changed"] == 2
+    assert {r["id"]: r["ok"] for r in body["results"]} == {mine[0]: True, mine[1]: True, foreign_id: False}
+    assert fetch_one_appointment(db_module, mine[0])[6] == "done"
+    assert fetch_one_appointment(db_module, foreign_id)[6] == "planned"
+
+    res = client.post("/bulk/delete", data={"ids": [mine[2], foreign_id], "next": "/output"})
+    assert res.status_code == 302
+    assert fetch_one_appointment(db_module, mine[2]) is None
+    assert fetch_one_appointment(db_module, foreign_id) is not None
+
+
+def test_admin_bulk_status_sets_audit_fields(client, db_module):
+    register_user(client, "bulk-admin@example.com", is_admin=True)
+    login_user(client, "bulk-admin@example.com")
+    create_appointment(client, title="one")
+    create_appointment(client, title="two")
+    admin_id = fetch_user_id_by_email(db_module, "bulk-admin@example.com")
+
+    res = client.post(
+        "/admin/bulk/status",
+        data={"ids": [1, 2, 999], "status": "canceled"},
+        headers={"Accept": "application/json"},
+    )
+    body = res.get_json()
+    assert body["changed"] == 2
+    assert [r["ok"] for r in body["results"]] == [True, True, False]
+    for appt_id in (1, 2):
+        row = fetch_one_appointment(db_module, appt_id)
+        assert row[6] == "canceled"
+        assert row[9] is not None
+        assert row[10] == admin_id
+
+    bad = client.post("/admin/bulk/status", data={"ids": [1], "status": "nope"}, headers={"Accept": "application/json"})
+    assert bad.status_code == 400
+
+
+def test_bulk_accepts_json_ids_and_refuses_oversized_selections(client, app_module, db_module, monkeypatch):
+    register_user(client, "bulk-json@example.com", is_admin=True)
+    login_user(client, "bulk-json@example.com")
+    create_appointment(client, title="one")
+    create_appointment(client, title="two")
+    create_appointment(client, title="three")
+
+    res = client.post("/bulk/complete", json={"ids": [1, "2", "x"]})
+    assert [r["id"] for r in res.get_json()["results"]] == [1, 2]
+    assert fetch_one_appointment(db_module, 2)[6] == "done"
+
+    res = client.post("/admin/bulk/status", json={"ids": [3], "status": "canceled"})
+    assert res.get_json()["changed"] == 1
+
+    monkeypatch.setattr(app_module, "MAX_BULK_IDS", 2)
+    res = client.post("/bulk/delete", json={"ids": [1, 2, 3]})
+    assert res.status_code == 400
+    res = client.post("/bulk/delete", data={"ids": [1, 2, 3], "next": "/output"}, follow_redirects=True)
+    assert "אפשר לבחור עד 2 פגישות" in res.get_data(as_text=True)
+    for appt_id in (1, 2, 3):
+        assert fetch_one_appointment(db_module, appt_id) is not None
+
+
+def test_regular_user_cannot_bulk_change_status(client):
+    register_user(client, "bulk-regular@example.com")
+    login_user(client, "bulk-regular@example.com")
+    create_appointment(client, title="x")
+
+    text = client.get("/output").get_data(as_text=True)
+    assert "/bulk/complete" in text
+    assert "/admin/bulk/status" not in text
+    assert client.post("/admin/bulk/status", data={"ids": [1], "status": "done"}).status_code == 403
+
+
+def test_output_search_ranks_title_matches_and_falls_back_to_partial_words(client, db_module):
+    register_user(client, "search@example.com")
+    login_user(client, "search@example.com")
+    create_appointment(client, title="ישיבת צוות שבועית")
+    create_appointment(client, title="רופא שיניים")
+    create_appointment(client, title="בדיקה בתל-השומר")
+    with db_module.get_cursor() as cur:
+        cur.execute("UPDATE testapp_appointments SET notes = 'להביא מסמכים לצוות' WHERE id = 2")
+
+    text = client.get("/output?q=צוות").get_data(as_text=True)
+    assert "ישיבת צוות שבועית" in text
+    assert "רופא שיניים" not in text
+
+    text = client.get("/output?q=שיני").get_data(as_text=True)
+    assert "רופא שיניים" in text
+    assert "ישיבת צוות" not in text
+
+    # "שומר" אינו תחילית של אף מילה, ולכן נמצא רק בחיפוש החלקי
+    text = client.get("/output?q=שומר").get_data(as_text=True)
+    assert "בדיקה בתל-השומר" in text
+    assert "רופא שיניים" not in text
+
+    client.post("/complete/3")
+    assert "בדיקה בתל-השומר" not in client.get("/output?q=שומר&status=planned").get_data(as_text=True)
+    assert "בדיקה בתל-השומר" in client.get("/output?q=שומר&status=done").get_data(as_text=True)
+
+    assert "אין פגישות שמורות" in client.get("/output?q=לא-קיים").get_data(as_text=True)
+
+
+def test_search_is_scoped_to_owner_and_ranked_in_api(client, db_module):
+    register_user(client, "search-other@example.com")
+    login_user(client, "search-other@example.com")
+    create_appointment(client, title="דוח רבעוני")
+    logout_user(client)
+
+    register_user(client, "search-api@example.com")
+    login_user(client, "search-api@example.com")
+    create_appointment(client, title="הכנה")
+    create_appointment(client, title="דוח שנתי")
+    with db_module.get_cursor() as cur:
+        cur.execute("UPDATE testapp_appointments SET notes = 'לסיים את הדוח' WHERE id = 2")
+
+    body = client.get("/api/appointments?q=דוח").get_json()
+    assert [a["title"] for a in body["appointments"]] == ["דוח שנתי"]
+    assert body["next"] is None
+
+    with db_module.get_cursor() as cur:
+        cur.execute("UPDATE testapp_appointments SET notes = 'דוח' WHERE id = 2")
+    body = client.get("/api/appointments?q=דוח").get_json()
+    assert [a["title"] for a in body["appointments"]] == ["דוח שנתי", "הכנה"]
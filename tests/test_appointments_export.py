@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+
+from test_app import create_appointment, fetch_user_id_by_email, login_user, logout_user, register_user
+
+
+def test_owner_csv_export_contains_only_own_rows(client):
+    register_user(client, "other@example.com")
+    login_user(client, "other@example.com")
+    create_appointment(client, title="not mine")
+    logout_user(client)
+
+    register_user(client, "exporter@example.com")
+    login_user(client, "exporter@example.com")
+    create_appointment(client, title="שורה, עם \"מרכאות\"", date_text="2026-01-05")
+    create_appointment(client, title="second", date_text="2026-02-05")
+
+    res = client.get("/export/appointments.csv")
+    assert res.status_code == 200
+    assert res.mimetype == "text/csv"
+    assert "attachment" in res.headers["Content-Disposition"]
+
+    rows = list(csv.DictReader(io.StringIO(res.get_data(as_text=True))))
+    assert [r["title"] for r in rows] == ["שורה, עם \"מרכאות\"", "second"]
+    assert {r["owner_email"] for r in rows} == {"exporter@example.com"}
+
+    ranged = client.get("/export/appointments.csv?from=2026-02-01&to=2026-02-28")
+    rows = list(csv.DictReader(io.StringIO(ranged.get_data(as_text=True))))
+    assert [r["title"] for r in rows] == ["second"]
+
+
+def test_ndjson_export_lines_are_valid_json(client):
+    register_user(client, "ndjson@example.com")
+    login_user(client, "ndjson@example.com")
+    create_appointment(client, title="back\\slash \"quoted\"")
+
+    res = client.get("/export/appointments.ndjson")
+    assert res.mimetype == "application/x-ndjson"
+    lines = [line for line in res.get_data(as_text=True).splitlines() if line]
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert record["title"] == "back\\slash \"quoted\""
+    assert record["status"] == "planned"
+
+
+def test_admin_export_filters_by_owner_and_status(client, db_module):
+    register_user(client, "owner-a@example.com")
+    login_user(client, "owner-a@example.com")
+    create_appointment(client, title="a-1")
+    create_appointment(client, title="a-2")
+    logout_user(client)
+
+    register_user(client, "export-admin@example.com", is_admin=True)
+    login_user(client, "export-admin@example.com")
+    create_appointment(client, title="admin-own")
+    owner_id = fetch_user_id_by_email(db_module, "owner-a@example.com")
+
+    with db_module.get_cursor() as cur:
+        cur.execute("UPDATE testapp_appointments SET status = 'done' WHERE title = 'a-2'")
+
+    res = client.get(f"/admin/export/appointments.csv?owner={owner_id}&status=done")
+    rows = list(csv.DictReader(io.StringIO(res.get_data(as_text=True))))
+    assert [r["title"] for r in rows] == ["a-2"]
+
+    everything = client.get("/admin/export/appointments.ndjson")
+    titles = {json.loads(line)["title"] for line in everything.get_data(as_text=True).splitlines()}
+    assert titles == {"a-1", "a-2", "admin-own"}
+
+
+def test_regular_user_cannot_use_admin_export(client):
+    register_user(client, "plain@example.com")
+    login_user(client, "plain@example.com")
+    assert client.get("/admin/export/appointments.csv").status_code == 403
+    assert client.get("/export/appointments.xml").status_code == 404
+
+
+def test_stream_export_chunks_and_releases_connection(db_module):
+    import appointments_export
+
+    with db_module.get_cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO testapp_appointments (title, date_text, time_text, status)
+            SELECT 'bulk ' || g, '2026-01-01', '09:00', 'planned'
+            FROM generate_series(1, 500) g
+            """
+        )
+
+    chunks = list(appointments_export.stream_export("csv", chunk_bytes=1024))
+    assert len(chunks) > 1
+    assert b"".join(chunks).count(b"\n") == 501
+
+    partial = appointments_export.stream_export("ndjson", chunk_bytes=256)
+    next(partial)
+    partial.close()
+    assert db_module.pool_stats()["in_use"] == 0
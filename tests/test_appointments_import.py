@@ -0,0 +1,141 @@
+import csv
+import io
+import json
+
+import pytest
+
+from test_app import login_user, register_user
+
+
+def count_appointments(db_module):
+    with db_module.get_cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM testapp_appointments")
+        return cur.fetchone()[0]
+
+
+def test_csv_import_loads_valid_rows_and_reports_errors(client, db_module):
+    import appointments_import
+
+    register_user(client, "importer@example.com")
+    payload = io.StringIO(
+        "title,date,time,location,notes,status,owner_email\n"
+        "ok 1,2026-01-01,09:00,תל אביב,,planned,importer@example.com\n"
+        ",2026-01-01,09:00,,,planned,importer@example.com\n"
+        "bad date,2026-02-30,09:00,,,planned,importer@example.com\n"
+        "bad status,2026-01-01,09:00,,,archived,importer@example.com\n"
+        "no owner,2026-01-01,09:00,,,planned,ghost@example.com\n"
+        "ok 2,2026-01-02,10:30:00,,הערה,done,\n"
+    )
+
+    result = appointments_import.import_appointments(payload, "csv", default_owner_email="importer@example.com")
+
+    assert result["total"] == 6
+    assert result["inserted"] == 2
+    assert [e["line"] for e in result["errors"]] == [3, 4, 5, 6]
+    assert count_appointments(db_module) == 2
+
+    with db_module.get_cursor() as cur:
+        cur.execute("SELECT title, time_text, starts_at, status FROM testapp_appointments ORDER BY id")
+        rows = cur.fetchall()
+    assert rows[0][0] == "ok 1"
+    assert rows[1][1] == "10:30"
+    assert rows[1][2].strftime("%Y-%m-%d %H:%M") == "2026-01-02 10:30"
+    assert rows[1][3] == "done"
+
+
+def test_csv_error_lines_count_quoted_line_breaks(client, db_module):
+    import appointments_import
+
+    register_user(client, "multiline@example.com")
+    payload = io.StringIO(
+        "title,date,time,notes\n"
+        'ok,2026-01-01,09:00,"first line\nsecond line\nthird line"\n'
+        "bad date,2026-02-30,09:00,\n",
+        newline="",
+    )
+
+    result = appointments_import.import_appointments(payload, "csv", default_owner_email="multiline@example.com")
+
+    assert result["inserted"] == 1
+    assert [e["line"] for e in result["errors"]] == [5]
+
+
+def test_ndjson_import_reports_malformed_lines(client, db_module):
+    import appointments_import
+
+    register_user(client, "nd-import@example.com")
+    lines = [
+        json.dumps({"title": "json ok", "date_text": "2026-05-01", "time_text": "08:00", "owner_email": "nd-import@example.com"}),
+        "{not json",
+        json.dumps(["not", "an", "object"]),
+    ]
+    result = appointments_import.import_appointments(io.StringIO("\n".join(lines)), "ndjson")
+
+    assert result["inserted"] == 1
+    assert [e["line"] for e in result["errors"]] == [2, 3]
+    assert count_appointments(db_module) == 1
+
+
+def test_admin_upload_endpoint_imports_file(client, db_module):
+    register_user(client, "import-admin@example.com", is_admin=True)
+    login_user(client, "import-admin@example.com")
+
+    data = {
+        "file": (io.BytesIO("title,date,time\nuploaded,2026-03-03,12:00\n".encode("utf-8-sig")), "rows.csv"),
+        "owner_email": "import-admin@example.com",
+    }
+    res = client.post("/admin/import", data=data, content_type="multipart/form-data")
+    assert res.status_code == 200
+    assert "יובאו 1 מתוך 1 שורות" in res.get_data(as_text=True)
+    assert count_appointments(db_module) == 1
+
+
+def test_regular_user_cannot_upload_import(client):
+    register_user(client, "no-import@example.com")
+    login_user(client, "no-import@example.com")
+    assert client.get("/admin/import").status_code == 403
+
+
+def upload(client, payload, filename="rows.csv"):
+    data = {"file": (io.BytesIO(payload), filename), "owner_email": "import-admin@example.com"}
+    return client.post("/admin/import", data=data, content_type="multipart/form-data", follow_redirects=True)
+
+
+def test_upload_with_invalid_utf8_is_refused_without_inserting(client, db_module):
+    register_user(client, "import-admin@example.com", is_admin=True)
+    login_user(client, "import-admin@example.com")
+
+    res = upload(client, b"title,date,time\nok,2026-03-03,12:00\n\xff\xfe,2026-03-03,12:00\n")
+
+    assert res.status_code == 200
+    assert "לא ניתן לקרוא את הקובץ" in res.get_data(as_text=True)
+    assert count_appointments(db_module) == 0
+
+
+def test_invalid_utf8_surfaces_as_a_decode_error(client, db_module):
+    import appointments_import
+
+    register_user(client, "decode@example.com")
+    stream = io.TextIOWrapper(io.BytesIO(b"title,date,time\n\xff,2026-03-03,12:00\n"), encoding="utf-8", newline="")
+
+    with pytest.raises(UnicodeDecodeError):
+        appointments_import.import_appointments(stream, "csv", default_owner_email="decode@example.com")
+
+
+def test_nul_bytes_and_oversized_fields_are_reported_per_line(client, db_module):
+    register_user(client, "import-admin@example.com", is_admin=True)
+    login_user(client, "import-admin@example.com")
+    payload = (
+        b"title,date,time,notes\n"
+        b"nul\x00title,2026-03-03,12:00,\n"
+        b"huge,2026-03-03,12:00," + b"x" * (csv.field_size_limit() + 1) + b"\n"
+        b"kept,2026-03-03,12:00,\n"
+    )
+
+    res = upload(client, payload)
+
+    text = res.get_data(as_text=True)
+    assert "יובאו 1 מתוך 3 שורות" in text
+    assert "תו לא חוקי בשורה" in text
+    assert "שורת CSV לא תקינה" in text
+    assert count_appointments(db_module) == 1
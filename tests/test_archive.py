@@ -0,0 +1,89 @@
+import importlib
+
+import pytest
+
+from test_app import create_appointment, fetch_user_id_by_email, login_user, register_user
+from test_status_counters import stored_counts
+
+
+@pytest.fixture
+def archive(app_module):
+    return importlib.import_module("archive")
+
+
+def appointment_ids(db_module, table):
+    with db_module.get_cursor() as cur:
+        cur.execute(f"SELECT id FROM {table} ORDER BY id")
+        return [r[0] for r in cur.fetchall()]
+
+
+def owner_with_history(client, db_module):
+    register_user(client, "archived@example.com")
+    login_user(client, "archived@example.com")
+    create_appointment(client, title="old done", date_text="2020-01-01")
+    create_appointment(client, title="old canceled", date_text="2020-01-02")
+    create_appointment(client, title="old planned", date_text="2020-01-03")
+    create_appointment(client, title="future done", date_text="2099-01-01")
+    client.post("/complete/1")
+    client.post("/complete/4")
+    with db_module.get_cursor() as cur:
+        cur.execute("UPDATE testapp_appointments SET status = 'canceled' WHERE id = 2")
+    return fetch_user_id_by_email(db_module, "archived@example.com")
+
+
+def test_only_old_finished_appointments_move(client, db_module, archive):
+    owner_id = owner_with_history(client, db_module)
+    counts = stored_counts(db_module, owner_id)
+
+    assert archive.archive_appointments(days=30, batch_size=1, pause=0) == 2
+
+    assert appointment_ids(db_module, "testapp_appointments") == [3, 4]
+    assert appointment_ids(db_module, "testapp_appointments_archive") == [1, 2]
+    assert stored_counts(db_module, owner_id) == counts
+
+    import status_counters
+
+    assert status_counters.check_status_counts() == []
+    assert archive.archive_appointments(days=30, pause=0) == 0
+
+
+def test_locked_rows_are_skipped_and_picked_up_later(client, db_module, archive):
+    owner_with_history(client, db_module)
+
+    conn = db_module.get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id FROM testapp_appointments WHERE id = 1 FOR UPDATE")
+            assert archive.archive_appointments(days=30, pause=0) == 1
+        conn.rollback()
+    finally:
+        conn.close()
+
+    assert appointment_ids(db_module, "testapp_appointments_archive") == [2]
+    assert archive.archive_appointments(days=30, pause=0) == 1
+    assert appointment_ids(db_module, "testapp_appointments_archive") == [1, 2]
+
+
+def test_list_reads_the_archive_only_when_asked(client, db_module, archive):
+    owner_with_history(client, db_module)
+    archive.archive_appointments(days=30, pause=0)
+
+    hot = client.get("/output").get_data(as_text=True)
+    assert "old done" not in hot and "old planned" in hot
+
+    text = client.get("/output?archive=1").get_data(as_text=True)
+    assert "old done" in text and "old canceled" in text and "old planned" in text
+    assert text.count("בארכיון") == 2
+    assert 'action="/delete/1"' not in text and 'action="/delete/3"' in text
+
+    past = client.get("/output?archive=1&when=past&limit=1").get_data(as_text=True)
+    assert "old planned" in past and "archive=1" in past
+
+    streamed = client.get("/output?archive=1&stream=1").get_data(as_text=True)
+    assert streamed.count("בארכיון") == 2
+
+    found = client.get("/output?archive=1&q=canceled").get_data(as_text=True)
+    assert "old canceled" in found
+
+    items = client.get("/api/appointments?archive=1").get_json()["appointments"]
+    assert {a["id"]: a["archived"] for a in items} == {1: True, 2: True, 3: False, 4: False}
@@ -0,0 +1,98 @@
+import asyncio
+import importlib
+
+import pytest
+
+from test_app import create_appointment, fetch_one_appointment, fetch_user_id_by_email, login_user, register_user
+
+pytest.importorskip("quart")
+pytest.importorskip("psycopg_pool")
+
+
+@pytest.fixture
+def asgi_module(app_module):
+    return importlib.import_module("asgi_app")
+
+
+def run_with_client(asgi_module, scenario):
+    async def main():
+        async with asgi_module.app.test_app() as test_app:
+            return await scenario(test_app.test_client())
+
+    return asyncio.run(main())
+
+
+def test_async_routes_login_create_list_and_change_status(client, db_module, asgi_module):
+    register_user(client, "async-admin@example.com", is_admin=True)
+
+    async def scenario(aclient):
+        res = await aclient.post("/login", form={"email": "async-admin@example.com", "password": "secret"})
+        assert res.status_code == 302
+        assert res.headers["Location"].endswith("/output")
+
+        res = await aclient.post("/input", form={"title": "פגישה אסינכרונית", "date": "2026-03-01", "time": "08:30"})
+        assert res.status_code == 302
+
+        text = await (await aclient.get("/output")).get_data(as_text=True)
+        assert "פגישה אסינכרונית" in text
+        assert "/status/1" in text
+        assert "EventSource" in text
+        # אותה גרסה שה-SSE ישלח, כך שהאירוע הראשון לא נבלע בלי רענון
+        owner_id = fetch_user_id_by_email(db_module, "async-admin@example.com")
+        assert f'data-version="{asgi_module.sync_app.owner_data_version(owner_id)[0]}"' in text
+
+        text = await (await aclient.get("/status/1?next=/output")).get_data(as_text=True)
+        assert "פגישה אסינכרונית" in text
+
+        res = await aclient.post("/status/1", form={"status": "done", "next": "/output"})
+        assert res.status_code == 302
+
+        text = await (await aclient.get("/admin/users")).get_data(as_text=True)
+        assert "async-admin@example.com" in text
+        return text
+
+    run_with_client(asgi_module, scenario)
+
+    row = fetch_one_appointment(db_module, 1)
+    assert row[6] == "done"
+    assert row[9] is not None
+
+
+def test_async_routes_require_login_and_admin(client, asgi_module):
+    register_user(client, "async-regular@example.com")
+
+    async def scenario(aclient):
+        res = await aclient.get("/output")
+        assert res.status_code == 302
+        assert res.headers["Location"].endswith("/login")
+
+        await aclient.post("/login", form={"email": "async-regular@example.com", "password": "wrong"})
+        assert (await aclient.get("/output")).status_code == 302
+
+        await aclient.post("/login", form={"email": "async-regular@example.com", "password": "secret"})
+        assert (await aclient.get("/output")).status_code == 200
+        assert (await aclient.get("/admin/users")).status_code == 403
+        assert (await aclient.get("/status/1")).status_code == 403
+
+    run_with_client(asgi_module, scenario)
+
+
+def test_session_cookie_is_shared_with_sync_app(client, asgi_module):
+    register_user(client, "async-shared@example.com")
+    login_user(client, "async-shared@example.com")
+    create_appointment(client, title="נוצרה ב-Flask")
+    cookie = client.get_cookie("session").value
+
+    async def scenario(aclient):
+        aclient.set_cookie("localhost", "session", cookie)
+        return await (await aclient.get("/output?q=Flask")).get_data(as_text=True)
+
+    assert "נוצרה ב-Flask" in run_with_client(asgi_module, scenario)
+
+
+def test_routes_without_async_version_fall_through_to_flask(asgi_module):
+    assert asgi_module.serves_async("GET", "/output")
+    assert asgi_module.serves_async("POST", "/status/3")
+    assert not asgi_module.serves_async("GET", "/edit/3")
+    assert not asgi_module.serves_async("POST", "/bulk/complete")
+    assert not asgi_module.serves_async("GET", "/api/appointments")
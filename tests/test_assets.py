@@ -0,0 +1,85 @@
+import gzip
+import importlib
+
+import pytest
+
+from test_app import login_user, register_user
+
+
+@pytest.fixture
+def assets(app_module, tmp_path, monkeypatch):
+    module = importlib.import_module("assets")
+    monkeypatch.setattr(module, "ASSET_DIR", str(tmp_path / "dist"))
+    module.build(asset_dir=module.ASSET_DIR)
+    yield module
+    module.reset()
+
+
+def test_page_links_fingerprinted_theme_css(client, assets):
+    register_user(client, "assets@example.com")
+    login_user(client, "assets@example.com")
+    hashed = assets.load_manifest()["css/enterprise.css"]
+
+    text = client.get("/output").get_data(as_text=True)
+
+    assert f'href="/assets/{hashed}"' in text
+    assert "/static/css/" not in text
+
+
+def test_asset_is_served_precompressed_and_immutable(client, assets):
+    hashed = assets.load_manifest()["css/enterprise.css"]
+    with open(f"{assets.STATIC_DIR}/css/enterprise.css", "rb") as f:
+        source = f.read()
+
+    response = client.get(f"/assets/{hashed}", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.mimetype == "text/css"
+    assert "immutable" in response.headers["Cache-Control"]
+    assert f"max-age={assets.ASSET_MAX_AGE}" in response.headers["Cache-Control"]
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data) == source
+
+    plain = client.get(f"/assets/{hashed}", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.data == source
+
+
+def test_brotli_is_preferred_when_accepted(client, assets):
+    if assets.brotli is None:
+        pytest.skip("brotli is not installed")
+    hashed = assets.load_manifest()["css/dark.css"]
+
+    response = client.get(f"/assets/{hashed}", headers={"Accept-Encoding": "gzip, deflate, br"})
+
+    assert response.headers["Content-Encoding"] == "br"
+    with open(f"{assets.STATIC_DIR}/css/dark.css", "rb") as f:
+        assert assets.brotli.decompress(response.data) == f.read()
+
+
+def test_only_built_files_are_served(client, assets):
+    assert client.get("/assets/css/enterprise.css").status_code == 404
+    assert client.get("/assets/manifest.json").status_code == 404
+
+
+def test_without_manifest_css_falls_back_to_static(client, assets, tmp_path, monkeypatch):
+    monkeypatch.setattr(assets, "ASSET_DIR", str(tmp_path / "missing"))
+    assets.reset()
+    register_user(client, "nobuild@example.com")
+    login_user(client, "nobuild@example.com")
+
+    assert 'href="/static/css/enterprise.css"' in client.get("/output").get_data(as_text=True)
+
+
+def test_inline_css_replaces_the_stylesheet_link(client, assets, monkeypatch):
+    monkeypatch.setattr(assets, "ASSETS_INLINE_CSS", True)
+    register_user(client, "inline@example.com")
+    login_user(client, "inline@example.com")
+    with open(f"{assets.STATIC_DIR}/css/enterprise.css", encoding="utf-8") as f:
+        source = f.read()
+
+    text = client.get("/output").get_data(as_text=True)
+
+    assert f"<style>{source}</style>" in text
+    assert 'href="/assets/css/' not in text
@@ -0,0 +1,100 @@
+import os
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def small_pool(db_module):
+    pool = db_module.ConnectionPool(
+        os.environ["DATABASE_URL"],
+        min_size=1,
+        max_size=2,
+        timeout=0.2,
+        health_check_after=0,
+    )
+    yield pool
+    pool.close()
+
+
+def test_get_cursor_reuses_pooled_connection(db_module):
+    with db_module.get_cursor() as cur:
+        cur.execute("SELECT pg_backend_pid()")
+        first_pid = cur.fetchone()[0]
+
+    with db_module.get_cursor() as cur:
+        cur.execute("SELECT pg_backend_pid()")
+        second_pid = cur.fetchone()[0]
+
+    assert first_pid == second_pid
+    stats = db_module.pool_stats()
+    assert stats["in_use"] == 0
+    assert stats["idle"] >= 1
+
+
+def test_get_cursor_rolls_back_on_error(db_module):
+    with pytest.raises(RuntimeError):
+        with db_module.get_cursor() as cur:
+            cur.execute(
+                "INSERT INTO users (email, password_hash) VALUES ('rollback@example.com', 'x')"
+            )
+            raise RuntimeError("boom")
+
+    with db_module.get_cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM users WHERE email = 'rollback@example.com'")
+        assert cur.fetchone()[0] == 0
+
+
+def test_pool_checkout_times_out_and_counts_waits(db_module, small_pool):
+    first = small_pool.getconn()
+    second = small_pool.getconn()
+
+    with pytest.raises(db_module.PoolTimeout):
+        small_pool.getconn()
+
+    stats = small_pool.stats()
+    assert stats["in_use"] == 2
+    assert stats["waits"] == 1
+    assert stats["timeouts"] == 1
+
+    small_pool.putconn(first)
+    small_pool.putconn(second)
+    assert small_pool.stats()["idle"] == 2
+
+
+def test_pool_waiter_gets_released_connection(small_pool):
+    held = [small_pool.getconn(), small_pool.getconn()]
+    small_pool.timeout = 5
+    result = {}
+
+    def worker():
+        result["conn"] = small_pool.getconn()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    small_pool.putconn(held.pop())
+    thread.join(timeout=5)
+
+    assert result["conn"] is not None
+    small_pool.putconn(result["conn"])
+    small_pool.putconn(held.pop())
+
+
+def test_pool_replaces_broken_connection_on_checkout(small_pool):
+    conn = small_pool.getconn()
+    small_pool.putconn(conn)
+    conn.close()
+
+    replacement = small_pool.getconn()
+    assert replacement is not conn
+    assert not replacement.closed
+    assert small_pool.stats()["discarded"] == 1
+    small_pool.putconn(replacement)
+
+
+def test_pool_is_recreated_after_fork(db_module):
+    before = db_module.get_pool()
+    db_module._reset_pool_after_fork()
+    after = db_module.get_pool()
+    assert after is not before
+    before.close()
@@ -0,0 +1,131 @@
+import importlib
+
+import pytest
+
+from test_app import create_appointment, fetch_latest_appt_id, fetch_user_id_by_email, login_user, register_user
+
+
+@pytest.fixture
+def cache_module(app_module):
+    module = importlib.import_module("fragment_cache")
+    module.fragment_cache.clear()
+    return module
+
+
+def list_queries(db_module, client, path):
+    queries = []
+
+    def listener(event, seconds, query, params):
+        if event == "query":
+            queries.append(query)
+
+    db_module.add_db_listener(listener)
+    try:
+        text = client.get(path).get_data(as_text=True)
+    finally:
+        db_module.remove_db_listener(listener)
+    return text, queries
+
+
+def test_memory_backend_evicts_least_recently_used(cache_module):
+    backend = cache_module.MemoryBackend(max_entries=2)
+    backend.set("a", "1")
+    backend.set("b", "2")
+    assert backend.get("a") == "1"
+    assert backend.set("c", "3") == 1
+    assert backend.get("b") is None
+    assert backend.get("a") == "1"
+    assert backend.size() == 2
+
+
+def test_sqlite_backend_is_shared_and_bounded(cache_module, tmp_path):
+    path = str(tmp_path / "fragments.sqlite3")
+    first = cache_module.SqliteBackend(path, max_entries=2)
+    second = cache_module.SqliteBackend(path, max_entries=2)
+
+    first.set("a", "1")
+    first.set("b", "2")
+    assert second.get("a") == "1"
+    assert second.set("c", "3") == 1
+    assert first.get("b") is None
+    assert first.get("c") == "3"
+
+
+def test_second_load_is_served_from_cache_without_list_query(client, db_module, cache_module):
+    register_user(client, "frag@example.com")
+    login_user(client, "frag@example.com")
+    create_appointment(client, title="cached row")
+
+    first, _ = list_queries(db_module, client, "/output")
+    second, queries = list_queries(db_module, client, "/output")
+
+    assert "cached row" in first and "cached row" in second
+    assert not any("FROM testapp_appointments" in q for q in queries)
+    stats = cache_module.fragment_cache.stats()
+    assert stats["hits"] >= 1
+
+
+def test_every_write_path_changes_the_cached_table(client, db_module, cache_module):
+    register_user(client, "writer@example.com", is_admin=True)
+    login_user(client, "writer@example.com")
+    create_appointment(client, title="first title")
+    appt_id = fetch_latest_appt_id(db_module)
+    assert "first title" in client.get("/output").get_data(as_text=True)
+
+    client.post(f"/edit/{appt_id}", data={"title": "second title", "time_text": "10:00"})
+    assert "second title" in client.get("/output").get_data(as_text=True)
+
+    client.post(f"/status/{appt_id}", data={"status": "canceled", "next": "/output"})
+    assert "status-error" in client.get("/output").get_data(as_text=True)
+
+    client.post(f"/delete/{appt_id}")
+    assert "אין פגישות שמורות" in client.get("/output").get_data(as_text=True)
+
+
+def test_viewer_capabilities_are_part_of_the_key(client, db_module, cache_module):
+    register_user(client, "plain@example.com")
+    login_user(client, "plain@example.com")
+    create_appointment(client, title="shared row")
+    owner_id = fetch_user_id_by_email(db_module, "plain@example.com")
+    assert "שנה סטטוס" not in client.get("/output").get_data(as_text=True)
+
+    register_user(client, "viewer@example.com", is_admin=True)
+    login_user(client, "viewer@example.com")
+    text = client.get(f"/admin/users/{owner_id}/appointments").get_data(as_text=True)
+    assert "שנה סטטוס" in text
+    assert "<td>plain@example.com</td>" in text
+
+
+def test_fragment_cache_stats_are_exported(client, cache_module):
+    register_user(client, "scrape@example.com")
+    login_user(client, "scrape@example.com")
+    client.get("/output")
+    client.get("/output")
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'testapp_fragment_cache_requests_total{result="hit"}' in text
+    assert "testapp_fragment_cache_entries" in text
+
+
+def test_default_sqlite_file_is_per_database(cache_module, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "postgresql://localhost/first")
+    first = cache_module.default_cache_path()
+    monkeypatch.setenv("DATABASE_URL", "postgresql://localhost/second")
+
+    assert cache_module.default_cache_path() != first
+
+
+def test_another_database_does_not_read_cached_fragments(client, app_module, cache_module, monkeypatch):
+    register_user(client, "recreated@example.com")
+    login_user(client, "recreated@example.com")
+    client.get("/output")
+    hits = cache_module.fragment_cache.stats()["hits"]
+    client.get("/output")
+    assert cache_module.fragment_cache.stats()["hits"] == hits + 1
+
+    # מסד שנוצר מחדש באותה כתובת: אותם מזהים ואותן גרסאות, OID אחר
+    monkeypatch.setattr(app_module, "database_identity", lambda: -1)
+    client.get("/output")
+
+    stats = cache_module.fragment_cache.stats()
+    assert stats["hits"] == hits + 1 and stats["size"] == 2
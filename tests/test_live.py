@@ -0,0 +1,155 @@
+import asyncio
+import importlib
+import select
+import threading
+
+import pytest
+
+from test_app import create_appointment, fetch_latest_appt_id, fetch_user_id_by_email, login_user, register_user
+
+
+@pytest.fixture
+def live(app_module):
+    module = importlib.import_module("live")
+    return module
+
+
+def wait_for_notify(conn, timeout=5):
+    if select.select([conn], [], [], timeout)[0]:
+        conn.poll()
+    return [n.payload for n in conn.notifies]
+
+
+def test_every_write_notifies_the_owner_once(client, db_module, live):
+    register_user(client, "notify@example.com")
+    login_user(client, "notify@example.com")
+    owner_id = fetch_user_id_by_email(db_module, "notify@example.com")
+
+    conn = db_module.get_db_connection()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {live.APPOINTMENTS_CHANNEL}")
+        create_appointment(client, title="first")
+        create_appointment(client, title="second")
+        payloads = wait_for_notify(conn)
+        conn.notifies.clear()
+
+        ids = [fetch_latest_appt_id(db_module), fetch_latest_appt_id(db_module) - 1]
+        client.post("/bulk/complete", data={"ids": ids})
+        bulk = wait_for_notify(conn)
+    finally:
+        conn.close()
+
+    assert len(payloads) == 2
+    assert all(p.startswith(f"{owner_id}:") for p in payloads)
+    assert len(bulk) == 1
+    with db_module.get_cursor() as cur:
+        cur.execute("SELECT data_version FROM appointment_status_counts WHERE owner_user_id = %s", (owner_id,))
+        assert bulk[0] == f"{owner_id}:{cur.fetchone()[0]}"
+
+
+def test_hub_fans_out_to_the_changed_owner_only(client, db_module, live):
+    register_user(client, "fan@example.com")
+    register_user(client, "other-fan@example.com")
+    owner_id = fetch_user_id_by_email(db_module, "fan@example.com")
+    other_id = fetch_user_id_by_email(db_module, "other-fan@example.com")
+
+    hub = live.LiveHub()
+    woken = {name: threading.Event() for name in ("a", "b", "other")}
+    subs = [
+        hub.subscribe(owner_id, woken["a"].set),
+        hub.subscribe(owner_id, woken["b"].set),
+        hub.subscribe(other_id, woken["other"].set),
+    ]
+    assert hub.ready.wait(5)
+
+    login_user(client, "fan@example.com")
+    create_appointment(client, title="fan out")
+
+    assert woken["a"].wait(5) and woken["b"].wait(5)
+    assert not woken["other"].is_set()
+    assert subs[0].version == subs[1].version
+    assert hub.stats()["subscribers"] == 3
+
+    hub.unsubscribe(subs[0])
+    hub.close_all()
+    assert subs[1].closed and woken["other"].is_set()
+
+
+def test_events_stream_pushes_a_status_change_by_an_admin(client, app_module, db_module, live, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "LIVE_UPDATES", True)
+    register_user(client, "viewer-live@example.com")
+    login_user(client, "viewer-live@example.com")
+    create_appointment(client, title="watched")
+    appt_id = fetch_latest_appt_id(db_module)
+
+    res = client.get("/events", buffered=False)
+    assert res.mimetype == "text/event-stream"
+    assert res.headers["Cache-Control"] == "no-cache"
+    chunks = (chunk.decode() for chunk in res.response)
+    assert next(chunks).startswith("retry: ")
+    initial = next(chunks)
+    assert initial.startswith("event: appointments\ndata: ")
+
+    admin = app_module.app.test_client()
+    register_user(admin, "admin-live@example.com", is_admin=True)
+    login_user(admin, "admin-live@example.com")
+    admin.post(f"/status/{appt_id}", data={"status": "canceled", "next": "/output"})
+
+    pushed = next(chunks)
+    res.close()
+    assert pushed.startswith("event: appointments\ndata: ")
+    assert pushed != initial
+
+
+def test_events_for_another_owner_need_admin(client, app_module, db_module, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "LIVE_UPDATES", True)
+    register_user(client, "someone@example.com")
+    owner_id = fetch_user_id_by_email(db_module, "someone@example.com")
+    register_user(client, "nosy@example.com")
+    login_user(client, "nosy@example.com")
+
+    assert client.get(f"/events?owner={owner_id}").status_code == 403
+
+
+def test_events_are_not_served_when_live_updates_are_off(client, app_module, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "LIVE_UPDATES", False)
+    register_user(client, "no-live@example.com")
+    login_user(client, "no-live@example.com")
+
+    assert client.get("/events").status_code == 404
+
+
+def test_async_stream_ends_when_the_listener_reconnects(live):
+    hub = live.LiveHub()
+
+    async def load_version():
+        return "7"
+
+    async def main():
+        stream = live.stream_events_async(1, load_version, hub=hub)
+        received = [await stream.__anext__(), await stream.__anext__()]
+        hub.publish(1, "8")
+        received.append(await stream.__anext__())
+        hub.close_all()
+        received.extend([chunk async for chunk in stream])
+        return received
+
+    received = asyncio.run(main())
+
+    assert received[1] == live.sse_event("7")
+    assert received[2] == live.sse_event("8")
+    assert len(received) == 3
+    assert hub.stats()["subscribers"] == 0
+
+
+def test_output_subscribes_only_when_live_updates_are_on(client, app_module, monkeypatch):
+    register_user(client, "quiet@example.com")
+    login_user(client, "quiet@example.com")
+
+    assert app_module.app.config["LIVE_UPDATES"] is False
+    assert "EventSource" not in client.get("/output").get_data(as_text=True)
+
+    monkeypatch.setitem(app_module.app.config, "LIVE_UPDATES", True)
+    assert "EventSource" in client.get("/output").get_data(as_text=True)
@@ -0,0 +1,62 @@
+import re
+
+from test_app import create_appointment, login_user, register_user
+
+
+def test_server_timing_reports_queries_db_and_render_time(client):
+    register_user(client, "timing@example.com")
+    login_user(client, "timing@example.com")
+    create_appointment(client, title="x")
+
+    res = client.get("/output")
+    timing = res.headers["Server-Timing"]
+    queries = int(re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', timing).group(1))
+    assert queries >= 1
+    assert "db-acquire;dur=" in timing
+    render = float(re.search(r"render;dur=([\d.]+)", timing).group(1))
+    total = float(re.search(r"total;dur=([\d.]+)", timing).group(1))
+    assert 0 < render <= total
+
+
+def test_metrics_endpoint_exposes_per_endpoint_histograms(client, app_module):
+    import metrics
+
+    register_user(client, "metrics@example.com")
+    login_user(client, "metrics@example.com")
+    metrics.registry.reset()
+    client.post("/login", data={"email": "metrics@example.com", "password": "secret"})
+    client.get("/output")
+    client.get("/output")
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert "# TYPE testapp_request_duration_seconds histogram" in text
+    assert 'testapp_request_duration_seconds_count{endpoint="list_appointments"} 2' in text
+    assert 'testapp_request_duration_seconds_bucket{endpoint="list_appointments",le="+Inf"} 2' in text
+    assert 'testapp_request_duration_seconds_count{endpoint="login_post"} 1' in text
+    assert re.search(r'testapp_db_queries_total\{endpoint="list_appointments"\} [1-9]', text)
+    assert "testapp_db_pool_connections{state=\"in_use\"}" in text
+
+
+def test_db_listeners_see_queries_and_cursor_is_plain_without_them(db_module):
+    seen = []
+
+    def listener(event, seconds, query, params):
+        seen.append((event, query, params))
+
+    db_module.add_db_listener(listener)
+    try:
+        with db_module.get_cursor() as cur:
+            cur.execute("SELECT %s", (1,))
+    finally:
+        db_module.remove_db_listener(listener)
+
+    assert seen[0][0] == "acquire"
+    assert ("query", "SELECT %s", (1,)) in seen
+
+    saved = db_module._db_listeners
+    db_module._db_listeners = ()
+    try:
+        with db_module.get_cursor() as cur:
+            assert type(cur) is db_module.extensions.cursor
+    finally:
+        db_module._db_listeners = saved
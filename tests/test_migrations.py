@@ -0,0 +1,156 @@
+import importlib
+import threading
+
+import pytest
+
+from test_app import create_appointment, fetch_user_id_by_email, login_user, register_user
+
+
+@pytest.fixture
+def migrations(db_module):
+    return importlib.import_module("migrations")
+
+
+def applied_versions(db_module):
+    with db_module.get_cursor() as cur:
+        cur.execute("SELECT version FROM schema_version ORDER BY version")
+        return [r[0] for r in cur.fetchall()]
+
+
+def test_current_schema_only_checks_version_and_partitions(db_module, migrations):
+    queries = []
+
+    def listener(event, seconds, query, params):
+        if event == "query":
+            queries.append(query)
+
+    db_module.add_db_listener(listener)
+    try:
+        assert migrations.migrate() == []
+    finally:
+        db_module.remove_db_listener(listener)
+
+    assert len(queries) == 2
+    assert "testapp_status_events_partition" in queries[1]
+    assert applied_versions(db_module) == [m["version"] for m in migrations.MIGRATIONS]
+
+
+def test_unversioned_database_is_adopted_without_losing_data(client, db_module, migrations):
+    register_user(client, "legacy@example.com")
+    login_user(client, "legacy@example.com")
+    create_appointment(client, title="before migrations")
+    owner_id = fetch_user_id_by_email(db_module, "legacy@example.com")
+
+    # מסד שנוצר ע"י init_db הישן: כל האובייקטים קיימים אבל אין טבלת גרסאות
+    with db_module.get_cursor() as cur:
+        cur.execute("DROP TABLE schema_version")
+
+    assert migrations.migrate() == [m["version"] for m in migrations.MIGRATIONS]
+
+    with db_module.get_cursor() as cur:
+        cur.execute("SELECT title, owner_user_id FROM testapp_appointments")
+        assert cur.fetchall() == [("before migrations", owner_id)]
+        cur.execute("SELECT planned FROM appointment_status_counts WHERE owner_user_id = %s", (owner_id,))
+        assert cur.fetchone()[0] == 1
+
+
+def test_foreign_key_migration_clears_orphans(client, db_module, migrations):
+    register_user(client, "orphan@example.com")
+    login_user(client, "orphan@example.com")
+    create_appointment(client, title="orphaned")
+
+    with db_module.get_cursor() as cur:
+        cur.execute("ALTER TABLE testapp_appointments DROP CONSTRAINT testapp_appointments_owner_user_id_fkey")
+        cur.execute("UPDATE testapp_appointments SET owner_user_id = 999999")
+        cur.execute("DELETE FROM schema_version WHERE version >= 4")
+
+    assert migrations.migrate() == [m["version"] for m in migrations.MIGRATIONS if m["version"] >= 4]
+
+    with db_module.get_cursor() as cur:
+        cur.execute("SELECT owner_user_id FROM testapp_appointments")
+        assert cur.fetchone()[0] is None
+        cur.execute(
+            """
+            SELECT convalidated
+            FROM pg_constraint
+            WHERE conname = 'testapp_appointments_owner_user_id_fkey'
+            """
+        )
+        assert cur.fetchone()[0] is True
+
+
+def test_invalid_index_from_failed_concurrent_build_is_rebuilt(db_module, migrations):
+    with db_module.get_cursor() as cur:
+        cur.execute(
+            """
+            UPDATE pg_index SET indisvalid = FALSE
+            WHERE indexrelid = 'idx_testapp_appointments_owner_user_id_id'::regclass
+            """
+        )
+        cur.execute("DELETE FROM schema_version WHERE version >= 3")
+
+    migrations.migrate()
+
+    with db_module.get_cursor() as cur:
+        cur.execute(
+            """
+            SELECT indisvalid FROM pg_index
+            WHERE indexrelid = 'idx_testapp_appointments_owner_user_id_id'::regclass
+            """
+        )
+        assert cur.fetchone()[0] is True
+
+
+def test_concurrent_migrate_runs_each_migration_once(db_module, migrations):
+    with db_module.get_cursor() as cur:
+        cur.execute("DELETE FROM schema_version WHERE version >= 5")
+
+    results = []
+    errors = []
+
+    def run():
+        try:
+            results.append(migrations.migrate())
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert sorted(v for applied in results for v in applied) == [
+        m["version"] for m in migrations.MIGRATIONS if m["version"] >= 5
+    ]
+    assert applied_versions(db_module) == [m["version"] for m in migrations.MIGRATIONS]
+
+
+def test_search_column_is_backfilled_in_batches_without_a_rewrite(client, db_module, migrations, monkeypatch):
+    register_user(client, "search-backfill@example.com")
+    login_user(client, "search-backfill@example.com")
+    for title in ("dentist", "plumber", "barber"):
+        create_appointment(client, title=title)
+
+    with db_module.get_cursor() as cur:
+        cur.execute(
+            """
+            SELECT attgenerated FROM pg_attribute
+            WHERE attrelid = 'testapp_appointments'::regclass AND attname = 'search_vector'
+            """
+        )
+        assert cur.fetchone()[0] == ""
+        cur.execute("UPDATE testapp_appointments SET search_vector = NULL")
+        cur.execute("DELETE FROM schema_version WHERE version >= 5")
+
+    monkeypatch.setattr(migrations, "SEARCH_BACKFILL_BATCH_SIZE", 2)
+    migrations.migrate()
+
+    with db_module.get_cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM testapp_appointments WHERE search_vector IS NULL")
+        assert cur.fetchone()[0] == 0
+
+    client.post("/edit/1", data={"title": "orthodontist", "time_text": "10:00"})
+    text = client.get("/output?q=orthodontist").get_data(as_text=True)
+    assert "orthodontist" in text and "plumber" not in text
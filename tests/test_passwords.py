@@ -0,0 +1,118 @@
+import importlib
+import time
+
+import pytest
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from test_app import fetch_user_id_by_email, login_user, register_user
+
+
+@pytest.fixture
+def passwords(app_module):
+    return importlib.import_module("passwords")
+
+
+def stored_hash(db_module, email):
+    with db_module.get_cursor() as cur:
+        cur.execute("SELECT password_hash FROM users WHERE email = %s", (email,))
+        return cur.fetchone()[0]
+
+
+def test_register_stores_hash_with_configured_method(client, db_module, passwords):
+    register_user(client, "method@example.com")
+
+    value = stored_hash(db_module, "method@example.com")
+    assert value.startswith(passwords.password_hasher.method + "$")
+    assert check_password_hash(value, "secret")
+
+
+def test_outdated_hash_is_upgraded_on_login(client, db_module, passwords):
+    register_user(client, "legacy-hash@example.com")
+    old = generate_password_hash("secret", method="pbkdf2:sha256:1000")
+    with db_module.get_cursor() as cur:
+        cur.execute("UPDATE users SET password_hash = %s WHERE email = %s", (old, "legacy-hash@example.com"))
+
+    res = client.post("/login", data={"email": "legacy-hash@example.com", "password": "secret"})
+    assert res.headers["Location"].endswith("/output")
+
+    upgraded = stored_hash(db_module, "legacy-hash@example.com")
+    assert upgraded != old
+    assert not passwords.needs_rehash(upgraded, passwords.password_hasher.method)
+    assert "שגויים" not in login_user(client, "legacy-hash@example.com").get_data(as_text=True)
+
+
+def test_wrong_password_does_not_rehash(client, db_module, passwords):
+    register_user(client, "wrong@example.com")
+    old = generate_password_hash("secret", method="pbkdf2:sha256:1000")
+    with db_module.get_cursor() as cur:
+        cur.execute("UPDATE users SET password_hash = %s WHERE email = %s", (old, "wrong@example.com"))
+
+    text = login_user(client, "wrong@example.com", password="nope").get_data(as_text=True)
+
+    assert "אימייל או סיסמה שגויים" in text
+    assert stored_hash(db_module, "wrong@example.com") == old
+
+
+def test_full_queue_turns_logins_away(client, db_module, passwords, monkeypatch):
+    register_user(client, "storm@example.com")
+    monkeypatch.setattr(passwords.password_hasher, "max_pending", 0)
+    rejected = passwords.password_hasher.stats()["rejected"]
+
+    text = login_user(client, "storm@example.com").get_data(as_text=True)
+
+    assert "המערכת עמוסה" in text
+    assert passwords.password_hasher.stats()["rejected"] == rejected + 1
+    assert fetch_user_id_by_email(db_module, "storm@example.com") is not None
+
+
+def test_process_pool_hashes_and_verifies(passwords):
+    hasher = passwords.PasswordHasher(workers=1, max_pending=2, method="pbkdf2:sha256:1000")
+
+    value = hasher.hash("pw")
+
+    assert value.startswith("pbkdf2:sha256:1000$")
+    assert hasher.verify(value, "pw") == (True, None)
+    assert hasher.verify(value, "other") == (False, None)
+    assert hasher.stats()["pending"] == 0
+
+
+def test_broken_pool_is_replaced(passwords):
+    hasher = passwords.PasswordHasher(workers=1, max_pending=2, method="pbkdf2:sha256:1000")
+    hasher.hash("warm up")
+    for process in list(hasher._executor._processes.values()):
+        process.kill()
+        process.join()
+
+    with pytest.raises(passwords.PasswordHasherBusy):
+        hasher.hash("pw")
+    assert hasher.verify(hasher.hash("pw"), "pw") == (True, None)
+
+
+def test_timed_out_hash_keeps_its_slot_until_it_finishes(passwords):
+    hasher = passwords.PasswordHasher(workers=1, max_pending=1, method="pbkdf2:sha256:1000")
+    hasher.hash("warm up")
+    hasher.method = "pbkdf2:sha256:600000"
+    hasher.timeout = 0.01
+
+    with pytest.raises(passwords.PasswordHasherBusy, match="timed out"):
+        hasher.hash("slow")
+    assert hasher.stats()["pending"] == 1
+    with pytest.raises(passwords.PasswordHasherBusy, match="too many"):
+        hasher.hash("next")
+    assert hasher.stats()["rejected"] == 1
+
+    deadline = time.monotonic() + 30
+    while hasher.stats()["pending"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert hasher.stats()["pending"] == 0
+    assert not hasher._executor._pending_work_items
+
+
+def test_short_method_names_do_not_rehash_on_every_login(passwords):
+    for method in ("scrypt", "pbkdf2:sha256"):
+        hasher = passwords.PasswordHasher(workers=0, method=method)
+        value = hasher.hash("pw")
+
+        assert not value.startswith(method + "$")
+        assert hasher.verify(value, "pw") == (True, None)
+        assert hasher.stats()["rehashed"] == 0
@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+from benchmarks.seed import seed, parse_status_mix
+
+
+PLAN_USERS = 200
+PLAN_APPOINTMENTS_PER_USER = 1000
+# עלות מקסימלית לשאילתה, כחלק מעלות סריקה מלאה של הטבלה. השאילתות היקרות ביותר
+# (גרסת הנתונים, חיפוש, רשימה מוזרמת) קוראות את כל השורות של בעלים אחד, כ-20% בנתונים האלה.
+PLAN_COST_BUDGET_FRACTION = 0.3
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def explain(db_module, query, params):
+    with db_module.get_cursor() as cur:
+        cur.execute("EXPLAIN (FORMAT JSON) " + cur.mogrify(query, params).decode())
+        result = cur.fetchone()[0]
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]["Plan"]
+
+
+@pytest.fixture
+def seeded(db_module):
+    seed(PLAN_USERS, PLAN_APPOINTMENTS_PER_USER, parse_status_mix("planned=60,done=30,canceled=10"))
+    with db_module.get_cursor() as cur:
+        cur.execute("SELECT id FROM users WHERE is_admin ORDER BY id LIMIT 1")
+        admin_id = cur.fetchone()[0]
+        cur.execute("SELECT id FROM users WHERE NOT is_admin ORDER BY id LIMIT 1")
+        other_id = cur.fetchone()[0]
+        cur.execute(
+            "SELECT id FROM testapp_appointments WHERE owner_user_id = %s ORDER BY id LIMIT 6",
+            (admin_id,),
+        )
+        appt_ids = [r[0] for r in cur.fetchall()]
+    return {"admin_id": admin_id, "other_id": other_id, "appt_ids": appt_ids}
+
+
+def drive_views(client, seeded):
+    first, second, third, fourth, fifth, sixth = seeded["appt_ids"]
+    other_id = seeded["other_id"]
+    json_headers = {"Accept": "application/json"}
+
+    client.post("/login", data={"email": "bench-0@example.com", "password": "bench"})
+    client.get("/output")
+    client.get(f"/output?before={sixth}")
+    client.get(f"/output?after={first}")
+    client.get("/output?when=upcoming")
+    client.get(f"/output?when=past&before={sixth}")
+    client.get("/output?from=2026-01-01&to=2026-03-31")
+    client.get("/output?status=done")
+    client.get("/output?q=צוות")
+    client.get("/output?q=וות")
+    client.get("/output?stream=1").get_data()
+    client.get("/input")
+    client.post("/input", data={"title": "plan", "date": "2026-05-01", "time": "10:00"})
+    client.get(f"/edit/{first}")
+    client.post(f"/edit/{first}", data={"title": "plan-edit", "time_text": "11:00"})
+    client.post(f"/complete/{second}")
+    client.post(f"/delete/{third}")
+    client.get(f"/status/{fourth}")
+    client.post(f"/status/{fourth}", data={"status": "canceled", "next": "/output"})
+    client.post("/bulk/complete", data={"ids": [fifth, sixth]}, headers=json_headers)
+    client.post("/admin/bulk/status", data={"ids": [fifth, sixth], "status": "planned"}, headers=json_headers)
+    client.post("/bulk/delete", data={"ids": [sixth]}, headers=json_headers)
+    client.get("/admin/users")
+    client.get(f"/admin/users/{other_id}/appointments")
+    client.get("/api/appointments")
+    client.get(f"/api/appointments?owner={other_id}&when=upcoming")
+    client.get(f"/api/appointments/{first}")
+    client.post("/api/appointments", json={"title": "api", "date": "2026-05-02", "time": "09:00"})
+    client.patch(f"/api/appointments/{first}", json={"title": "api-edit"})
+    client.post(f"/api/appointments/{fourth}/complete")
+    client.post(f"/api/appointments/{fourth}/status", json={"status": "planned"})
+    client.delete(f"/api/appointments/{fifth}")
+
+
+def test_view_queries_use_indexes_and_stay_within_cost_budget(client, db_module, seeded, monkeypatch):
+    # שאילתות מוכנות מגיעות למאזין כ-EXECUTE על שם שקיים רק בחיבור שהכין אותן,
+    # לכן כאן הן רצות כטקסט רגיל שאפשר להריץ עליו EXPLAIN
+    monkeypatch.setattr("repository.PREPARE_STATEMENTS", False)
+    captured = {}
+
+    def listener(event, seconds, query, params):
+        if event == "query" and query.lstrip().split(None, 1)[0].upper() in EXPLAINABLE:
+            captured.setdefault(query, params)
+
+    db_module.add_db_listener(listener)
+    try:
+        drive_views(client, seeded)
+    finally:
+        db_module.remove_db_listener(listener)
+
+    assert len(captured) >= 20
+
+    budget = explain(db_module, "SELECT * FROM testapp_appointments", None)["Total Cost"] * PLAN_COST_BUDGET_FRACTION
+    problems = []
+    for query, params in captured.items():
+        plan = explain(db_module, query, params)
+        for node in plan_nodes(plan):
+            if node["Node Type"] == "Seq Scan" and node.get("Relation Name") == "testapp_appointments":
+                problems.append(f"seq scan on testapp_appointments:\n{' '.join(query.split())}")
+        if plan["Total Cost"] > budget:
+            problems.append(f"cost {plan['Total Cost']:.0f} > {budget:.0f}:\n{' '.join(query.split())}")
+
+    assert not problems, "\n\n".join(problems)
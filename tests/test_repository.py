@@ -0,0 +1,63 @@
+import importlib
+import uuid
+
+import psycopg2
+import pytest
+
+
+@pytest.fixture
+def repository(db_module):
+    return importlib.import_module("repository")
+
+
+def fresh_sql(sql):
+    # טקסט חדש שלא הוכן עדיין על אף חיבור במאגר המשותף לכל הבדיקות
+    return f"{sql} -- {uuid.uuid4().hex}"
+
+
+@pytest.fixture
+def captured(db_module):
+    queries = []
+
+    def listener(event, seconds, query, params):
+        if event == "query":
+            queries.append(query.lstrip().split(None, 1)[0].upper())
+
+    db_module.add_db_listener(listener)
+    yield queries
+    db_module.remove_db_listener(listener)
+
+
+def test_statement_is_prepared_once_per_connection(db_module, repository, captured):
+    sql = fresh_sql(repository.USER_BY_ID_SQL)
+    with db_module.get_cursor() as cur:
+        for _ in range(3):
+            repository.execute(cur, sql, (1,))
+            assert cur.fetchone() is None
+
+    assert captured == ["PREPARE", "EXECUTE", "EXECUTE", "EXECUTE"]
+
+
+def test_prepared_statement_survives_rollback(db_module, repository, captured):
+    sql = fresh_sql(repository.LOGIN_SQL)
+    with pytest.raises(psycopg2.errors.DivisionByZero):
+        with db_module.get_cursor() as cur:
+            repository.execute(cur, sql, ("nobody@example.com",))
+            cur.execute("SELECT 1 / 0")
+
+    with db_module.get_cursor() as cur:
+        repository.execute(cur, sql, ("nobody@example.com",))
+        assert cur.fetchone() is None
+
+    assert captured.count("PREPARE") == 1
+
+
+def test_disabled_preparation_runs_plain_sql(db_module, repository, captured, monkeypatch):
+    monkeypatch.setattr(repository, "PREPARE_STATEMENTS", False)
+    assert repository.fetch_user_row(1) is None
+    assert captured == ["SELECT"]
+
+
+def test_placeholders_are_numbered_for_prepare(repository):
+    sql = "SELECT * FROM t WHERE a = %s AND b LIKE 'x%%' AND c = %s"
+    assert repository._numbered_placeholders(sql) == "SELECT * FROM t WHERE a = $1 AND b LIKE 'x%' AND c = $2"
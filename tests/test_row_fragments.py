@@ -0,0 +1,111 @@
+from test_app import (
+    create_appointment,
+    fetch_latest_appt_id,
+    fetch_one_appointment,
+    fetch_user_id_by_email,
+    login_user,
+    register_user,
+)
+
+
+def row_headers(page="/output"):
+    return {"X-Row-Fragment": page}
+
+
+def appointment_queries(db_module, send):
+    queries = []
+
+    def listener(event, seconds, query, params):
+        if event == "query" and "testapp_appointments" in query:
+            queries.append(query)
+
+    db_module.add_db_listener(listener)
+    try:
+        res = send()
+    finally:
+        db_module.remove_db_listener(listener)
+    return res, queries
+
+
+def test_complete_returns_only_the_changed_row_from_one_statement(client, db_module):
+    register_user(client, "row@example.com")
+    login_user(client, "row@example.com")
+    create_appointment(client, title="row title")
+    appt_id = fetch_latest_appt_id(db_module)
+
+    res, queries = appointment_queries(
+        db_module, lambda: client.post(f"/complete/{appt_id}", headers=row_headers())
+    )
+
+    text = res.get_data(as_text=True)
+    assert res.status_code == 200
+    assert text.strip().startswith(f'<tr id="appointment-{appt_id}">')
+    assert "row title" in text and "הושלם" in text
+    assert f"/complete/{appt_id}" not in text
+    assert "<html" not in text
+    assert len(queries) == 1 and "RETURNING" in queries[0]
+
+
+def test_delete_returns_a_removal_marker(client, db_module):
+    register_user(client, "remove@example.com")
+    login_user(client, "remove@example.com")
+    create_appointment(client, title="to remove")
+    appt_id = fetch_latest_appt_id(db_module)
+
+    res = client.post(f"/delete/{appt_id}", headers=row_headers())
+
+    assert res.status_code == 200
+    assert res.get_data(as_text=True) == f'<tr id="appointment-{appt_id}" data-removed></tr>'
+    assert fetch_one_appointment(db_module, appt_id) is None
+
+
+def test_create_and_edit_return_rows(client, db_module):
+    register_user(client, "edit-row@example.com")
+    login_user(client, "edit-row@example.com")
+
+    res = client.post(
+        "/input",
+        data={"title": "fresh", "date": "2026-04-01", "time": "10:00"},
+        headers=row_headers(),
+    )
+    appt_id = fetch_latest_appt_id(db_module)
+    assert res.status_code == 201
+    assert f'<tr id="appointment-{appt_id}">' in res.get_data(as_text=True)
+
+    res = client.post(f"/edit/{appt_id}", data={"title": "renamed", "time_text": "11:30"}, headers=row_headers())
+    text = res.get_data(as_text=True)
+    assert "renamed" in text and "11:30" in text
+
+
+def test_status_row_matches_the_admin_page_it_came_from(client, db_module):
+    register_user(client, "owner-row@example.com")
+    login_user(client, "owner-row@example.com")
+    create_appointment(client, title="owned elsewhere")
+    appt_id = fetch_latest_appt_id(db_module)
+    owner_id = fetch_user_id_by_email(db_module, "owner-row@example.com")
+
+    register_user(client, "admin-row@example.com", is_admin=True)
+    login_user(client, "admin-row@example.com")
+    page = f"/admin/users/{owner_id}/appointments"
+    res = client.post(f"/status/{appt_id}", data={"status": "canceled", "next": page}, headers=row_headers(page))
+
+    text = res.get_data(as_text=True)
+    assert "בוטל" in text
+    assert "<td>owner-row@example.com</td>" in text
+    assert "<td>admin-row@example.com</td>" in text
+    assert f"/delete/{appt_id}" not in text
+    assert f"next={page}" in text
+
+
+def test_failures_and_plain_forms_still_redirect(client, db_module):
+    register_user(client, "plain-row@example.com")
+    login_user(client, "plain-row@example.com")
+    create_appointment(client, title="plain")
+    appt_id = fetch_latest_appt_id(db_module)
+
+    res = client.post(f"/complete/{appt_id + 1}", headers=row_headers())
+    assert res.status_code == 302
+
+    res = client.post(f"/complete/{appt_id}")
+    assert res.status_code == 302
+    assert res.headers["Location"].endswith("/output")
@@ -0,0 +1,77 @@
+import io
+
+from test_app import create_appointment, fetch_user_id_by_email, login_user, register_user
+
+
+def stored_counts(db_module, owner_id):
+    with db_module.get_cursor() as cur:
+        cur.execute(
+            "SELECT planned, done, canceled FROM appointment_status_counts WHERE owner_user_id = %s",
+            (owner_id,),
+        )
+        row = cur.fetchone()
+    return tuple(row) if row else (0, 0, 0)
+
+
+def test_counts_follow_every_write_path(client, db_module):
+    import appointments_import
+
+    register_user(client, "counted@example.com", is_admin=True)
+    login_user(client, "counted@example.com")
+    owner_id = fetch_user_id_by_email(db_module, "counted@example.com")
+
+    for i in range(4):
+        create_appointment(client, title=f"c{i}")
+    assert stored_counts(db_module, owner_id) == (4, 0, 0)
+
+    client.post("/complete/1")
+    client.post("/status/2", data={"status": "canceled", "next": "/output"})
+    assert stored_counts(db_module, owner_id) == (2, 1, 1)
+
+    client.post("/bulk/complete", data={"ids": [3, 4]})
+    client.post("/delete/1")
+    assert stored_counts(db_module, owner_id) == (0, 2, 1)
+
+    client.post("/edit/3", data={"title": "renamed", "time_text": "10:00"})
+    assert stored_counts(db_module, owner_id) == (0, 2, 1)
+
+    appointments_import.import_appointments(
+        io.StringIO("title,date,time,status\nimported,2026-01-01,09:00,canceled\n"),
+        "csv",
+        default_owner_email="counted@example.com",
+    )
+    assert stored_counts(db_module, owner_id) == (0, 2, 2)
+
+    import status_counters
+
+    assert status_counters.check_status_counts() == []
+
+
+def test_admin_users_page_shows_counts(client, db_module):
+    register_user(client, "counts-admin@example.com", is_admin=True)
+    login_user(client, "counts-admin@example.com")
+    create_appointment(client, title="x")
+    create_appointment(client, title="y")
+    client.post("/complete/1")
+
+    text = client.get("/admin/users").get_data(as_text=True)
+    assert "<td>1</td>\n              <td>1</td>\n              <td>0</td>" in text
+
+
+def test_check_detects_drift_and_rebuild_repairs_it(client, db_module):
+    import status_counters
+
+    register_user(client, "drift@example.com")
+    login_user(client, "drift@example.com")
+    create_appointment(client, title="x")
+    owner_id = fetch_user_id_by_email(db_module, "drift@example.com")
+
+    with db_module.get_cursor() as cur:
+        cur.execute("UPDATE appointment_status_counts SET planned = 7 WHERE owner_user_id = %s", (owner_id,))
+
+    mismatches = status_counters.check_status_counts()
+    assert mismatches == [{"owner_user_id": owner_id, "expected": (1, 0, 0), "stored": (7, 0, 0)}]
+
+    assert status_counters.rebuild_status_counts() == 1
+    assert status_counters.check_status_counts() == []
+    assert stored_counts(db_module, owner_id) == (1, 0, 0)
@@ -0,0 +1,121 @@
+import importlib
+from datetime import datetime
+
+import pytest
+
+from test_app import create_appointment, fetch_latest_appt_id, fetch_user_id_by_email, login_user, register_user
+from test_query_plans import explain, plan_nodes
+
+
+@pytest.fixture
+def repository(app_module):
+    return importlib.import_module("repository")
+
+
+def status_events(db_module, appt_id):
+    with db_module.get_cursor() as cur:
+        cur.execute(
+            """
+            SELECT old_status, new_status, changed_by_user_id
+            FROM appointment_status_events
+            WHERE appointment_id = %s
+            ORDER BY changed_at, new_status
+            """,
+            (appt_id,),
+        )
+        return cur.fetchall()
+
+
+def admin_with_appointment(client, db_module):
+    register_user(client, "history-admin@example.com", is_admin=True)
+    login_user(client, "history-admin@example.com")
+    create_appointment(client, title="tracked")
+    return fetch_user_id_by_email(db_module, "history-admin@example.com"), fetch_latest_appt_id(db_module)
+
+
+def test_status_changes_are_recorded_in_order(client, db_module):
+    admin_id, appt_id = admin_with_appointment(client, db_module)
+
+    client.post(f"/status/{appt_id}", data={"status": "canceled", "next": "/output"})
+    client.post(f"/edit/{appt_id}", data={"title": "renamed", "time_text": "11:00"})
+    client.post(f"/status/{appt_id}", data={"status": "canceled", "next": "/output"})
+    client.post(f"/complete/{appt_id}")
+
+    assert status_events(db_module, appt_id) == [
+        ("planned", "canceled", admin_id),
+        ("canceled", "done", None),
+    ]
+
+
+def test_bulk_status_update_records_every_changed_row(client, db_module):
+    admin_id, first = admin_with_appointment(client, db_module)
+    create_appointment(client, title="second")
+    second = fetch_latest_appt_id(db_module)
+    client.post(f"/status/{second}", data={"status": "done", "next": "/output"})
+
+    client.post("/admin/bulk/status", data={"ids": [first, second], "status": "done"})
+
+    assert status_events(db_module, first) == [("planned", "done", admin_id)]
+    assert status_events(db_module, second) == [("planned", "done", admin_id)]
+
+
+def test_status_page_shows_history(client, db_module):
+    _, appt_id = admin_with_appointment(client, db_module)
+    assert "הסטטוס לא שונה" in client.get(f"/status/{appt_id}").get_data(as_text=True)
+
+    client.post(f"/status/{appt_id}", data={"status": "canceled", "next": "/output"})
+    text = client.get(f"/status/{appt_id}").get_data(as_text=True)
+
+    assert "היסטוריית סטטוס" in text
+    assert "history-admin@example.com" in text
+    assert "status status-error" in text
+
+
+def test_transitions_query_reads_only_the_months_in_range(client, db_module, repository):
+    _, appt_id = admin_with_appointment(client, db_module)
+    with db_module.get_cursor() as cur:
+        for month in ("2020-01-15", "2020-02-15", "2020-03-15"):
+            cur.execute("SELECT testapp_status_events_partition(%s)", (month,))
+            cur.execute(
+                """
+                INSERT INTO appointment_status_events (appointment_id, old_status, new_status, changed_at)
+                VALUES (%s, 'planned', 'done', %s)
+                """,
+                (appt_id, month),
+            )
+
+    text = client.get("/admin/status-history?from=2020-02-01&to=2020-02-29").get_data(as_text=True)
+    assert "2020-02-15" in text
+    assert "2020-01-15" not in text and "2020-03-15" not in text
+
+    plan = explain(
+        db_module,
+        repository.STATUS_TRANSITIONS_SQL,
+        (datetime(2020, 2, 1), datetime(2020, 3, 1), ["done"], 500),
+    )
+    scanned = {
+        node["Relation Name"]
+        for node in plan_nodes(plan)
+        if node.get("Relation Name", "").startswith("appointment_status_events")
+    }
+    assert scanned == {"appointment_status_events_2020_02"}
+
+
+def test_status_history_needs_admin(client):
+    register_user(client, "plain-history@example.com")
+    login_user(client, "plain-history@example.com")
+
+    assert client.get("/admin/status-history").status_code == 403
+
+
+def test_startup_creates_upcoming_partitions(db_module):
+    with db_module.get_cursor() as cur:
+        cur.execute("SELECT 'appointment_status_events_' || to_char(LOCALTIMESTAMP + INTERVAL '2 months', 'YYYY_MM')")
+        upcoming = cur.fetchone()[0]
+        cur.execute(f"DROP TABLE IF EXISTS {upcoming}")
+
+    db_module.init_db()
+
+    with db_module.get_cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (upcoming,))
+        assert cur.fetchone()[0] is True